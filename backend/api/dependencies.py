@@ -0,0 +1,56 @@
+from typing import Optional
+from fastapi import Request
+from utils.config import Settings
+from services.container import ServiceContainer
+from services.blast_service import BlastService
+from services.resistance_analysis_service import ResistanceAnalysisService
+from services.supabase_service import SupabaseService
+from services.results_store import ResultsStore
+from services.result_writer import ResultWriter
+from services.analysis_pipeline import AnalysisPipeline
+from services.batch_service import BatchAnalysisService
+from services.job_queue import JobQueue
+from services.progress import ProgressBroker
+from services.profiling import RequestProfiler
+
+def get_services(request: Request) -> ServiceContainer:
+    """Get the application's service container, building it if the lifespan didn't run"""
+    container = getattr(request.app.state, "services", None)
+    if container is None:
+        container = ServiceContainer()
+        container.start()
+        request.app.state.services = container
+    return container
+
+def get_settings(request: Request) -> Settings:
+    return get_services(request).settings
+
+def get_blast_service(request: Request) -> BlastService:
+    return get_services(request).blast_service
+
+def get_analysis_service(request: Request) -> ResistanceAnalysisService:
+    return get_services(request).analysis_service
+
+def get_supabase(request: Request) -> SupabaseService:
+    return get_services(request).supabase_service
+
+def get_results_store(request: Request) -> ResultsStore:
+    return get_services(request).results_store
+
+def get_result_writer(request: Request) -> Optional[ResultWriter]:
+    return get_services(request).result_writer
+
+def get_pipeline(request: Request) -> AnalysisPipeline:
+    return get_services(request).pipeline
+
+def get_batch_service(request: Request) -> BatchAnalysisService:
+    return get_services(request).batch_service
+
+def get_job_queue(request: Request) -> JobQueue:
+    return get_services(request).job_queue
+
+def get_progress(request: Request) -> ProgressBroker:
+    return get_services(request).progress
+
+def get_profiler(request: Request) -> Optional[RequestProfiler]:
+    return get_services(request).profiler
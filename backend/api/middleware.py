@@ -0,0 +1,199 @@
+import time
+import uuid
+import asyncio
+from typing import Optional
+from fastapi.responses import JSONResponse
+from starlette.routing import Match
+from services.admission import AdmissionRejected
+from services.metrics import REQUEST_SECONDS, endpoint_label
+from services.tracing import start_span, current_span, SPAN_KIND_SERVER
+from services.profiling import valid_request_id
+
+def route_template(scope) -> str:
+    """Path template of the route a request matches, so IDs in the URL don't create new series or span names"""
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "other")
+    return "unmatched"
+
+class MetricsMiddleware:
+    """Times each request and labels the metrics recorded while serving it with its route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        endpoint = route_template(scope)
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            with endpoint_label(endpoint):
+                await self.app(scope, receive, send_with_status)
+        finally:
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                endpoint=endpoint,
+                method=scope["method"],
+                status=str(status["code"])
+            )
+
+class TracingMiddleware:
+    """
+    Serves each request inside a root span, continuing the caller's trace when it
+    sends a traceparent header, and reports stage durations in Server-Timing
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        traceparent = headers.get(b"traceparent", b"").decode() or None
+        endpoint = route_template(scope)
+
+        with start_span(
+            f"{scope['method']} {endpoint}",
+            traceparent=traceparent,
+            kind=SPAN_KIND_SERVER,
+            **{"http.method": scope["method"], "http.route": endpoint}
+        ) as span:
+            async def send_with_timing(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.error = f"HTTP {message['status']}"
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", span.server_timing().encode()),
+                        (b"traceparent", span.traceparent().encode())
+                    ]
+                await send(message)
+
+            await self.app(scope, receive, send_with_timing)
+
+class AdmissionMiddleware:
+    """
+    Applies the container's per-endpoint admission control before the upload is read
+
+    Only requests with a valid access token are given a slot, so anonymous clients
+    can't fill the queue and turn signed-in users away.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        controller = services = None
+        if scope["type"] == "http" and scope["method"] == "POST":
+            services = getattr(scope["app"].state, "services", None)
+            if services is not None:
+                controller = services.admission.get(scope["path"])
+
+        if controller is None:
+            await self.app(scope, receive, send)
+            return
+
+        detail = await self._authentication_error(services, scope)
+        if detail is not None:
+            response = JSONResponse(status_code=401, content={"detail": detail}, headers={"WWW-Authenticate": "Bearer"})
+            await response(scope, receive, send)
+            return
+
+        try:
+            await controller.acquire()
+        except AdmissionRejected as e:
+            response = JSONResponse(
+                status_code=e.status_code,
+                content={"detail": e.detail},
+                headers={"Retry-After": str(e.retry_after)}
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.release()
+
+    async def _authentication_error(self, services, scope) -> Optional[str]:
+        """Why the request's bearer token was refused, or None if it's valid"""
+        authorization = dict(scope["headers"]).get(b"authorization", b"").decode("latin-1")
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return "Not authenticated"
+        try:
+            # Cached by the service, so the route's own check doesn't verify it again
+            await asyncio.to_thread(services.supabase_service.get_user_from_token, token)
+        except Exception:
+            return "Could not validate credentials"
+        return None
+
+class ProfilingMiddleware:
+    """
+    Profiles requests that ask for it (X-Profile with X-Admin-Token) or are sampled,
+    storing the artifacts under a request ID returned in X-Request-ID
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        services = getattr(scope["app"].state, "services", None) if scope["type"] == "http" else None
+        profiler = services.profiler if services is not None else None
+        if profiler is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        decision = profiler.decide(
+            headers.get(b"x-profile", b"").decode() or None,
+            headers.get(b"x-admin-token", b"").decode() or None
+        )
+        if decision is None:
+            await self.app(scope, receive, send)
+            return
+
+        # The ID names the artifacts, so it's generated here: a client's X-Request-ID could
+        # overwrite another request's profile. The client's ID is kept with the profile.
+        request_id = uuid.uuid4().hex
+        client_request_id = headers.get(b"x-request-id", b"").decode()
+        trigger, memory = decision
+        status = {"code": 500}
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", request_id.encode())]
+            await send(message)
+
+        with profiler.session(request_id, trigger, memory) as session:
+            await self.app(scope, receive, send_with_request_id)
+
+        span = current_span()
+        try:
+            await asyncio.to_thread(
+                profiler.save,
+                session,
+                method=scope["method"],
+                route=route_template(scope),
+                status=status["code"],
+                trace_id=span.trace_id if span is not None else None,
+                client_request_id=client_request_id if valid_request_id(client_request_id) else None
+            )
+        except Exception as e:
+            # A profile that can't be written must not fail the request it measured
+            profiler.logger.warning(f"Error saving profile {request_id}: {str(e)}")
@@ -0,0 +1,59 @@
+import hmac
+from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi.responses import FileResponse
+from typing import Optional
+from services.profiling import RequestProfiler
+from utils.config import Settings
+from api.dependencies import get_profiler, get_settings
+
+router = APIRouter()
+
+def require_admin(
+    x_admin_token: Optional[str] = Header(None),
+    settings: Settings = Depends(get_settings)
+) -> None:
+    """Allow only requests carrying the configured ADMIN_TOKEN"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+def _profiler(profiler: Optional[RequestProfiler] = Depends(get_profiler)) -> RequestProfiler:
+    if profiler is None:
+        raise HTTPException(status_code=404, detail="Profiling is disabled (PROFILING_ENABLED is not set)")
+    return profiler
+
+@router.get("/admin/profiles", dependencies=[Depends(require_admin)])
+async def list_profiles(profiler: RequestProfiler = Depends(_profiler)):
+    """
+    Stored request profiles, newest first
+
+    A request is profiled when it sends `X-Profile: cpu` (or `cpu,memory` to also
+    trace allocations) together with `X-Admin-Token`, or when it is sampled
+    (PROFILE_SAMPLE_RATIO). Its `X-Request-ID` response header names the profile.
+    """
+    return profiler.list()
+
+@router.get("/admin/profiles/{request_id}", dependencies=[Depends(require_admin)])
+async def get_profile(request_id: str, profiler: RequestProfiler = Depends(_profiler)):
+    """Summary of one profile: the slowest functions by cumulative time and, if traced, the largest allocation sites"""
+    summary = profiler.get(request_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return summary
+
+@router.get("/admin/profiles/{request_id}/cpu", dependencies=[Depends(require_admin)])
+async def download_cpu_profile(request_id: str, profiler: RequestProfiler = Depends(_profiler)):
+    """The full CPU profile in pstats format (open with `python -m pstats` or snakeviz)"""
+    path = profiler.artifact_path(request_id, "prof")
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{request_id}.prof")
+
+@router.get("/admin/profiles/{request_id}/memory", dependencies=[Depends(require_admin)])
+async def download_memory_snapshot(request_id: str, profiler: RequestProfiler = Depends(_profiler)):
+    """The tracemalloc snapshot (load with `tracemalloc.Snapshot.load`), if allocations were traced"""
+    path = profiler.artifact_path(request_id, "tracemalloc")
+    if path is None:
+        raise HTTPException(status_code=404, detail="Memory snapshot not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{request_id}.tracemalloc")
@@ -4,12 +4,10 @@ from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime, timedelta
 import os
-from utils.config import Settings
 from services.supabase_service import SupabaseService
+from api.dependencies import get_supabase
 
 router = APIRouter()
-settings = Settings()
-supabase_service = SupabaseService()
 
 class Token(BaseModel):
     access_token: str
@@ -34,7 +32,7 @@ class UserCreate(BaseModel):
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 @router.post("/register", response_model=User)
-async def register_user(user: UserCreate):
+async def register_user(user: UserCreate, supabase_service: SupabaseService = Depends(get_supabase)):
     """Register a new user"""
     try:
         new_user = supabase_service.register_user(
@@ -53,7 +51,10 @@ async def register_user(user: UserCreate):
         )
 
 @router.post("/token", response_model=Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
+async def login_for_access_token(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    supabase_service: SupabaseService = Depends(get_supabase)
+):
     """Generate an access token for the user"""
     try:
         user_token = supabase_service.login_user(
@@ -68,7 +69,10 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-async def get_current_user_dependency(token: str = Depends(oauth2_scheme)) -> User:
+async def get_current_user_dependency(
+    token: str = Depends(oauth2_scheme),
+    supabase_service: SupabaseService = Depends(get_supabase)
+) -> User:
     """Dependency function to get current user as User model"""
     try:
         user_data = supabase_service.get_user_from_token(token)
@@ -82,7 +86,10 @@ async def get_current_user_dependency(token: str = Depends(oauth2_scheme)) -> Us
         )
 
 @router.get("/users/me", response_model=User)
-async def get_current_user(token: str = Depends(oauth2_scheme)):
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    supabase_service: SupabaseService = Depends(get_supabase)
+):
     """Get the current user profile"""
     try:
         user_data = supabase_service.get_user_from_token(token)
@@ -0,0 +1,102 @@
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from typing import List, Optional, Iterator, Tuple, BinaryIO, Dict, Any
+import asyncio
+import tempfile
+from services.batch_service import (
+    BatchAnalysisService, ArchiveTooLarge, check_archive_sizes, iter_fasta_entries, is_archive, FASTA_EXTENSIONS
+)
+from models.resistance_model import ResistanceAnalysisResult
+from api.routes.auth import get_current_user_dependency, User
+from api.dependencies import get_batch_service, get_settings
+from api.uploads import check_upload_size, save_upload
+from services.memory import MB
+from utils.config import Settings
+from utils.serialization import encode
+
+router = APIRouter()
+
+class BatchSampleResult(BaseModel):
+    sample_id: str
+    status: str
+    result: Optional[ResistanceAnalysisResult] = None
+    error: Optional[str] = None
+
+class BatchSummary(BaseModel):
+    samples: int
+    completed: int
+    failed: int
+    saved: int
+
+class BatchAnalysisResult(BaseModel):
+    results: List[BatchSampleResult]
+    summary: BatchSummary
+
+@router.post("/batch", response_model=BatchAnalysisResult)
+async def analyze_batch(
+    files: List[UploadFile] = File(...),
+    threshold: float = 0.75,
+    stream: bool = False,
+    current_user: User = Depends(get_current_user_dependency),
+    batch_service: BatchAnalysisService = Depends(get_batch_service),
+    settings: Settings = Depends(get_settings)
+):
+    """
+    Analyze many samples in one request
+
+    - **files**: FASTA files and/or .zip, .tar, .tar.gz archives of FASTA files
+    - **threshold**: Minimum alignment score threshold (0-1)
+    - **stream**: Return newline-delimited JSON, one line per sample as it completes,
+      followed by a summary line
+
+    Samples run in parallel under a concurrency cap, and results are saved in bulk.
+    """
+    for file in files:
+        if not (file.filename.lower().endswith(FASTA_EXTENSIONS) or is_archive(file.filename)):
+            raise HTTPException(
+                status_code=400,
+                detail=f"{file.filename}: files must be FASTA (.fasta, .fa, .fna) or an archive (.zip, .tar, .tar.gz)"
+            )
+        check_upload_size(file, settings.MAX_UPLOAD_MB * MB)
+
+    # Only the compressed size is known from the upload, so check what archives expand to
+    limits = (settings.BATCH_MAX_MEMBER_MB * MB, settings.BATCH_MAX_ARCHIVE_MB * MB)
+    for file in files:
+        try:
+            await asyncio.to_thread(check_archive_sizes, file.filename, file.file, *limits)
+        except ArchiveTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+
+    if stream:
+        # Uploads are closed once the endpoint returns, so keep our own copies for the stream
+        uploads = [(file.filename, await _persist(file)) for file in files]
+        outcomes = batch_service.run(_iter_uploads(uploads, limits), threshold=threshold, user_id=current_user.id)
+        return StreamingResponse(_ndjson(outcomes, uploads), media_type="application/x-ndjson")
+
+    uploads = [(file.filename, file.file) for file in files]
+    outcomes = batch_service.run(_iter_uploads(uploads, limits), threshold=threshold, user_id=current_user.id)
+    try:
+        collected = await asyncio.to_thread(list, outcomes)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing batch: {str(e)}")
+
+    return {"results": collected[:-1], "summary": collected[-1]["summary"]}
+
+async def _persist(file: UploadFile) -> BinaryIO:
+    copy = tempfile.TemporaryFile()
+    await save_upload(file, copy)
+    copy.seek(0)
+    return copy
+
+def _iter_uploads(uploads: List[Tuple[str, BinaryIO]], limits: Tuple[int, int]) -> Iterator[Tuple[str, BinaryIO]]:
+    for filename, fileobj in uploads:
+        yield from iter_fasta_entries(filename, fileobj, *limits)
+
+def _ndjson(outcomes: Iterator[Dict[str, Any]], uploads: List[Tuple[str, BinaryIO]]) -> Iterator[bytes]:
+    try:
+        for outcome in outcomes:
+            yield encode(outcome) + b"\n"
+    finally:
+        for _, fileobj in uploads:
+            fileobj.close()
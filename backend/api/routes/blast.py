@@ -1,22 +1,32 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, BackgroundTasks
 from fastapi.responses import JSONResponse
 from typing import List, Optional
+import asyncio
 import os
 import uuid
 import tempfile
 from services.blast_service import BlastService
+from services.analysis_pipeline import AnalysisPipeline
 from models.blast_model import BlastResult
+from utils.serialization import FastJSONResponse
+from services.metrics import stage_timer
+from services.memory import MB, MemoryRejected
 from utils.config import Settings
+from api.uploads import save_upload
+from api.dependencies import get_blast_service, get_pipeline, get_settings
+from api.routes.auth import get_current_user_dependency, User
 
 router = APIRouter()
-settings = Settings()
 
 @router.post("/blast", response_model=List[BlastResult])
 async def run_blast(
     background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     evalue: float = 1e-10,
-    max_hits: int = 10
+    max_hits: int = 10,
+    current_user: User = Depends(get_current_user_dependency),
+    pipeline: AnalysisPipeline = Depends(get_pipeline),
+    settings: Settings = Depends(get_settings)
 ):
     """
     Run BLAST alignment on a DNA sequence
@@ -35,13 +45,12 @@ async def run_blast(
     
     try:
         # Save uploaded file
-        with open(temp_file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+        with stage_timer("upload"), open(temp_file_path, "wb") as buffer:
+            await save_upload(file, buffer, settings.MAX_UPLOAD_MB * MB)
         
-        # Run BLAST
-        blast_service = BlastService()
-        blast_results = blast_service.run_blast(
+        # Run BLAST, sharing the search with identical requests already running
+        blast_results = await asyncio.to_thread(
+            pipeline.search,
             temp_file_path,
             evalue=evalue,
             max_hits=max_hits
@@ -50,19 +59,23 @@ async def run_blast(
         # Clean up temporary file in the background
         background_tasks.add_task(os.remove, temp_file_path)
         
-        return blast_results
+        # Hit lists can be large; encode them with the schema's compiled serializer
+        return FastJSONResponse(blast_results, schema=List[BlastResult])
         
     except Exception as e:
         # Clean up in case of error
         if os.path.exists(temp_file_path):
             os.remove(temp_file_path)
+        if isinstance(e, HTTPException):
+            raise
+        if isinstance(e, MemoryRejected):
+            raise HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers())
         raise HTTPException(status_code=500, detail=f"Error running BLAST: {str(e)}")
 
 @router.get("/reference-genes", response_model=List[str])
-async def get_reference_genes():
+async def get_reference_genes(blast_service: BlastService = Depends(get_blast_service)):
     """Get a list of available reference resistance genes"""
     try:
-        blast_service = BlastService()
         return blast_service.get_available_reference_genes()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching reference genes: {str(e)}")
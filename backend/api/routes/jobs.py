@@ -0,0 +1,136 @@
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from typing import Optional, Dict, Any, AsyncIterator
+import asyncio
+import uuid
+from services.job_queue import JobQueue, JobStatus
+from services.progress import ProgressBroker, TERMINAL_STAGES
+from api.routes.auth import get_current_user_dependency, User
+from api.dependencies import get_job_queue, get_progress, get_settings
+from api.uploads import check_upload_size
+from services.memory import MB
+from utils.config import Settings
+from utils.serialization import encode
+
+router = APIRouter()
+
+class JobSubmission(BaseModel):
+    job_id: str
+    status: str
+
+class Job(BaseModel):
+    id: str
+    sample_id: str
+    status: str
+    params: Dict[str, Any]
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+
+@router.post("/jobs", response_model=JobSubmission, status_code=status.HTTP_202_ACCEPTED)
+async def submit_analysis_job(
+    file: UploadFile = File(...),
+    threshold: float = 0.75,
+    current_user: User = Depends(get_current_user_dependency),
+    job_queue: JobQueue = Depends(get_job_queue),
+    settings: Settings = Depends(get_settings)
+):
+    """
+    Queue a DNA sequence for resistance analysis and return immediately
+
+    - **file**: FASTA file containing the bacterial DNA sequence
+    - **threshold**: Minimum alignment score threshold (0-1)
+
+    Poll `/api/jobs/{job_id}` for the status and result.
+    """
+    # Validate file is FASTA
+    if not file.filename.endswith(('.fasta', '.fa', '.fna')):
+        raise HTTPException(status_code=400, detail="File must be in FASTA format (.fasta, .fa, or .fna)")
+
+    check_upload_size(file, settings.MAX_UPLOAD_MB * MB)
+
+    try:
+        # Spooled from the upload in chunks, off the event loop
+        await file.seek(0)
+        job_id = await asyncio.to_thread(
+            job_queue.submit,
+            file.file,
+            sample_id=file.filename or f"sample_{uuid.uuid4()}",
+            user_id=current_user.id,
+            params={"threshold": threshold}
+        )
+        return {"job_id": job_id, "status": "queued"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error queueing analysis: {str(e)}")
+
+@router.get("/jobs/{job_id}", response_model=Job)
+async def get_analysis_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user_dependency),
+    job_queue: JobQueue = Depends(get_job_queue)
+):
+    """Get the status of a queued analysis, and its result once completed"""
+    job = await asyncio.to_thread(job_queue.get, job_id)
+    if job is None or job["user_id"] != current_user.id:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+@router.get("/jobs/{job_id}/events")
+async def stream_analysis_job_events(
+    job_id: str,
+    current_user: User = Depends(get_current_user_dependency),
+    job_queue: JobQueue = Depends(get_job_queue),
+    progress: ProgressBroker = Depends(get_progress)
+):
+    """
+    Stream progress of a queued analysis as Server-Sent Events
+
+    Events carry a `stage` field: upload_received, running, search_started,
+    search_progress, matching_region (a partial MatchingRegion as soon as it
+    is found), record_done, search_done, analysis_done, saved, and finally
+    completed or failed.
+    """
+    job = await asyncio.to_thread(job_queue.get, job_id)
+    if job is None or job["user_id"] != current_user.id:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+
+    return StreamingResponse(
+        _job_event_stream(job_id, job_queue, progress),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _job_event_stream(job_id: str, job_queue: JobQueue, progress: ProgressBroker) -> AsyncIterator[str]:
+    seen = 0
+    finished = None
+    while True:
+        events, seen = progress.events_since(job_id, seen)
+        for event in events:
+            yield _sse(event)
+            if event["stage"] in TERMINAL_STAGES:
+                return
+        if events:
+            continue
+
+        if finished is not None:
+            # Events are lost on restart; end with the job's stored status
+            yield _sse({"stage": finished["status"], "error": finished["error"]})
+            return
+
+        job = await asyncio.to_thread(job_queue.get, job_id)
+        if job is None:
+            return
+        if job["status"] in (JobStatus.COMPLETED, JobStatus.FAILED):
+            # Take one more look for a terminal event published meanwhile before using the stored status
+            finished = job
+            continue
+
+        # Comment line keeps proxies from closing an idle stream
+        yield ": keep-alive\n\n"
+        await asyncio.sleep(0.5)
+
+def _sse(event: Dict[str, Any]) -> str:
+    return f"event: {event['stage']}\ndata: {encode(event).decode()}\n\n"
@@ -1,26 +1,32 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, BackgroundTasks
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, BackgroundTasks, Query
 from fastapi.responses import JSONResponse
 from typing import List, Optional
+import asyncio
 import os
 import uuid
 import tempfile
-from services.blast_service import BlastService
-from services.resistance_analysis_service import ResistanceAnalysisService
-from services.supabase_service import SupabaseService
+from services.results_store import ResultsStore
+from services.result_writer import ResultWriter
+from services.analysis_pipeline import AnalysisPipeline
 from models.resistance_model import ResistanceAnalysisResult, ResistanceStatus
 from api.routes.auth import get_current_user_dependency, User, oauth2_scheme
+from api.dependencies import get_pipeline, get_results_store, get_result_writer, get_settings
+from utils.serialization import FastJSONResponse
+from services.metrics import stage_timer
+from services.memory import MB, MemoryRejected
 from utils.config import Settings
+from api.uploads import save_upload
 
 router = APIRouter()
-settings = Settings()
-supabase_service = SupabaseService()
 
 @router.post("/analyze", response_model=ResistanceAnalysisResult)
 async def analyze_sequence(
     background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     threshold: float = 0.75,
-    current_user: User = Depends(get_current_user_dependency)
+    current_user: User = Depends(get_current_user_dependency),
+    pipeline: AnalysisPipeline = Depends(get_pipeline),
+    settings: Settings = Depends(get_settings)
 ):
     """
     Analyze a DNA sequence for antibiotic resistance genes
@@ -38,46 +44,31 @@ async def analyze_sequence(
     
     try:
         # Save uploaded file
-        with open(temp_file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+        with stage_timer("upload"), open(temp_file_path, "wb") as buffer:
+            await save_upload(file, buffer, settings.MAX_UPLOAD_MB * MB)
         
-        # Process the sequence
-        blast_service = BlastService()
-        analysis_service = ResistanceAnalysisService()
-        
-        # Run BLAST alignment
-        blast_results = blast_service.run_blast(temp_file_path)
-        
-        # Analyze resistance
-        analysis_results = analysis_service.analyze_resistance(
-            blast_results,
-            threshold=threshold
+        # Run off the event loop so other requests keep being served
+        analysis_results = await asyncio.to_thread(
+            pipeline.run,
+            temp_file_path,
+            sample_id=file.filename or f"sample_{uuid.uuid4()}",
+            threshold=threshold,
+            user_id=current_user.id
         )
         
-        # Save results to Supabase for authenticated user
-        try:
-            # Add sample_id to analysis results
-            analysis_dict = analysis_results.dict()
-            analysis_dict['sample_id'] = file.filename or f"sample_{uuid.uuid4()}"
-            
-            result_id = supabase_service.save_analysis_result(current_user.id, analysis_dict)
-            print(f"Analysis result saved with ID: {result_id}")
-        except Exception as e:
-            # Log the error but don't fail the request
-            print(f"Error saving analysis result: {str(e)}")
-            import traceback
-            print(f"Full traceback: {traceback.format_exc()}")
-        
         # Clean up temporary file in the background
         background_tasks.add_task(os.remove, temp_file_path)
         
-        return analysis_results
+        return FastJSONResponse(analysis_results, schema=ResistanceAnalysisResult)
         
     except Exception as e:
         # Clean up in case of error
         if os.path.exists(temp_file_path):
             os.remove(temp_file_path)
+        if isinstance(e, HTTPException):
+            raise
+        if isinstance(e, MemoryRejected):
+            raise HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers())
         raise HTTPException(status_code=500, detail=f"Error processing sequence: {str(e)}")
 
 @router.get("/debug/user")
@@ -90,21 +81,96 @@ async def debug_current_user(current_user: User = Depends(get_current_user_depen
     }
 
 @router.get("/history")
-async def get_analysis_history(current_user: User = Depends(get_current_user_dependency)):
-    """Get analysis history for the current user"""
+async def get_analysis_history(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    gene: Optional[str] = None,
+    current_user: User = Depends(get_current_user_dependency),
+    results_store: ResultsStore = Depends(get_results_store)
+):
+    """
+    Get analysis history for the current user, newest first
+    
+    - **limit**: Maximum results per page
+    - **cursor**: Value of the previous page's `X-Next-Cursor` header
+    - **fields**: Comma-separated columns to return; defaults to a summary
+      (sample, status, confidence, genes and timestamps)
+    - **gene**: Only results in which this gene was identified (e.g. mecA)
+    
+    Full records, including matching regions and treatment recommendations,
+    are available from `/api/history/{result_id}`.
+    """
     try:
-        # Temporarily use the simple version without auth_token
-        return supabase_service.get_user_analysis_results(current_user.id)
+        # The store blocks (SQLite or a PostgREST round-trip), so it runs off the event loop
+        page = await asyncio.to_thread(
+            results_store.get_user_analysis_history,
+            current_user.id,
+            limit=limit,
+            cursor=cursor,
+            fields=[field.strip() for field in fields.split(",") if field.strip()] if fields else None,
+            gene=gene
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        import traceback
-        error_details = traceback.format_exc()
-        print(f"Full error: {error_details}")
         raise HTTPException(status_code=500, detail=f"Error fetching analysis history: {str(e)}")
+    
+    headers = {"X-Next-Cursor": page["next_cursor"]} if page["next_cursor"] else None
+    return FastJSONResponse(page["items"], headers=headers)
+
+@router.get("/genes/{gene_name}/regions")
+async def get_gene_matching_regions(
+    gene_name: str,
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: User = Depends(get_current_user_dependency),
+    results_store: ResultsStore = Depends(get_results_store)
+):
+    """Get the most recent regions of your samples that matched a resistance gene"""
+    try:
+        regions = await asyncio.to_thread(results_store.get_gene_matching_regions, current_user.id, gene_name, limit=limit)
+        return FastJSONResponse(regions)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching matching regions: {str(e)}")
+
+@router.get("/sequences/{sequence_hash}/results")
+async def get_sequence_results(
+    sequence_hash: str,
+    current_user: User = Depends(get_current_user_dependency),
+    results_store: ResultsStore = Depends(get_results_store)
+):
+    """
+    Check whether you have analyzed this exact genome before
+
+    - **sequence_hash**: SHA-256 hex digest of the FASTA file
+
+    Returns your earlier analyses of it, newest first, with the reference database
+    version and parameters each was run with; empty if it was never analyzed.
+    """
+    try:
+        results = await asyncio.to_thread(results_store.find_sequence_results, current_user.id, sequence_hash.lower())
+        return FastJSONResponse(results)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching sequence results: {str(e)}")
 
 @router.get("/history/{result_id}")
-async def get_analysis_result(result_id: str, current_user: User = Depends(get_current_user_dependency)):
-    """Get a specific analysis result"""
+async def get_analysis_result(
+    result_id: str,
+    current_user: User = Depends(get_current_user_dependency),
+    results_store: ResultsStore = Depends(get_results_store),
+    result_writer: Optional[ResultWriter] = Depends(get_result_writer)
+):
+    """Get one of your analysis results, including ones still waiting to be written to the store"""
     try:
-        return supabase_service.get_analysis_result(result_id)
+        result = None
+        # Checked first: a spooled result is only removed once the store has it
+        if result_writer is not None:
+            result = await asyncio.to_thread(result_writer.get_pending, current_user.id, result_id)
+        if result is None:
+            result = await asyncio.to_thread(results_store.get_analysis_result, current_user.id, result_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching analysis result: {str(e)}")
+    # Someone else's result is reported as missing, so IDs can't be probed
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Analysis result {result_id} not found")
+    return FastJSONResponse(result)
@@ -0,0 +1,66 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+from datetime import date, timedelta
+import asyncio
+from services.results_store import ResultsStore, period_start, surveillance_buckets
+from api.routes.auth import get_current_user_dependency, User
+from api.dependencies import get_results_store
+
+router = APIRouter()
+
+class SurveillanceBucket(BaseModel):
+    period_start: str
+    samples: int
+    genes: Dict[str, int]
+    resistance_status: Dict[str, int]
+
+class SurveillanceStatistics(BaseModel):
+    scope: str
+    scope_id: str
+    period: str
+    since: str
+    buckets: List[SurveillanceBucket]
+
+@router.get("/statistics", response_model=SurveillanceStatistics)
+async def get_surveillance_statistics(
+    scope: str = Query("user", pattern="^(user|institution)$"),
+    period: str = Query("week", pattern="^(day|week)$"),
+    since: Optional[date] = None,
+    current_user: User = Depends(get_current_user_dependency),
+    results_store: ResultsStore = Depends(get_results_store)
+):
+    """
+    Resistance surveillance counts per day or week
+
+    - **scope**: `user` for your own samples, `institution` for everyone at your institution
+    - **period**: `day` or `week` (weeks start on Monday)
+    - **since**: First date to include; defaults to the last 12 weeks or 30 days
+
+    Each bucket holds the number of samples, per-gene counts (divide by samples
+    for prevalence) and counts per resistance status. Counters are updated as
+    results are saved, so the response time doesn't grow with the history.
+    """
+    if scope == "institution":
+        if not current_user.institution:
+            raise HTTPException(status_code=400, detail="Your profile has no institution")
+        scope_id = current_user.institution
+    else:
+        scope_id = current_user.id
+
+    if since is None:
+        since = date.today() - (timedelta(weeks=12) if period == "week" else timedelta(days=30))
+    start = period_start(since.isoformat(), period)
+
+    try:
+        rows = await asyncio.to_thread(results_store.get_surveillance_counts, scope, scope_id, period, start)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching statistics: {str(e)}")
+
+    return {
+        "scope": scope,
+        "scope_id": scope_id,
+        "period": period,
+        "since": start,
+        "buckets": surveillance_buckets(rows)
+    }
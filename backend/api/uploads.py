@@ -0,0 +1,35 @@
+import shutil
+import asyncio
+from typing import BinaryIO
+from fastapi import UploadFile, HTTPException
+
+# Bytes copied at a time, so an upload is never held in memory whole
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+def check_upload_size(file: UploadFile, max_bytes: int) -> None:
+    """Reject an upload larger than max_bytes with 413; 0 allows any size"""
+    if max_bytes and file.size is not None and file.size > max_bytes:
+        raise HTTPException(
+            status_code=413,
+            detail=f"{file.filename} is {file.size / (1024 * 1024):.0f} MB, over the {max_bytes / (1024 * 1024):.0f} MB upload limit"
+        )
+
+async def save_upload(file: UploadFile, destination: BinaryIO, max_bytes: int = 0) -> int:
+    """
+    Copy an upload to a file in chunks, off the event loop
+
+    Args:
+        file: The upload, already spooled to disk by the multipart parser
+        destination: Binary file to write to
+        max_bytes: Largest upload accepted; 0 allows any size
+
+    Returns:
+        Number of bytes written
+
+    Raises:
+        HTTPException: 413 if the upload is larger than max_bytes
+    """
+    check_upload_size(file, max_bytes)
+    await file.seek(0)
+    await asyncio.to_thread(shutil.copyfileobj, file.file, destination, UPLOAD_CHUNK_SIZE)
+    return destination.tell()
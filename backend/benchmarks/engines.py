@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Benchmark the search and analysis engines
+
+Drives BlastService.run_blast (blastn), BlastService._run_direct_comparison and
+ResistanceAnalysisService.analyze_resistance over the bundled sample FASTA files
+and over synthetic inputs scaled from a single gene up to multi-megabase
+assemblies. Each case runs in a fresh interpreter so its peak RSS is its own,
+and reports latency percentiles, throughput and peak RSS (of the Python process
+and of blastn).
+
+Usage:
+    python benchmarks/engines.py
+    python benchmarks/engines.py --engines direct,analyze --sizes 1000,10000 --repeat 3
+    python benchmarks/engines.py --json engines.json
+    python benchmarks/engines.py --compare engines.json --max-regression 20   # exit 1 on regression
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional
+
+try:
+    import resource
+except ImportError:
+    # Windows: blastn's peak memory isn't measured there
+    resource = None
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(BACKEND_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+from synthetic import read_fasta, write_fasta, background, fragment, bundled_reference, default_reference
+
+ENGINES = ("blastn", "direct", "analyze")
+
+# Engine label each case should be served by; a blastn case served by direct_comparison fell back
+EXPECTED_ENGINE = {"blastn": "blastn", "direct": "direct_comparison", "analyze": "analyze"}
+
+# Synthetic assembly sizes in bp: a gene, a plasmid, a contig set, a genome, a large assembly
+DEFAULT_SIZES = [2_000, 20_000, 200_000, 2_800_000, 5_000_000]
+
+# Hits per analysis for the analyze engine
+DEFAULT_HIT_COUNTS = [10, 100, 1_000, 10_000]
+
+# Pairwise alignment is O(query x reference); larger inputs would take hours
+DEFAULT_DIRECT_MAX_BP = 5_000
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+def synthetic_assembly(genes: List[tuple], length: int, seed: int) -> List[tuple]:
+    """
+    Random background of `length` bp with the reference genes inserted unchanged
+
+    Contigs are at most 500 kb, so large inputs look like a draft assembly rather
+    than one huge record.
+    """
+    rng = random.Random(seed)
+    sequence = background(length, rng)
+    for _, gene in genes:
+        if len(gene) < length // 2:
+            position = rng.randrange(0, max(1, len(sequence) - len(gene)))
+            sequence = sequence[:position] + gene.upper() + sequence[position + len(gene):]
+
+    return [
+        (f"synthetic_{length}bp_contig{index + 1}", sequence[start:end])
+        for index, (start, end) in enumerate(fragment(sequence, 1, rng))
+    ]
+
+def reference_path(args) -> str:
+    """Reference FASTA to search against, built from the bundled gene samples if there is no database"""
+    if args.reference:
+        return os.path.abspath(args.reference)
+    return default_reference() or bundled_reference(os.path.join(args.work_dir, "bundled_reference.fasta"))
+
+def plan_cases(args, reference: str) -> List[Dict[str, Any]]:
+    """Every (engine, input) combination to run"""
+    samples = sorted(
+        os.path.join(REPO_DIR, name) for name in os.listdir(REPO_DIR)
+        if name.endswith((".fasta", ".fa", ".fna"))
+    )
+
+    cases = []
+    for engine in args.engines:
+        if engine == "analyze":
+            for hits in args.hit_counts:
+                cases.append({"engine": engine, "input": f"{hits}_hits", "hits": hits})
+            continue
+
+        inputs = [{"input": os.path.basename(path), "path": path} for path in samples]
+        inputs += [{"input": f"synthetic_{size}bp", "size": size} for size in args.sizes]
+        for item in inputs:
+            case = {"engine": engine, **item}
+            if engine == "direct":
+                bp = item.get("size") or sum(len(seq) for _, seq in read_fasta(item["path"]))
+                if bp > args.direct_max_bp:
+                    case["skip"] = f"{bp} bp exceeds --direct-max-bp"
+            cases.append(case)
+
+    for case in cases:
+        case.update(reference=reference, repeat=args.repeat, warmup=args.warmup, seed=args.seed, work_dir=args.work_dir)
+    return cases
+
+def run_case(case: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one case in this interpreter (called in a fresh child process)"""
+    import logging
+    logging.disable(logging.WARNING)
+    os.environ["GROQ_API_KEY"] = ""
+
+    from utils.config import Settings
+    from services.blast_service import BlastService
+    from services.resistance_analysis_service import ResistanceAnalysisService
+    from services.metrics import current_engine
+    from services.memory import MB, peak_rss_bytes
+
+    db_dir = os.path.join(case["work_dir"], f"db_{case['engine']}")
+    os.makedirs(db_dir, exist_ok=True)
+    shutil.copyfile(case["reference"], os.path.join(db_dir, "resistance_genes.fasta"))
+    os.environ["BLAST_DB_PATH"] = db_dir
+    settings = Settings()
+    genes = read_fasta(case["reference"])
+
+    bases = 0
+    if case["engine"] == "analyze":
+        from models.blast_model import BlastResult, BlastHit
+
+        rng = random.Random(case["seed"])
+        hits = [
+            BlastHit(
+                query_id="contig1", subject_id=rng.choice(genes)[0].split()[0],
+                percent_identity=rng.uniform(60, 100), alignment_length=1000, mismatches=10, gap_opens=0,
+                query_start=1, query_end=1000, subject_start=1, subject_end=1000, evalue=1e-50, bit_score=1800.0
+            )
+            for _ in range(case["hits"])
+        ]
+        blast_results = [BlastResult(query_id="contig1", query_length=2_800_000, hits=hits)]
+        service = ResistanceAnalysisService(settings)
+        run = lambda: service.analyze_resistance(blast_results)
+    else:
+        blast_service = BlastService(settings)
+        query = case.get("path")
+        if query is None:
+            query = os.path.join(case["work_dir"], f"synthetic_{case['size']}_{case['seed']}.fasta")
+            if not os.path.exists(query):
+                write_fasta(query, synthetic_assembly(genes, case["size"], case["seed"]))
+        bases = sum(len(seq) for _, seq in read_fasta(query))
+        fasta = os.path.join(db_dir, "resistance_genes.fasta")
+
+        if case["engine"] == "blastn":
+            if not (shutil.which("blastn") and shutil.which("makeblastdb")):
+                return {"skip": "blastn/makeblastdb not on PATH"}
+            if not os.path.exists(os.path.join(db_dir, "resistance_genes.nsq")):
+                blast_service.create_blast_db(fasta)
+            run = lambda: blast_service.run_blast(query)
+        else:
+            run = lambda: blast_service._run_direct_comparison(query, fasta)
+
+    for _ in range(case["warmup"]):
+        run()
+
+    latencies = []
+    hits_found = 0
+    for _ in range(case["repeat"]):
+        started = time.perf_counter()
+        result = run()
+        latencies.append(time.perf_counter() - started)
+        if case["engine"] != "analyze":
+            hits_found = sum(len(record.hits) for record in result)
+
+    median = statistics.median(latencies)
+    peak_rss = peak_rss_bytes()
+    peak_child_rss = None
+    if resource is not None:
+        # ru_maxrss is in KiB on Linux and bytes on macOS
+        rss_unit = 1024 * 1024 if sys.platform == "darwin" else 1024
+        peak_child_rss = round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / rss_unit, 1)
+    return {
+        "engine_used": current_engine() if case["engine"] != "analyze" else "analyze",
+        "bases": bases,
+        "hits": hits_found if case["engine"] != "analyze" else case["hits"],
+        "latency_s": {
+            "min": round(min(latencies), 6),
+            "p50": round(median, 6),
+            "p90": round(percentile(latencies, 90), 6),
+            "p99": round(percentile(latencies, 99), 6),
+            "max": round(max(latencies), 6)
+        },
+        "runs_per_s": round(1 / median, 3) if median else None,
+        "bases_per_s": round(bases / median) if bases and median else None,
+        "peak_rss_mb": round(peak_rss / MB, 1) if peak_rss is not None else None,
+        "peak_child_rss_mb": peak_child_rss
+    }
+
+def run_isolated(case: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+    """Run a case in a fresh interpreter and return its measurements"""
+    if case.get("skip"):
+        return {"skip": case["skip"]}
+
+    result_file = os.path.join(case["work_dir"], "case_result.json")
+    if os.path.exists(result_file):
+        os.remove(result_file)
+    try:
+        process = subprocess.run(
+            [sys.executable, "-W", "ignore", os.path.abspath(__file__), "--run-case", json.dumps(case), "--result-file", result_file],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True,
+            timeout=timeout
+        )
+    except subprocess.TimeoutExpired:
+        return {"error": f"timed out after {timeout}s"}
+
+    if process.returncode != 0 or not os.path.exists(result_file):
+        return {"error": process.stderr.strip()[-1000:] or f"exit status {process.returncode}"}
+    with open(result_file) as f:
+        return json.load(f)
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, max_regression: float) -> bool:
+    """
+    Print median latency changes against a previous --json run
+
+    Returns:
+        True if no case got slower by more than max_regression percent
+    """
+    with open(baseline_path) as f:
+        baseline = {(r["engine"], r["input"]): r for r in json.load(f)["results"]}
+
+    ok = True
+    print(f"\nCompared with {baseline_path}:")
+    for result in results:
+        before = baseline.get((result["engine"], result["input"]))
+        if not before or "latency_s" not in before or "latency_s" not in result:
+            continue
+        old, new = before["latency_s"]["p50"], result["latency_s"]["p50"]
+        change = (new - old) / old * 100 if old else 0.0
+        flag = ""
+        if change > max_regression:
+            flag = "  ❌ regression"
+            ok = False
+        print(f"  {result['engine']:8} {result['input']:32} {old:10.4f}s -> {new:10.4f}s ({change:+.1f}%){flag}")
+    return ok
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the BLAST, fallback and analysis engines")
+    parser.add_argument("--engines", default=",".join(ENGINES), help=f"Comma-separated subset of {', '.join(ENGINES)}")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="Synthetic input sizes in bp")
+    parser.add_argument("--hit-counts", default=",".join(map(str, DEFAULT_HIT_COUNTS)), help="Hits per analysis for the analyze engine")
+    parser.add_argument("--direct-max-bp", type=int, default=DEFAULT_DIRECT_MAX_BP, help="Largest input given to the direct comparison engine")
+    parser.add_argument("--reference", help="Reference FASTA (default: the BLAST database, else the bundled gene samples)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed runs per case")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for synthetic inputs")
+    parser.add_argument("--timeout", type=float, default=1800, help="Seconds before a case is abandoned")
+    parser.add_argument("--work-dir", help="Directory for generated inputs (default: a temporary directory)")
+    parser.add_argument("--json", dest="json_path", help="Write machine-readable results to this file")
+    parser.add_argument("--compare", help="Previous --json results to compare against")
+    parser.add_argument("--max-regression", type=float, default=25.0, help="Percent slowdown that fails --compare")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_case:
+        result = run_case(json.loads(args.run_case))
+        with open(args.result_file, "w") as f:
+            json.dump(result, f)
+        return 0
+
+    args.engines = [engine.strip() for engine in args.engines.split(",") if engine.strip()]
+    unknown = set(args.engines) - set(ENGINES)
+    if unknown:
+        parser.error(f"Unknown engines: {', '.join(sorted(unknown))}")
+    args.sizes = [int(size) for size in args.sizes.split(",") if size]
+    args.hit_counts = [int(count) for count in args.hit_counts.split(",") if count]
+
+    cleanup = args.work_dir is None
+    args.work_dir = os.path.abspath(args.work_dir or tempfile.mkdtemp(prefix="mrsa_bench_"))
+    os.makedirs(args.work_dir, exist_ok=True)
+
+    try:
+        reference = reference_path(args)
+        print(f"Reference: {reference}")
+
+        results = []
+        for case in plan_cases(args, reference):
+            measured = run_isolated(case, args.timeout)
+            result = {"engine": case["engine"], "input": case["input"], **measured}
+            results.append(result)
+
+            if "skip" in result:
+                print(f"{case['engine']:8} {case['input']:32} skipped: {result['skip']}")
+            elif "error" in result:
+                print(f"{case['engine']:8} {case['input']:32} error: {result['error'].splitlines()[-1]}")
+            else:
+                latency = result["latency_s"]
+                throughput = f"{result['bases_per_s']:,} bp/s" if result["bases_per_s"] else f"{result['runs_per_s']} runs/s"
+                fallback = "" if result["engine_used"] == EXPECTED_ENGINE[case["engine"]] else f" (ran {result['engine_used']})"
+                print(
+                    f"{case['engine']:8} {case['input']:32} p50 {latency['p50']:.4f}s p90 {latency['p90']:.4f}s "
+                    f"p99 {latency['p99']:.4f}s  {throughput}  rss {result['peak_rss_mb']} MB"
+                    f"{' / blastn ' + str(result['peak_child_rss_mb']) + ' MB' if case['engine'] == 'blastn' else ''}{fallback}"
+                )
+
+        if args.json_path:
+            with open(args.json_path, "w") as f:
+                json.dump({
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "git_commit": git_commit(),
+                    "python": sys.version,
+                    "platform": platform.platform(),
+                    "cpu_count": os.cpu_count(),
+                    "blastn": shutil.which("blastn"),
+                    "reference": reference,
+                    "settings": {"repeat": args.repeat, "warmup": args.warmup, "seed": args.seed},
+                    "results": results
+                }, f, indent=2)
+            print(f"Results written to {args.json_path}")
+
+        if args.compare and not compare(results, args.compare, args.max_regression):
+            print(f"❌ Median latency regressed by more than {args.max_regression}%")
+            return 1
+
+        return 0
+    finally:
+        if cleanup:
+            shutil.rmtree(args.work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark import (startup) cost of the API process and CLI scripts
+
+Each target module is imported in a fresh interpreter with `-X importtime`,
+several times, and the median cumulative import time is reported together
+with the slowest nested imports and any heavy dependencies that were
+pulled in eagerly.
+
+Usage:
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py main rebuild_blast_db --runs 10 --json import_time.json
+    python benchmarks/import_time.py --max-ms 1500   # exit 1 if any target is slower
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from typing import List, Dict, Any
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_TARGETS = ["main", "rebuild_blast_db", "services.blast_service", "services.supabase_service"]
+
+# Dependencies that should only be loaded on first use
+HEAVY_MODULES = ["Bio", "supabase", "postgrest", "gotrue", "httpx", "requests", "numpy", "pandas"]
+
+def parse_importtime(stderr: str) -> Dict[str, int]:
+    """
+    Parse `-X importtime` output into cumulative microseconds per module
+
+    Args:
+        stderr: stderr of the child interpreter
+
+    Returns:
+        Mapping of module name to cumulative import time in microseconds
+    """
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        try:
+            _, cum_us, name = line[len("import time:"):].split("|")
+            cumulative[name.strip()] = int(cum_us)
+        except ValueError:
+            continue
+    return cumulative
+
+def measure(target: str) -> Dict[str, int]:
+    """Import a target module once in a fresh interpreter"""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-W", "ignore", "-c", f"import {target}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"Importing {target} failed:\n{process.stderr[-2000:]}")
+    return parse_importtime(process.stderr)
+
+def benchmark(target: str, runs: int) -> Dict[str, Any]:
+    """
+    Benchmark the import time of a module
+
+    Args:
+        target: Dotted module name relative to the backend directory
+        runs: Number of fresh-interpreter imports
+
+    Returns:
+        Summary with median/min/max total time, slowest imports and eager heavy modules
+    """
+    samples = [measure(target) for _ in range(runs)]
+    totals_ms = [sample.get(target, 0) / 1000 for sample in samples]
+
+    # Slowest modules by cumulative time in the last run
+    last = samples[-1]
+    slowest = sorted(last.items(), key=lambda item: item[1], reverse=True)[:10]
+
+    return {
+        "target": target,
+        "runs": runs,
+        "median_ms": round(statistics.median(totals_ms), 1),
+        "min_ms": round(min(totals_ms), 1),
+        "max_ms": round(max(totals_ms), 1),
+        "slowest_imports_ms": {name: round(us / 1000, 1) for name, us in slowest},
+        "eager_heavy_modules": sorted(m for m in HEAVY_MODULES if m in last)
+    }
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark import-time startup cost")
+    parser.add_argument("targets", nargs="*", default=DEFAULT_TARGETS, help="Modules to import")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh-interpreter imports per target")
+    parser.add_argument("--json", dest="json_path", help="Write machine-readable results to this file")
+    parser.add_argument("--max-ms", type=float, help="Fail if any target's median exceeds this")
+    args = parser.parse_args(argv)
+
+    results = []
+    for target in args.targets:
+        result = benchmark(target, args.runs)
+        results.append(result)
+
+        print(f"{target}: median {result['median_ms']} ms (min {result['min_ms']}, max {result['max_ms']})")
+        if result["eager_heavy_modules"]:
+            print(f"  eagerly imports: {', '.join(result['eager_heavy_modules'])}")
+        nested = [(name, ms) for name, ms in result["slowest_imports_ms"].items() if name != target]
+        for name, ms in nested[:5]:
+            print(f"  {ms:>8} ms  {name}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"python": sys.version, "results": results}, f, indent=2)
+        print(f"Results written to {args.json_path}")
+
+    if args.max_ms is not None and any(r["median_ms"] > args.max_ms for r in results):
+        print(f"❌ Import time budget of {args.max_ms} ms exceeded")
+        return 1
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+Load-test the HTTP API with stand-in Supabase and Groq backends
+
+Starts the FastAPI app in a uvicorn subprocess whose SupabaseService and
+GroqService are replaced by the in-process stand-ins of standins.py (configurable
+latency and failure injection), then drives it with a mix of FASTA uploads to
+/api/analyze and history reads from a pool of concurrent clients. Reports
+throughput, latency percentiles, status codes and error rates, together with the
+server's CPU, peak RSS and thread count sampled while the load ran. The rest of
+the configuration (admission limits, write-behind, BLAST database, ...) comes
+from the environment as for a normal server.
+
+Usage:
+    python benchmarks/loadtest.py
+    python benchmarks/loadtest.py --concurrency 16 --duration 60 --supabase-latency-ms 40 --groq-latency-ms 800
+    python benchmarks/loadtest.py --mix "mecA_gene_sample.fasta:3,random_dna_sample.fasta:1,synthetic:20000:1" --unique-ratio 1
+    python benchmarks/loadtest.py --supabase-failure-rate 0.05 --json load.json
+    python benchmarks/loadtest.py --url http://localhost:8000 --token <access token>   # existing server, no stand-ins
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import signal
+import shutil
+import socket
+import asyncio
+import argparse
+import tempfile
+import threading
+import subprocess
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(BACKEND_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+from synthetic import read_fasta, bundled_reference, default_reference, background
+from engines import percentile, synthetic_assembly
+
+# Statuses that mean the server shed the request rather than failed it
+REJECTED_STATUSES = (429, 503)
+
+def serve(args) -> int:
+    """Run the app with stand-in backends until SIGTERM (the --serve child process)"""
+    import uvicorn
+    from utils.config import Settings
+    from services.container import ServiceContainer
+    from standins import BackendProfile, StandInSupabaseService, StandInGroqService
+    from main import app
+
+    settings = Settings()
+    supabase_backend = BackendProfile(args.supabase_latency_ms, args.supabase_jitter_ms, args.supabase_failure_rate, args.seed)
+    groq_backend = BackendProfile(args.groq_latency_ms, args.groq_jitter_ms, args.groq_failure_rate, args.seed)
+
+    supabase_service = StandInSupabaseService(settings, db_path=os.path.join(args.work_dir, "standin.db"), profile=supabase_backend)
+    services = ServiceContainer(settings, supabase_service=supabase_service)
+    services.analysis_service.groq_service = StandInGroqService(settings, profile=groq_backend)
+    app.state.services = services
+    services.start()
+    services.warmup()
+
+    # The lifespan would build its own container, so the services are managed here
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, lifespan="off", log_level="warning"))
+    try:
+        server.run()
+    finally:
+        services.stop()
+        with open(os.path.join(args.work_dir, "backends.json"), "w") as f:
+            json.dump({"supabase": supabase_backend.stats(), "groq": groq_backend.stats()}, f)
+    return 0
+
+class ProcessMonitor:
+    """Samples a process's CPU time, RSS and thread count from /proc"""
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        self.pid = pid
+        self.interval = interval
+        self.samples: List[Dict[str, float]] = []
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="process-monitor", daemon=True)
+        self._ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> Dict[str, Any]:
+        self._stopping.set()
+        self._thread.join()
+        if len(self.samples) < 2:
+            return {"available": False}
+
+        first, last = self.samples[0], self.samples[-1]
+        elapsed = last["time"] - first["time"]
+        cpu = last["cpu_seconds"] - first["cpu_seconds"]
+        return {
+            "available": True,
+            "cpu_seconds": round(cpu, 2),
+            "cpu_percent_avg": round(cpu / elapsed * 100, 1) if elapsed else None,
+            "cpu_percent_peak": round(max(
+                (b["cpu_seconds"] - a["cpu_seconds"]) / (b["time"] - a["time"]) * 100
+                for a, b in zip(self.samples, self.samples[1:]) if b["time"] > a["time"]
+            ), 1),
+            "rss_mb_peak": round(max(sample["rss_kb"] for sample in self.samples) / 1024, 1),
+            "rss_mb_end": round(last["rss_kb"] / 1024, 1),
+            "threads_peak": max(sample["threads"] for sample in self.samples)
+        }
+
+    def _sample(self) -> Optional[Dict[str, float]]:
+        try:
+            with open(f"/proc/{self.pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            with open(f"/proc/{self.pid}/status") as f:
+                status = dict(line.split(":", 1) for line in f if ":" in line)
+        except OSError:
+            return None
+        return {
+            "time": time.monotonic(),
+            # utime and stime, plus the CPU of waited-for children such as blastn
+            "cpu_seconds": sum(int(value) for value in fields[11:15]) / self._ticks,
+            "rss_kb": int(status["VmRSS"].split()[0]),
+            "threads": int(status["Threads"])
+        }
+
+    def _loop(self) -> None:
+        while not self._stopping.is_set():
+            sample = self._sample()
+            if sample is not None:
+                self.samples.append(sample)
+            self._stopping.wait(self.interval)
+        sample = self._sample()
+        if sample is not None:
+            self.samples.append(sample)
+
+def parse_mix(value: str, work_dir: str, seed: int) -> List[Tuple[str, bytes, float]]:
+    """
+    Upload mix as (filename, content, weight)
+
+    Entries are "<file>:<weight>" with the file relative to the repository root or
+    absolute, or "synthetic:<bp>:<weight>" for a generated assembly of that size.
+    """
+    if not value:
+        value = ",".join(
+            f"{name}:1" for name in sorted(os.listdir(REPO_DIR)) if name.endswith((".fasta", ".fa", ".fna"))
+        )
+
+    reference = default_reference() or bundled_reference(os.path.join(work_dir, "bundled_reference.fasta"))
+    mix = []
+    for entry in filter(None, (part.strip() for part in value.split(","))):
+        parts = entry.split(":")
+        if parts[0] == "synthetic":
+            size = int(parts[1])
+            weight = float(parts[2]) if len(parts) > 2 else 1.0
+            records = synthetic_assembly(read_fasta(reference), size, seed)
+            content = "".join(f">{header}\n{sequence}\n" for header, sequence in records).encode()
+            mix.append((f"synthetic_{size}bp.fasta", content, weight))
+        else:
+            weight = float(parts[1]) if len(parts) > 1 else 1.0
+            path = parts[0] if os.path.isabs(parts[0]) else os.path.join(REPO_DIR, parts[0])
+            with open(path, "rb") as f:
+                mix.append((os.path.basename(path), f.read(), weight))
+    return mix
+
+async def run_load(args, base_url: str, mix: List[Tuple[str, bytes, float]]) -> List[Dict[str, Any]]:
+    """Closed-loop load: each client sends its next request as soon as the previous one finishes"""
+    import httpx
+
+    rng = random.Random(args.seed)
+    weights = [weight for _, _, weight in mix]
+    records: List[Dict[str, Any]] = []
+    issued = 0
+    deadline = time.monotonic() + args.duration if args.duration else None
+
+    def next_request() -> Optional[Dict[str, Any]]:
+        nonlocal issued
+        if (args.requests and issued >= args.requests) or (deadline and time.monotonic() >= deadline):
+            return None
+        issued += 1
+        token = args.token or f"loadtest-user{rng.randrange(args.users)}"
+        if rng.random() < args.history_ratio:
+            return {"kind": "history", "token": token}
+        name, content, _ = rng.choices(mix, weights=weights)[0]
+        if rng.random() < args.unique_ratio:
+            # A never-seen record makes the upload a new sequence, bypassing stored-result reuse
+            content += f">loadtest_{issued}\n{background(60, rng)}\n".encode()
+        return {"kind": "analyze", "token": token, "name": name, "content": content}
+
+    async def client_loop(client) -> None:
+        while True:
+            request = next_request()
+            if request is None:
+                return
+            headers = {"Authorization": f"Bearer {request['token']}"}
+            started = time.perf_counter()
+            status, error = None, None
+            try:
+                if request["kind"] == "analyze":
+                    response = await client.post(
+                        "/api/analyze",
+                        files={"file": (request["name"], request["content"], "application/octet-stream")},
+                        headers=headers
+                    )
+                else:
+                    response = await client.get("/api/history", params={"limit": 20}, headers=headers)
+                status = response.status_code
+                if status >= 400:
+                    error = response.text[:200]
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            records.append({
+                "kind": request["kind"],
+                "status": status,
+                "latency_s": time.perf_counter() - started,
+                "error": error,
+                "finished": time.monotonic()
+            })
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        await asyncio.gather(*(client_loop(client) for _ in range(args.concurrency)))
+    return records
+
+def summarize(records: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    """Throughput, latency percentiles, status codes and error rates, overall and per request kind"""
+    def stats(subset: List[Dict[str, Any]]) -> Dict[str, Any]:
+        if not subset:
+            return {"requests": 0}
+        latencies = [record["latency_s"] for record in subset]
+        ok = [record for record in subset if record["status"] is not None and record["status"] < 400]
+        rejected = [record for record in subset if record["status"] in REJECTED_STATUSES]
+        statuses: Dict[str, int] = {}
+        for record in subset:
+            key = str(record["status"]) if record["status"] is not None else "transport_error"
+            statuses[key] = statuses.get(key, 0) + 1
+        return {
+            "requests": len(subset),
+            "throughput_rps": round(len(subset) / elapsed, 3) if elapsed else None,
+            "ok_rps": round(len(ok) / elapsed, 3) if elapsed else None,
+            "error_rate": round((len(subset) - len(ok) - len(rejected)) / len(subset), 4),
+            "rejected_rate": round(len(rejected) / len(subset), 4),
+            "statuses": statuses,
+            "latency_s": {
+                "p50": round(percentile(latencies, 50), 4),
+                "p90": round(percentile(latencies, 90), 4),
+                "p99": round(percentile(latencies, 99), 4),
+                "max": round(max(latencies), 4)
+            }
+        }
+
+    summary = {"overall": stats(records)}
+    for kind in sorted({record["kind"] for record in records}):
+        summary[kind] = stats([record for record in records if record["kind"] == kind])
+
+    errors: Dict[str, int] = {}
+    for record in records:
+        if record["error"] and record["status"] not in REJECTED_STATUSES:
+            errors[record["error"]] = errors.get(record["error"], 0) + 1
+    summary["top_errors"] = sorted(errors.items(), key=lambda item: -item[1])[:5]
+    return summary
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_until_ready(base_url: str, process: Optional[subprocess.Popen], timeout: float) -> bool:
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            return False
+        try:
+            if httpx.get(f"{base_url}/health/ready", timeout=2).status_code == 200:
+                return True
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    return False
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test the HTTP API with stand-in Supabase and Groq backends")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run (0 to stop after --requests only)")
+    parser.add_argument("--requests", type=int, default=0, help="Stop after this many requests (0 for no limit)")
+    parser.add_argument("--mix", default="", help="Uploads as <file>:<weight> or synthetic:<bp>:<weight> (default: the bundled samples)")
+    parser.add_argument("--unique-ratio", type=float, default=0.5, help="Fraction of uploads made unique so they can't reuse stored results")
+    parser.add_argument("--history-ratio", type=float, default=0.1, help="Fraction of requests that read /api/history")
+    parser.add_argument("--users", type=int, default=20, help="Distinct users the requests are spread over")
+    parser.add_argument("--timeout", type=float, default=300, help="Client timeout per request in seconds")
+    parser.add_argument("--supabase-latency-ms", type=float, default=20, help="Mean latency of each Supabase call")
+    parser.add_argument("--supabase-jitter-ms", type=float, default=5, help="Standard deviation of the Supabase latency")
+    parser.add_argument("--supabase-failure-rate", type=float, default=0.0, help="Probability that a Supabase call fails")
+    parser.add_argument("--groq-latency-ms", type=float, default=600, help="Mean latency of each Groq call")
+    parser.add_argument("--groq-jitter-ms", type=float, default=150, help="Standard deviation of the Groq latency")
+    parser.add_argument("--groq-failure-rate", type=float, default=0.0, help="Probability that a Groq call fails")
+    parser.add_argument("--url", help="Load an already running server instead (no stand-ins or server resource usage)")
+    parser.add_argument("--token", help="Access token for --url (default: stand-in tokens)")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for the request mix and injected latency")
+    parser.add_argument("--json", dest="json_path", help="Write machine-readable results to this file")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--work-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        return serve(args)
+    if not (args.duration or args.requests):
+        parser.error("Set --duration or --requests")
+
+    cleanup = args.work_dir is None
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="mrsa_load_")
+    mix = parse_mix(args.mix, work_dir, args.seed)
+
+    process = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        env = dict(
+            os.environ,
+            RESULTS_STORE="supabase",
+            JOB_DB_PATH=os.path.join(work_dir, "jobs.db"),
+            JOB_SPOOL_DIR=os.path.join(work_dir, "job_uploads"),
+            RESULT_SPOOL_PATH=os.path.join(work_dir, "result_spool.db"),
+            TRACE_EXPORTERS=""
+        )
+        if default_reference() is None:
+            # No reference database configured: serve the bundled gene panel
+            db_dir = os.path.join(work_dir, "blast_db")
+            os.makedirs(db_dir, exist_ok=True)
+            shutil.copyfile(os.path.join(work_dir, "bundled_reference.fasta"), os.path.join(db_dir, "resistance_genes.fasta"))
+            env["BLAST_DB_PATH"] = db_dir
+        command = [sys.executable, os.path.abspath(__file__), *(argv if argv is not None else sys.argv[1:]),
+                   "--serve", "--port", str(port), "--work-dir", work_dir]
+        log = open(os.path.join(work_dir, "server.log"), "w")
+        process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+    try:
+        if not wait_until_ready(base_url, process, timeout=300):
+            print(f"❌ Server at {base_url} did not become ready" + (f"; see {work_dir}/server.log" if process else ""))
+            return 1
+
+        print(f"Loading {base_url} with {args.concurrency} clients: {', '.join(f'{name} x{weight:g}' for name, _, weight in mix)}")
+        monitor = ProcessMonitor(process.pid) if process is not None else None
+        if monitor:
+            monitor.start()
+        started = time.monotonic()
+        records = asyncio.run(run_load(args, base_url, mix))
+        elapsed = time.monotonic() - started
+        server = monitor.stop() if monitor else {"available": False}
+
+        try:
+            import httpx
+            queues = httpx.get(f"{base_url}/metrics/queues", timeout=5).json()
+        except Exception:
+            queues = None
+    finally:
+        if process is not None:
+            process.send_signal(signal.SIGTERM)
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    summary = summarize(records, elapsed)
+    backends = None
+    if process is not None and os.path.exists(os.path.join(work_dir, "backends.json")):
+        with open(os.path.join(work_dir, "backends.json")) as f:
+            backends = json.load(f)
+
+    print(f"\n{len(records)} requests in {elapsed:.1f}s")
+    for kind in [key for key in summary if key not in ("top_errors",)]:
+        stats = summary[kind]
+        if not stats["requests"]:
+            continue
+        latency = stats["latency_s"]
+        print(
+            f"  {kind:8} {stats['requests']:6} req  {stats['throughput_rps']:8.2f} req/s  "
+            f"p50 {latency['p50']:.3f}s p90 {latency['p90']:.3f}s p99 {latency['p99']:.3f}s max {latency['max']:.3f}s  "
+            f"errors {stats['error_rate'] * 100:.1f}%  rejected {stats['rejected_rate'] * 100:.1f}%"
+        )
+    for error, count in summary["top_errors"]:
+        print(f"  {count:6} x {error}")
+    if server["available"]:
+        print(
+            f"  server   cpu {server['cpu_seconds']}s (avg {server['cpu_percent_avg']}%, peak {server['cpu_percent_peak']}%)  "
+            f"rss peak {server['rss_mb_peak']} MB  threads peak {server['threads_peak']}"
+        )
+    if backends:
+        print("  backends " + "  ".join(f"{name}: {stats['calls']} calls, {stats['failures']} failed" for name, stats in backends.items()))
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "url": base_url,
+                "settings": {
+                    key: value for key, value in vars(args).items()
+                    if key not in ("serve", "port", "work_dir", "json_path", "token")
+                },
+                "mix": [{"file": name, "bytes": len(content), "weight": weight} for name, content, weight in mix],
+                "elapsed_s": round(elapsed, 3),
+                "summary": summary,
+                "server": server,
+                "backends": backends,
+                "queues": queues
+            }, f, indent=2)
+        print(f"Results written to {args.json_path}")
+
+    if cleanup:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Measure what each search engine and parameter set costs in detection
+
+Generates synthetic isolates (see synthetic.py) over a grid of identity levels,
+indel rates, fragmentation and orientations, runs every engine and parameter set
+over them followed by the resistance analysis, and scores the identified genes
+against the truth: a panel gene should be called when it was inserted at or above
+its significance_threshold. Sensitivity and specificity are reported next to the
+runtime, overall and broken down by each mutation model parameter.
+
+Usage:
+    python benchmarks/sensitivity.py
+    python benchmarks/sensitivity.py --engines blastn --param-sets "evalue=1e-10,max_hits=10;evalue=1e-5,max_hits=50"
+    python benchmarks/sensitivity.py --identities 95,85,75,65 --replicates 3 --json sensitivity.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import List, Dict, Any
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from synthetic import write_fasta, add_grid_arguments, grid_from_args, analysis_service
+
+ENGINES = ("blastn", "direct")
+
+# Engine label each run should be served by; a blastn run served by direct_comparison fell back
+EXPECTED_ENGINE = {"blastn": "blastn", "direct": "direct_comparison"}
+
+# Mutation model parameters each engine's sensitivity is broken down by
+DIMENSIONS = ("identity", "indel_rate", "contigs", "orientation")
+
+_blast_service = None
+
+def parse_param_sets(value: str) -> List[Dict[str, Any]]:
+    """"evalue=1e-10,max_hits=10;evalue=1e-5" -> [{"evalue": 1e-10, "max_hits": 10}, {"evalue": 1e-5}]"""
+    param_sets = []
+    for group in filter(None, (part.strip() for part in value.split(";"))):
+        params = {}
+        for pair in filter(None, (part.strip() for part in group.split(","))):
+            key, _, raw = pair.partition("=")
+            if key not in ("evalue", "max_hits"):
+                raise ValueError(f"Unknown search parameter: {key}")
+            params[key] = int(raw) if key == "max_hits" else float(raw)
+        param_sets.append(params)
+    return param_sets or [{}]
+
+def run_isolate(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Search and analyze one isolate and score the identified genes (runs in a worker process)"""
+    global _blast_service
+    if _blast_service is None:
+        import logging
+        logging.disable(logging.WARNING)
+        from utils.config import Settings
+        from services.blast_service import BlastService
+        _blast_service = BlastService(Settings())
+    from services.metrics import current_engine
+
+    params = task["params"]
+    started = time.perf_counter()
+    if task["engine"] == "blastn":
+        blast_results = _blast_service.run_blast(task["path"], **params)
+    else:
+        blast_results = _blast_service._run_direct_comparison(task["path"], task["reference"], **params)
+    search_seconds = time.perf_counter() - started
+    called = set(analysis_service().analyze_resistance(blast_results).identified_genes)
+    seconds = time.perf_counter() - started
+
+    outcomes = {}
+    for gene, truth in task["truth"]["genes"].items():
+        if truth["expected"]:
+            outcomes[gene] = "tp" if gene in called else "fn"
+        else:
+            outcomes[gene] = "fp" if gene in called else "tn"
+
+    return {
+        "isolate": task["truth"]["isolate"],
+        "engine_used": current_engine(),
+        "search_seconds": round(search_seconds, 6),
+        "seconds": round(seconds, 6),
+        "outcomes": outcomes
+    }
+
+def rates(outcomes: List[str]) -> Dict[str, Any]:
+    counts = {key: outcomes.count(key) for key in ("tp", "fn", "fp", "tn")}
+    positives, negatives = counts["tp"] + counts["fn"], counts["tn"] + counts["fp"]
+    return {
+        **counts,
+        "sensitivity": round(counts["tp"] / positives, 4) if positives else None,
+        "specificity": round(counts["tn"] / negatives, 4) if negatives else None
+    }
+
+def summarize(runs: List[Dict[str, Any]], truths: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Confusion counts, rates and runtime for one engine and parameter set"""
+    seconds = [run["seconds"] for run in runs]
+    bases = sum(truths[run["isolate"]]["bases"] for run in runs)
+    summary = {
+        **rates([outcome for run in runs for outcome in run["outcomes"].values()]),
+        "isolates": len(runs),
+        "engines_used": sorted({run["engine_used"] for run in runs}),
+        "seconds_p50": round(statistics.median(seconds), 4),
+        "seconds_total": round(sum(seconds), 3),
+        "bases_per_s": round(bases / sum(seconds)) if sum(seconds) else None,
+        "by_gene": {},
+        "by": {}
+    }
+
+    genes = sorted({gene for run in runs for gene in run["outcomes"]})
+    for gene in genes:
+        summary["by_gene"][gene] = rates([run["outcomes"][gene] for run in runs if gene in run["outcomes"]])
+
+    for dimension in DIMENSIONS:
+        levels = sorted({truths[run["isolate"]][dimension] for run in runs}, key=str)
+        summary["by"][dimension] = {
+            str(level): rates([
+                outcome for run in runs if truths[run["isolate"]][dimension] == level
+                for outcome in run["outcomes"].values()
+            ])
+            for level in levels
+        }
+    return summary
+
+def format_rate(value) -> str:
+    return "  n/a" if value is None else f"{value * 100:5.1f}%"
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Sensitivity and specificity of each engine and parameter set on synthetic isolates")
+    parser.add_argument("--engines", default=",".join(ENGINES), help=f"Comma-separated subset of {', '.join(ENGINES)}")
+    parser.add_argument("--param-sets", default="evalue=1e-10,max_hits=10", help="Semicolon-separated search parameter sets (evalue, max_hits)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Isolates searched in parallel")
+    parser.add_argument("--work-dir", help="Directory for generated isolates (default: a temporary directory)")
+    parser.add_argument("--json", dest="json_path", help="Write machine-readable results to this file")
+    add_grid_arguments(parser)
+    args = parser.parse_args(argv)
+
+    engines = [engine.strip() for engine in args.engines.split(",") if engine.strip()]
+    unknown = set(engines) - set(ENGINES)
+    if unknown:
+        parser.error(f"Unknown engines: {', '.join(sorted(unknown))}")
+    try:
+        param_sets = parse_param_sets(args.param_sets)
+    except ValueError as e:
+        parser.error(str(e))
+
+    cleanup = args.work_dir is None
+    work_dir = os.path.abspath(args.work_dir or tempfile.mkdtemp(prefix="mrsa_sensitivity_"))
+    os.makedirs(work_dir, exist_ok=True)
+
+    try:
+        try:
+            reference, grid = grid_from_args(args, work_dir)
+        except ValueError as e:
+            parser.error(str(e))
+
+        truths = {}
+        for records, truth in grid:
+            truth["path"] = os.path.join(work_dir, f"{truth['isolate']}.fasta")
+            write_fasta(truth["path"], records)
+            truths[truth["isolate"]] = truth
+        print(f"Panel: {reference}")
+        print(f"Isolates: {len(truths)} ({args.background_bp} bp background)")
+
+        # The workers search a private database directory holding the panel
+        db_dir = os.path.join(work_dir, "blast_db")
+        os.makedirs(db_dir, exist_ok=True)
+        db_fasta = os.path.join(db_dir, "resistance_genes.fasta")
+        shutil.copyfile(reference, db_fasta)
+        os.environ["BLAST_DB_PATH"] = db_dir
+        os.environ["GROQ_API_KEY"] = ""
+
+        if "blastn" in engines:
+            if shutil.which("blastn") and shutil.which("makeblastdb"):
+                from utils.config import Settings
+                from services.blast_service import BlastService
+                BlastService(Settings()).create_blast_db(db_fasta)
+            else:
+                print("blastn   skipped: blastn/makeblastdb not on PATH")
+                engines.remove("blastn")
+
+        results = []
+        with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+            for engine in engines:
+                for params in param_sets:
+                    tasks = [
+                        {"engine": engine, "params": params, "path": truth["path"], "reference": db_fasta, "truth": truth}
+                        for truth in truths.values()
+                    ]
+                    runs = list(pool.map(run_isolate, tasks))
+                    summary = summarize(runs, truths)
+                    results.append({"engine": engine, "params": params, **summary, "runs": runs})
+
+                    label = ",".join(f"{key}={value:g}" for key, value in params.items()) or "defaults"
+                    print(
+                        f"\n{engine:8} {label}: sensitivity {format_rate(summary['sensitivity'])} "
+                        f"specificity {format_rate(summary['specificity'])}  "
+                        f"p50 {summary['seconds_p50']:.3f}s/isolate  total {summary['seconds_total']:.1f}s"
+                        f"{'' if summary['engines_used'] == [EXPECTED_ENGINE[engine]] else '  (ran ' + ', '.join(summary['engines_used']) + ')'}"
+                    )
+                    for gene, gene_rates in summary["by_gene"].items():
+                        print(f"    {gene:8} sensitivity {format_rate(gene_rates['sensitivity'])} specificity {format_rate(gene_rates['specificity'])}")
+                    for dimension, levels in summary["by"].items():
+                        cells = "  ".join(
+                            f"{level}: {format_rate(level_rates['sensitivity'])}/{format_rate(level_rates['specificity'])}"
+                            for level, level_rates in levels.items()
+                        )
+                        print(f"    {dimension:12} {cells}")
+
+        if args.json_path:
+            with open(args.json_path, "w") as f:
+                json.dump({
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "reference": reference,
+                    "grid": {
+                        "identities": args.identities,
+                        "indel_rates": args.indel_rates,
+                        "contigs": args.contigs,
+                        "orientations": args.orientations,
+                        "background_bp": args.background_bp,
+                        "replicates": args.replicates,
+                        "seed": args.seed
+                    },
+                    "isolates": [{key: value for key, value in truth.items() if key != "path"} for truth in truths.values()],
+                    "results": results
+                }, f, indent=2)
+            print(f"\nResults written to {args.json_path}")
+
+        return 0
+    finally:
+        if cleanup:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    sys.exit(main())
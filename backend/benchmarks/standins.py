@@ -0,0 +1,179 @@
+"""
+In-process stand-ins for the Supabase and Groq backends
+
+They run the application's real code paths (token and profile caches, content
+deduplication, write-behind) against local storage, adding a configurable
+latency and failure rate to every call that would cross the network. Used by
+loadtest.py; nothing here is imported by the application.
+"""
+
+import time
+import random
+import threading
+from typing import List, Dict, Any, Optional
+from utils.config import Settings
+from services.supabase_service import SupabaseService
+from services.groq_service import GroqService
+from services.sqlite_store import SQLiteResultsStore
+
+# Access tokens the Supabase stand-in accepts are this prefix plus a user name or email
+TOKEN_PREFIX = "loadtest-"
+
+class InjectedFailure(Exception):
+    """Error raised by a stand-in to simulate a backend failure"""
+
+class BackendProfile:
+    """Latency and failure model of one backend"""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, failure_rate: float = 0.0, seed: Optional[int] = None):
+        """
+        Args:
+            latency_ms: Mean added latency per call
+            jitter_ms: Standard deviation of the added latency
+            failure_rate: Probability (0-1) that a call fails after its latency
+            seed: Seed for reproducible latency and failures
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self.failures = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def call(self, operation: str) -> None:
+        """Sleep for one call's latency, then raise InjectedFailure if it is chosen to fail"""
+        with self._lock:
+            delay = max(0.0, self._rng.gauss(self.latency_ms, self.jitter_ms)) if self.jitter_ms else self.latency_ms
+            failed = self._rng.random() < self.failure_rate
+            self.calls += 1
+            self.failures += failed
+        if delay:
+            time.sleep(delay / 1000)
+        if failed:
+            raise InjectedFailure(f"Injected failure in {operation}")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"calls": self.calls, "failures": self.failures}
+
+class StandInSupabaseService(SupabaseService):
+    """SupabaseService whose auth and tables are served from a local SQLite store"""
+
+    def __init__(self, settings: Optional[Settings] = None, db_path: str = "data/loadtest_results.db", profile: Optional[BackendProfile] = None):
+        """
+        Args:
+            settings: Application settings; SUPABASE_URL and SUPABASE_KEY are ignored
+            db_path: SQLite file holding the stand-in tables
+            profile: Latency and failures added to every call
+        """
+        settings = settings or Settings()
+        settings.SUPABASE_URL = settings.SUPABASE_KEY = ""
+        settings.SUPABASE_JWT_SECRET = settings.SUPABASE_JWKS_URL = ""
+        super().__init__(settings)
+
+        self.backend = BackendProfile() if profile is None else profile
+        self.store = SQLiteResultsStore(db_path, pool_size=settings.RESULTS_DB_POOL_SIZE)
+        # Stands in for the client, so the container enables write-behind as it would for Supabase
+        self.supabase = self.store
+
+    def _call(self, operation: str, *args: Any, **kwargs: Any) -> Any:
+        self.backend.call(operation)
+        return getattr(self.store, operation)(*args, **kwargs)
+
+    def register_user(self, email: str, password: str, user_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        self.backend.call("register_user")
+        user_id = self._user_id(email)
+        self.store.save_profile(user_id, {"email": email, **(user_data or {})})
+        return {
+            "id": user_id,
+            "email": email,
+            "full_name": (user_data or {}).get("full_name"),
+            "institution": (user_data or {}).get("institution"),
+            "is_active": True
+        }
+
+    def login_user(self, email: str, password: str) -> str:
+        self.backend.call("login_user")
+        return f"{TOKEN_PREFIX}{email}"
+
+    def _verify_token(self, token: str) -> Dict[str, Any]:
+        self.backend.call("get_user")
+        if not token.startswith(TOKEN_PREFIX):
+            raise Exception("Invalid token")
+        user = token[len(TOKEN_PREFIX):]
+        email = user if "@" in user else f"{user}@loadtest.local"
+        return {"id": self._user_id(email), "email": email, "expires_at": time.time() + 3600}
+
+    def _user_id(self, email: str) -> str:
+        return f"{TOKEN_PREFIX}{email}"
+
+    def get_profile(self, user_id: str) -> Dict[str, Any]:
+        return self._call("get_profile", user_id)
+
+    def save_profile(self, user_id: str, profile: Dict[str, Any]) -> None:
+        self._call("save_profile", user_id, profile)
+        self.invalidate_profile(user_id)
+
+    def save_analysis_result(self, user_id: str, analysis_result: Dict[str, Any]) -> str:
+        return self._call("save_analysis_result", user_id, analysis_result)
+
+    def save_analysis_results(
+        self,
+        user_id: str,
+        analysis_results: List[Dict[str, Any]],
+        ignore_duplicates: bool = False
+    ) -> List[str]:
+        return self._call("save_analysis_results", user_id, analysis_results, ignore_duplicates=ignore_duplicates)
+
+    def get_user_analysis_results(self, user_id: str) -> List[Dict[str, Any]]:
+        return self._call("get_user_analysis_results", user_id)
+
+    def get_user_analysis_history(
+        self,
+        user_id: str,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        gene: Optional[str] = None
+    ) -> Dict[str, Any]:
+        return self._call("get_user_analysis_history", user_id, limit=limit, cursor=cursor, fields=fields, gene=gene)
+
+    def get_gene_matching_regions(self, user_id: str, gene_name: str, limit: int = 100) -> List[Dict[str, Any]]:
+        return self._call("get_gene_matching_regions", user_id, gene_name, limit=limit)
+
+    def get_surveillance_counts(self, scope_type: str, scope_id: str, period: str, since: str) -> List[Dict[str, Any]]:
+        return self._call("get_surveillance_counts", scope_type, scope_id, period, since)
+
+    def get_analysis_result(self, user_id: str, result_id: str) -> Optional[Dict[str, Any]]:
+        return self._call("get_analysis_result", user_id, result_id)
+
+    def get_content(self, content_key: str) -> Optional[Dict[str, Any]]:
+        return self._call("get_content", content_key)
+
+    def find_sequence_results(self, user_id: str, sequence_hash: str) -> List[Dict[str, Any]]:
+        return self._call("find_sequence_results", user_id, sequence_hash)
+
+class StandInGroqService(GroqService):
+    """GroqService answering with a canned recommendation after the profile's latency"""
+
+    def __init__(self, settings: Optional[Settings] = None, profile: Optional[BackendProfile] = None):
+        super().__init__(settings)
+        self.api_key = "stand-in"
+        self.backend = BackendProfile() if profile is None else profile
+
+    def get_treatment_recommendations(
+        self,
+        identified_genes: List[str],
+        recommended_antibiotics: List[str],
+        avoid_antibiotics: List[str]
+    ) -> str:
+        try:
+            self.backend.call("get_treatment_recommendations")
+        except InjectedFailure as e:
+            # The real service degrades to a message instead of failing the analysis
+            return f"AI-powered recommendations unavailable: {str(e)}"
+        return (
+            f"Stand-in recommendation for {', '.join(identified_genes)}: "
+            f"consider {', '.join(recommended_antibiotics[:3]) or 'susceptibility testing'}."
+        )
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Generate synthetic S. aureus-like isolates with known resistance genes
+
+Each isolate is a random background with the composition of S. aureus (~33% GC)
+into which reference-panel genes are inserted after a mutation model: point
+substitutions down to a chosen percent identity, short indels at a chosen rate,
+and forward or reverse-complement orientation. The assembly is then broken into
+contigs at random points, which may split an inserted gene as a real draft
+assembly would. A truth file records what was inserted where, and whether each
+panel gene should be called against its significance_threshold.
+
+Usage:
+    python benchmarks/synthetic.py --out isolates/
+    python benchmarks/synthetic.py --out isolates/ --identities 100,80,60 --indel-rates 0,0.01 --contigs 1,20
+    python benchmarks/synthetic.py --out isolates/ --reference database/blast_db/resistance_genes.fasta --background-bp 2800000
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+import itertools
+from typing import List, Dict, Any, Optional, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(BACKEND_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+# S. aureus base composition (A, C, G, T)
+BASE_WEIGHTS = (0.335, 0.165, 0.165, 0.335)
+
+# Longest contig written for a background, so large inputs look like a draft assembly
+MAX_CONTIG_BP = 500_000
+
+# Reference panel used when the BLAST database hasn't been built
+BUNDLED_GENE_SAMPLES = ["mecA_gene_sample.fasta", "mecC_gene_sample.fasta", "ermA_gene_sample.fasta", "ermC_gene_sample.fasta"]
+
+ORIENTATIONS = ("forward", "reverse")
+
+_COMPLEMENT = str.maketrans("ACGTNacgtn", "TGCANtgcan")
+
+def read_fasta(path: str) -> List[Tuple[str, str]]:
+    """(header, sequence) pairs of a FASTA file"""
+    records, header, chunks = [], None, []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith(">"):
+                if header is not None:
+                    records.append((header, "".join(chunks)))
+                header, chunks = line[1:], []
+            elif line:
+                chunks.append(line)
+    if header is not None:
+        records.append((header, "".join(chunks)))
+    return records
+
+def write_fasta(path: str, records: List[Tuple[str, str]], width: int = 80) -> None:
+    with open(path, "w") as f:
+        for header, sequence in records:
+            f.write(f">{header}\n")
+            for start in range(0, len(sequence), width):
+                f.write(sequence[start:start + width] + "\n")
+
+def bundled_reference(path: str) -> str:
+    """Write the bundled gene samples to one reference FASTA and return its path"""
+    records = []
+    for name in BUNDLED_GENE_SAMPLES:
+        sample = os.path.join(REPO_DIR, name)
+        if os.path.exists(sample):
+            records.extend(read_fasta(sample))
+    write_fasta(path, records)
+    return path
+
+def default_reference() -> Optional[str]:
+    """The BLAST database's reference FASTA, if it exists"""
+    from utils.config import Settings
+
+    path = os.path.join(BACKEND_DIR, Settings().BLAST_DB_PATH, "resistance_genes.fasta")
+    return os.path.abspath(path) if os.path.exists(path) else None
+
+def reverse_complement(sequence: str) -> str:
+    return sequence.translate(_COMPLEMENT)[::-1]
+
+def background(length: int, rng: random.Random) -> str:
+    """Random sequence with S. aureus base composition"""
+    return "".join(rng.choices("ACGT", weights=BASE_WEIGHTS, k=length))
+
+def mutate(sequence: str, identity: float, indel_rate: float, rng: random.Random) -> str:
+    """
+    Apply the mutation model to a gene
+
+    Args:
+        sequence: Gene sequence
+        identity: Target percent identity (0-100) from point substitutions
+        indel_rate: Per-base probability of a 1-3 bp insertion or deletion
+        rng: Random source
+
+    Returns:
+        Mutated sequence
+    """
+    substitution_rate = 1 - identity / 100
+    out = []
+    skip = 0
+    for base in sequence.upper():
+        if skip:
+            skip -= 1
+            continue
+        if indel_rate and rng.random() < indel_rate:
+            size = rng.randint(1, 3)
+            if rng.random() < 0.5:
+                out.append(base + background(size, rng))
+            else:
+                skip = size - 1
+            continue
+        if substitution_rate and rng.random() < substitution_rate:
+            base = rng.choice([other for other in "ACGT" if other != base])
+        out.append(base)
+    return "".join(out)
+
+def fragment(sequence: str, contigs: int, rng: random.Random) -> List[Tuple[int, int]]:
+    """(start, end) of each contig when a sequence is broken at contigs - 1 random points"""
+    contigs = max(1, min(contigs, len(sequence)))
+    cuts = sorted(rng.sample(range(1, len(sequence)), contigs - 1)) if contigs > 1 else []
+    bounds = [0] + cuts + [len(sequence)]
+    spans = []
+    for start, end in zip(bounds, bounds[1:]):
+        # Very long contigs are split further, as in synthetic backgrounds of any size
+        for chunk in range(start, end, MAX_CONTIG_BP):
+            spans.append((chunk, min(end, chunk + MAX_CONTIG_BP)))
+    return spans
+
+_analysis_service = None
+
+def analysis_service():
+    """Offline ResistanceAnalysisService holding the gene table and thresholds"""
+    global _analysis_service
+    if _analysis_service is None:
+        from utils.config import Settings
+        from services.resistance_analysis_service import ResistanceAnalysisService
+
+        os.environ["GROQ_API_KEY"] = ""
+        _analysis_service = ResistanceAnalysisService(Settings())
+    return _analysis_service
+
+def gene_thresholds() -> Dict[str, float]:
+    """Per-gene significance_threshold used by the analysis service"""
+    return {name: info["significance_threshold"] for name, info in analysis_service().resistance_genes.items()}
+
+def panel_gene_name(subject_id: str) -> str:
+    """Gene name the analysis service extracts from a reference record ID"""
+    return analysis_service()._extract_gene_name(subject_id)
+
+def generate_isolate(
+    name: str,
+    panel: List[Tuple[str, str]],
+    thresholds: Dict[str, float],
+    background_bp: int,
+    identity: float,
+    indel_rate: float,
+    contigs: int,
+    orientation: str,
+    rng: random.Random,
+    inclusion: float = 0.5
+) -> Tuple[List[Tuple[str, str]], Dict[str, Any]]:
+    """
+    Build one isolate and its truth record
+
+    Args:
+        name: Isolate name, used as the contig prefix
+        panel: (header, sequence) reference genes
+        thresholds: Gene name -> significance_threshold
+        background_bp: Background length before insertion
+        identity: Percent identity of the inserted genes
+        indel_rate: Per-base indel probability of the inserted genes
+        contigs: Number of contigs the assembly is broken into
+        orientation: "forward", "reverse" or "mixed" (random per gene)
+        rng: Random source
+        inclusion: Probability that each panel gene is inserted
+
+    Returns:
+        (contig records, truth) where truth["genes"] says, per scored panel gene,
+        whether it was inserted and whether the analysis should call it
+    """
+    base = background(background_bp, rng)
+    variants = []
+    for header, gene in panel:
+        if rng.random() >= inclusion:
+            continue
+        strand = orientation if orientation != "mixed" else rng.choice(ORIENTATIONS)
+        variant = mutate(gene, identity, indel_rate, rng)
+        if strand == "reverse":
+            variant = reverse_complement(variant)
+        variants.append((rng.randrange(0, len(base) + 1), header.split()[0], strand, variant))
+
+    # Insert in background order so no gene lands inside another
+    pieces, inserted, cursor, offset = [], [], 0, 0
+    for position, subject_id, strand, variant in sorted(variants, key=lambda item: item[0]):
+        pieces.append(base[cursor:position])
+        start = position + offset
+        pieces.append(variant)
+        inserted.append({
+            "subject_id": subject_id,
+            "gene": panel_gene_name(subject_id),
+            "orientation": strand,
+            "start": start,
+            "end": start + len(variant)
+        })
+        cursor, offset = position, offset + len(variant)
+    pieces.append(base[cursor:])
+    sequence = "".join(pieces)
+
+    spans = fragment(sequence, contigs, rng)
+    records = [(f"{name}_contig{index + 1}", sequence[start:end]) for index, (start, end) in enumerate(spans)]
+    for item in inserted:
+        item["split"] = any(start > item["start"] and start < item["end"] for start, _ in spans)
+
+    genes = {}
+    for header, _ in panel:
+        gene = panel_gene_name(header.split()[0])
+        if gene not in thresholds:
+            continue
+        present = any(item["gene"] == gene for item in inserted)
+        genes[gene] = {
+            "inserted": present,
+            "threshold": thresholds[gene],
+            # A gene counts as present only at or above the identity the service requires
+            "expected": present and identity >= thresholds[gene]
+        }
+
+    truth = {
+        "isolate": name,
+        "bases": len(sequence),
+        "identity": identity,
+        "indel_rate": indel_rate,
+        "contigs": len(records),
+        "orientation": orientation,
+        "insertions": inserted,
+        "genes": genes
+    }
+    return records, truth
+
+def generate_grid(
+    panel: List[Tuple[str, str]],
+    identities: List[float],
+    indel_rates: List[float],
+    contigs: List[int],
+    orientations: List[str],
+    background_bp: int,
+    replicates: int,
+    seed: int
+):
+    """Yield (records, truth) for every combination of the mutation model parameters"""
+    thresholds = gene_thresholds()
+    rng = random.Random(seed)
+    grid = itertools.product(identities, indel_rates, contigs, orientations, range(replicates))
+    for index, (identity, indel_rate, n_contigs, orientation, replicate) in enumerate(grid):
+        name = f"iso{index:04d}_id{identity:g}_indel{indel_rate:g}_c{n_contigs}_{orientation}_r{replicate}"
+        yield generate_isolate(
+            name, panel, thresholds, background_bp, identity, indel_rate, n_contigs, orientation,
+            random.Random(rng.getrandbits(64))
+        )
+
+def parse_list(value: str, cast=float) -> list:
+    return [cast(part) for part in value.split(",") if part.strip()]
+
+def add_grid_arguments(parser: argparse.ArgumentParser) -> None:
+    """Mutation model options shared by this generator and the sensitivity harness"""
+    parser.add_argument("--reference", help="Panel FASTA (default: the BLAST database, else the bundled gene samples)")
+    parser.add_argument("--identities", default="100,90,80,70,60", help="Percent identities of inserted genes")
+    parser.add_argument("--indel-rates", default="0,0.01", help="Per-base indel probabilities")
+    parser.add_argument("--contigs", default="1,8", help="Number of contigs each assembly is broken into")
+    parser.add_argument("--orientations", default="forward,reverse", help="forward, reverse and/or mixed")
+    parser.add_argument("--background-bp", type=int, default=2_000, help="Background length of each isolate")
+    parser.add_argument("--replicates", type=int, default=1, help="Isolates per parameter combination")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+
+def grid_from_args(args, work_dir: str):
+    """Panel path and generator for the grid described by add_grid_arguments options"""
+    reference = args.reference or default_reference() or bundled_reference(os.path.join(work_dir, "bundled_reference.fasta"))
+    orientations = [part.strip() for part in args.orientations.split(",") if part.strip()]
+    unknown = set(orientations) - set(ORIENTATIONS + ("mixed",))
+    if unknown:
+        raise ValueError(f"Unknown orientations: {', '.join(sorted(unknown))}")
+
+    grid = generate_grid(
+        read_fasta(reference),
+        parse_list(args.identities),
+        parse_list(args.indel_rates),
+        parse_list(args.contigs, int),
+        orientations,
+        args.background_bp,
+        args.replicates,
+        args.seed
+    )
+    return reference, grid
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate synthetic isolates with known resistance genes")
+    parser.add_argument("--out", required=True, help="Directory for the isolate FASTA files and truth.json")
+    add_grid_arguments(parser)
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.out, exist_ok=True)
+    try:
+        reference, grid = grid_from_args(args, args.out)
+    except ValueError as e:
+        parser.error(str(e))
+
+    truths = []
+    for records, truth in grid:
+        truth["path"] = f"{truth['isolate']}.fasta"
+        write_fasta(os.path.join(args.out, truth["path"]), records)
+        truths.append(truth)
+
+    with open(os.path.join(args.out, "truth.json"), "w") as f:
+        json.dump({"reference": reference, "seed": args.seed, "isolates": truths}, f, indent=2)
+    print(f"Wrote {len(truths)} isolates to {args.out} (panel: {reference})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,17 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from contextlib import asynccontextmanager
+import asyncio
 import uvicorn
 import os
 import logging
 from dotenv import load_dotenv
-from api.routes import resistance_analysis, auth, blast
+from api.routes import resistance_analysis, auth, blast, jobs, batch, statistics, admin
 from utils.config import Settings
+from services.container import ServiceContainer
+from api.middleware import AdmissionMiddleware, MetricsMiddleware, TracingMiddleware, ProfilingMiddleware
+from utils.serialization import FastJSONResponse
 
 # Load environment variables
 load_dotenv()
@@ -17,37 +23,106 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Initialize settings
-settings = Settings()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build the shared services once and warm them up in the background"""
+    settings = Settings()
+    services = ServiceContainer(settings)
+    app.state.services = services
+    services.start()
+    
+    # Serve liveness immediately; readiness flips once warmup completes
+    warmup_task = asyncio.create_task(asyncio.to_thread(services.warmup))
+    
+    yield
+    
+    # Cancelling the task wouldn't stop its thread, so warmup is told to stop between stages
+    # and given a moment to finish the one it's in before the services go away
+    services.cancel_warmup()
+    await asyncio.wait({warmup_task}, timeout=settings.WARMUP_STOP_TIMEOUT)
+    services.stop()
+    
+    from services.http_client import close_http_pool
+    await close_http_pool()
 
 # Create FastAPI app
 app = FastAPI(
     title="MRSA Resistance Gene Detector",
     description="API for detecting antibiotic resistance genes in Staphylococcus aureus",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
-# Configure CORS
+# Profile admitted requests that ask for it or are sampled
+app.add_middleware(ProfilingMiddleware)
+
+# Shed load on the analysis endpoints before uploads are read
+app.add_middleware(AdmissionMiddleware)
+
+# Root span and Server-Timing header for every request
+app.add_middleware(TracingMiddleware)
+
+# Around everything but CORS, so rejected and failed requests are timed too
+app.add_middleware(MetricsMiddleware)
+
+# Configure CORS. Added last so it's outermost and the load-shedding 429s and 503s
+# carry CORS headers too, or browsers would hide them (and Retry-After) from the frontend
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Update with specific frontend URL in production
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Server-Timing", "traceparent", "X-Request-ID", "Retry-After"],
 )
 
 # Include routers
 app.include_router(auth.router, prefix="/api", tags=["Authentication"])
 app.include_router(resistance_analysis.router, prefix="/api", tags=["Resistance Analysis"])
 app.include_router(blast.router, prefix="/api", tags=["BLAST"])
+app.include_router(jobs.router, prefix="/api", tags=["Jobs"])
+app.include_router(batch.router, prefix="/api", tags=["Batch"])
+app.include_router(statistics.router, prefix="/api", tags=["Statistics"])
+app.include_router(admin.router, prefix="/api", tags=["Admin"])
 
 @app.get("/")
 def read_root():
     return {"message": "Welcome to MRSA Resistance Gene Detector API"}
 
 @app.get("/health")
-def health_check():
-    return {"status": "healthy"}
+def health_check(request: Request):
+    services = getattr(request.app.state, "services", None)
+    return {
+        "status": "healthy",
+        "ready": bool(services and services.ready),
+        "warmup": services.warmup_stages if services else {}
+    }
+
+@app.get("/health/ready")
+def readiness_check(request: Request):
+    """Readiness probe: 503 until warmup has paged in the DB, blastn and modules"""
+    services = getattr(request.app.state, "services", None)
+    if services is None or not services.ready:
+        return JSONResponse(status_code=503, content={"status": "warming_up"})
+    return {"status": "ready"}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Stage latencies, blastn wall/CPU time, hit counts, fallbacks, cache hits and queue depths for Prometheus"""
+    from services.metrics import registry
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/metrics/http")
+def http_metrics():
+    """Connection and latency metrics for outbound HTTP calls, per host"""
+    from services.http_client import get_http_pool
+    return get_http_pool().metrics()
+
+@app.get("/metrics/queues")
+def queue_metrics(request: Request):
+    """In-flight and queued requests per admission-controlled endpoint, plus job queue depth"""
+    return request.app.state.services.queue_depths()
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -10,7 +10,7 @@ from pydantic import BaseModel
 
 from services.blast_service import BlastService
 from services.resistance_analysis_service import ResistanceAnalysisService
-from services.supabase_service import SupabaseService
+from services.supabase_service import get_supabase_service
 from models.resistance_model import ResistanceAnalysisResult, ResistanceStatus
 from utils.config import Settings
 
@@ -36,7 +36,7 @@ app.add_middleware(
 # Initialize services
 blast_service = BlastService()
 analysis_service = ResistanceAnalysisService()
-supabase_service = SupabaseService()
+supabase_service = get_supabase_service()
 
 # Define OAuth2 scheme for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -195,11 +195,11 @@ async def get_analysis_history(current_user: User = Depends(get_current_user)):
 async def get_analysis_result(result_id: str, current_user: User = Depends(get_current_user)):
     """Get a specific analysis result"""
     try:
-        result = supabase_service.get_analysis_result(result_id)
-        # Verify that the result belongs to the current user
+        # Only the current user's results are looked up
         user_id = supabase_service.get_user_from_token(current_user)["id"]
-        if result.get("user_id") != user_id:
-            raise HTTPException(status_code=403, detail="Not authorized to access this result")
+        result = supabase_service.get_analysis_result(user_id, result_id)
+        if result is None:
+            raise Exception(f"Analysis result with ID {result_id} not found")
         return result
     except Exception as e:
         raise HTTPException(status_code=404, detail=f"Analysis result not found: {str(e)}")
@@ -3,8 +3,6 @@ import sys
 import subprocess
 import logging
 from pathlib import Path
-import requests
-from Bio import Entrez, SeqIO
 
 # Add parent directory to path so we can import from parent modules
 sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -47,6 +45,9 @@ def download_resistance_genes():
     """Download resistance genes from NCBI"""
     logger.info("Downloading resistance genes from NCBI")
     
+    # Biopython is only needed for the download, keep it off the import path
+    from Bio import Entrez, SeqIO
+    
     # Set Entrez email and API key
     Entrez.email = settings.NCBI_EMAIL
     if settings.NCBI_API_KEY:
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Deque, Dict
+
+class AdmissionRejected(Exception):
+    """Raised when an analysis can't be admitted; carries the HTTP status and Retry-After"""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """Bounds in-flight and queued requests for one endpoint, shedding the rest quickly"""
+
+    def __init__(
+        self,
+        name: str,
+        max_in_flight: int,
+        max_queued: int,
+        queue_timeout: float = 30.0,
+        retry_after: int = 5
+    ):
+        """
+        Args:
+            name: Label used in logs and stats
+            max_in_flight: Requests processed concurrently
+            max_queued: Requests allowed to wait for a slot; more are rejected with 429
+            queue_timeout: Seconds a queued request waits before being rejected with 503
+            retry_after: Value of the Retry-After header on rejections
+        """
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.logger = logging.getLogger(__name__)
+
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+
+    async def acquire(self) -> None:
+        """
+        Take a processing slot, waiting in the bounded queue if none is free
+
+        Raises:
+            AdmissionRejected: 429 when the queue is full, 503 when the wait times out
+        """
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+
+        if len(self._waiters) >= self.max_queued:
+            self.rejected_queue_full += 1
+            raise AdmissionRejected(429, f"Too many {self.name} requests queued, retry later", self.retry_after)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            # The slot may have been handed over just as the timeout fired
+            if not (waiter.done() and not waiter.cancelled()):
+                waiter.cancel()
+                self.rejected_timeout += 1
+                raise AdmissionRejected(503, f"Timed out waiting for a {self.name} slot, retry later", self.retry_after)
+        except asyncio.CancelledError:
+            # Client went away; give back a slot that was already handed over
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                waiter.cancel()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+        self.admitted += 1
+
+    def release(self) -> None:
+        """Give the slot to the oldest waiter, or free it"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                return
+        self.in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "max_in_flight": self.max_in_flight,
+            "max_queued": self.max_queued,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout
+        }
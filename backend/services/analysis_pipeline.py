@@ -0,0 +1,293 @@
+import logging
+import threading
+from typing import Optional, Any, Dict, List, Tuple
+from models.blast_model import BlastResult
+from models.resistance_model import ResistanceAnalysisResult
+from services.blast_service import BlastService
+from services.resistance_analysis_service import ResistanceAnalysisService
+from services.results_store import ResultsStore
+from services.progress import ProgressCallback, report_progress
+from services.single_flight import SingleFlight, file_digest, params_key
+from services.result_writer import ResultWriter
+from services.metrics import stage_timer
+from services.profiling import profiled
+
+# Bump when a change to the analysis logic makes stored results stale
+ANALYSIS_VERSION = 1
+
+class AnalysisPipeline:
+    """BLAST search, resistance analysis and result storage for one uploaded sample"""
+
+    def __init__(
+        self,
+        blast_service: BlastService,
+        analysis_service: ResistanceAnalysisService,
+        results_store: ResultsStore,
+        single_flight: Optional[SingleFlight] = None,
+        result_writer: Optional[ResultWriter] = None,
+        reuse_results: bool = True
+    ):
+        self.blast_service = blast_service
+        self.analysis_service = analysis_service
+        self.results_store = results_store
+        # Identical uploads analyzed concurrently share one computation
+        self.single_flight = single_flight or SingleFlight()
+        # When set, results are spooled and bulk-inserted in the background
+        self.result_writer = result_writer
+        # Serve a stored result when the same sequence was already analyzed with the same database and parameters
+        self.reuse_results = reuse_results
+        self._stats_lock = threading.Lock()
+        self._reused = 0
+        self._computed = 0
+        self.logger = logging.getLogger(__name__)
+
+    @profiled()
+    def run(
+        self,
+        query_file_path: str,
+        sample_id: str,
+        threshold: float = 0.75,
+        user_id: Optional[str] = None,
+        progress: Optional[ProgressCallback] = None,
+        content: Optional[Dict[str, Any]] = None
+    ) -> ResistanceAnalysisResult:
+        """
+        Analyze a FASTA file and save the result for the user
+
+        Args:
+            query_file_path: Path to the FASTA file containing the sample
+            sample_id: Identifier stored with the result (usually the upload filename)
+            threshold: Minimum alignment score threshold (0-1)
+            user_id: Owner of the stored result; nothing is saved when None
+            progress: Optional callback receiving stage events as the pipeline runs
+            content: describe() of the file, if the caller already computed it
+
+        Returns:
+            ResistanceAnalysisResult object
+        """
+        content = content or self.describe(query_file_path, threshold)
+        analysis_results = self._stored_result(content["content_key"], sample_id)
+        if analysis_results is not None:
+            report_progress(
+                progress, "analysis_done",
+                reused=True,
+                resistance_status=analysis_results.resistance_status.value,
+                identified_genes=analysis_results.identified_genes
+            )
+        else:
+            analysis_results, shared = self.single_flight.do(
+                content["content_key"],
+                lambda: self._analyze(query_file_path, threshold, progress)
+            )
+            # Callers sharing an analysis each get their own copy under their own sample_id,
+            # as they do when a stored result is reused
+            analysis_results = analysis_results.model_copy(update={"sample_id": sample_id}, deep=True)
+            if shared:
+                report_progress(
+                    progress, "analysis_done",
+                    shared=True,
+                    resistance_status=analysis_results.resistance_status.value,
+                    identified_genes=analysis_results.identified_genes
+                )
+
+        # Every caller gets its own history record, even for a shared result
+        if user_id:
+            result_id = self.save_result(user_id, sample_id, analysis_results, content)
+            report_progress(progress, "saved", result_id=result_id)
+
+        return analysis_results
+
+    @profiled()
+    def search(self, query_file_path: str, evalue: float = 1e-10, max_hits: int = 10) -> List[BlastResult]:
+        """
+        Run BLAST on a FASTA file, sharing the search with identical concurrent requests
+
+        Args:
+            query_file_path: Path to the FASTA file containing the query sequence
+            evalue: E-value threshold
+            max_hits: Maximum number of hits to return
+
+        Returns:
+            List of BlastResult objects
+        """
+        key = params_key(
+            file_digest(query_file_path),
+            stage="blast",
+            db_version=self.blast_service.database_version(),
+            evalue=evalue,
+            max_hits=max_hits
+        )
+        with stage_timer("search"):
+            blast_results, _ = self.single_flight.do(
+                key,
+                lambda: self.blast_service.run_blast(query_file_path, evalue=evalue, max_hits=max_hits)
+            )
+        return blast_results
+
+    def describe(self, query_file_path: str, threshold: float = 0.75) -> Dict[str, Any]:
+        """
+        Identify what an analysis of a file computes: its sequence, database and parameters
+
+        Args:
+            query_file_path: Path to the FASTA file containing the sample
+            threshold: Minimum alignment score threshold (0-1)
+
+        Returns:
+            Dict with content_key, sequence_hash, db_version and analysis_params;
+            equal content keys always produce equal results
+        """
+        sequence_hash = file_digest(query_file_path)
+        db_version = self.blast_service.database_version()
+        analysis_params = {"threshold": threshold, "analysis_version": ANALYSIS_VERSION}
+        return {
+            "content_key": params_key(sequence_hash, stage="analyze", db_version=db_version, **analysis_params),
+            "sequence_hash": sequence_hash,
+            "db_version": db_version,
+            "analysis_params": analysis_params
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """How many analyses were served from stored results and how many were computed"""
+        with self._stats_lock:
+            total = self._reused + self._computed
+            return {
+                "reused": self._reused,
+                "computed": self._computed,
+                "hit_rate": self._reused / total if total else 0.0
+            }
+
+    def _stored_result(self, content_key: str, sample_id: str) -> Optional[ResistanceAnalysisResult]:
+        stored = None
+        if self.reuse_results:
+            try:
+                with stage_timer("reuse_lookup"):
+                    stored = self.results_store.get_content(content_key)
+            except Exception as e:
+                # A store outage only costs a recomputation
+                self.logger.warning(f"Error looking up stored result: {str(e)}")
+
+        with self._stats_lock:
+            if stored is None:
+                self._computed += 1
+            else:
+                self._reused += 1
+
+        if stored is None:
+            return None
+        return ResistanceAnalysisResult(
+            sample_id=sample_id,
+            resistance_status=stored["resistance_status"],
+            confidence_score=stored["confidence_score"],
+            matching_regions=stored.get("matching_regions") or [],
+            identified_genes=stored.get("identified_genes") or [],
+            treatment_recommendations=stored.get("treatment_recommendations")
+        )
+
+    def _analyze(
+        self,
+        query_file_path: str,
+        threshold: float,
+        progress: Optional[ProgressCallback]
+    ) -> ResistanceAnalysisResult:
+        # Run BLAST alignment, folding each record's hits in as it completes so the
+        # results of a large query are never all held at once
+        findings = self.analysis_service.start_findings()
+        with stage_timer("search"):
+            for result in self.blast_service.iter_blast(
+                query_file_path,
+                progress=self._relay_hits(progress) if progress else None
+            ):
+                findings.add(result)
+        report_progress(progress, "search_done", records=findings.records)
+
+        # Analyze resistance
+        with stage_timer("analyze"):
+            analysis_results = self.analysis_service.analyze_resistance(
+                findings,
+                threshold=threshold
+            )
+        report_progress(
+            progress, "analysis_done",
+            resistance_status=analysis_results.resistance_status.value,
+            identified_genes=analysis_results.identified_genes
+        )
+
+        return analysis_results
+
+    def _relay_hits(self, progress: ProgressCallback) -> ProgressCallback:
+        """Wrap a progress callback so raw BLAST hits go out as partial MatchingRegions"""
+        def relay(stage: str, **data: Any) -> None:
+            if stage != "hits":
+                progress(stage, **data)
+                return
+
+            hits = data.pop("hits", [])
+            progress("search_progress", **data)
+            for hit in hits:
+                region = self.analysis_service.matching_region_for_hit(hit)
+                if region is not None:
+                    progress("matching_region", query_id=hit.query_id, region=region.dict())
+        return relay
+
+    def save_result(
+        self,
+        user_id: str,
+        sample_id: str,
+        analysis_results: ResistanceAnalysisResult,
+        content: Optional[Dict[str, Any]] = None
+    ) -> Optional[str]:
+        """
+        Save an analysis result to the user's history, logging instead of raising on failure
+
+        Args:
+            user_id: User ID
+            sample_id: Identifier stored with the result
+            analysis_results: Result to save
+            content: describe() of the analyzed file; the result is then stored once per content
+
+        Returns:
+            ID of the saved result, or None if saving failed
+        """
+        try:
+            analysis_dict = analysis_results.dict()
+            analysis_dict['sample_id'] = sample_id
+            analysis_dict.update(content or {})
+
+            with stage_timer("save"):
+                if self.result_writer is not None:
+                    result_id = self.result_writer.enqueue(user_id, [analysis_dict])[0]
+                else:
+                    result_id = self.results_store.save_analysis_result(user_id, analysis_dict)
+            self.logger.info(f"Analysis result saved with ID: {result_id}")
+            return result_id
+        except Exception as e:
+            # Log the error but don't fail the analysis
+            self.logger.exception(f"Error saving analysis result: {str(e)}")
+            return None
+
+    def save_results(self, user_id: str, samples: List[Tuple]) -> List[str]:
+        """
+        Save several analysis results to the user's history in one bulk write
+
+        Args:
+            user_id: User ID
+            samples: (sample_id, result) pairs, or (sample_id, result, content) with content from describe()
+
+        Returns:
+            IDs of the saved results, empty if saving failed
+        """
+        rows = []
+        for sample_id, analysis_results, *content in samples:
+            analysis_dict = analysis_results.dict()
+            analysis_dict['sample_id'] = sample_id
+            analysis_dict.update(content[0] if content else {})
+            rows.append(analysis_dict)
+
+        try:
+            with stage_timer("save"):
+                if self.result_writer is not None:
+                    return self.result_writer.enqueue(user_id, rows)
+                return self.results_store.save_analysis_results(user_id, rows)
+        except Exception as e:
+            self.logger.exception(f"Error saving {len(rows)} analysis results: {str(e)}")
+            return []
@@ -0,0 +1,202 @@
+import os
+import uuid
+import shutil
+import tarfile
+import zipfile
+import logging
+import tempfile
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Set, Tuple
+from models.resistance_model import ResistanceAnalysisResult
+from services.analysis_pipeline import AnalysisPipeline
+from services.memory import MB
+
+FASTA_EXTENSIONS = ('.fasta', '.fa', '.fna')
+ZIP_EXTENSIONS = ('.zip',)
+TAR_EXTENSIONS = ('.tar', '.tar.gz', '.tgz')
+
+def is_archive(filename: str) -> bool:
+    return filename.lower().endswith(ZIP_EXTENSIONS + TAR_EXTENSIONS)
+
+class ArchiveTooLarge(Exception):
+    """Raised when an archive's FASTA members uncompress to more than the batch limits allow"""
+
+def iter_fasta_entries(
+    filename: str,
+    fileobj: BinaryIO,
+    max_member_bytes: int = 0,
+    max_total_bytes: int = 0
+) -> Iterator[Tuple[str, BinaryIO]]:
+    """
+    Yield (name, stream) for each FASTA file in an upload, one at a time
+
+    Archives are read member by member, so nothing is extracted to disk up front.
+    Member sizes are checked against the limits before each member is yielded; the
+    sizes come from the archive's headers, and zipfile and tarfile never read a member
+    past its header size, so a forged header can't get more data through.
+
+    Args:
+        filename: Name of the uploaded file
+        fileobj: Seekable binary stream of the upload
+        max_member_bytes: Largest uncompressed FASTA member accepted; 0 allows any size
+        max_total_bytes: Largest uncompressed total of an archive's FASTA members; 0 allows any
+
+    Returns:
+        Iterator of (sample name, binary stream) pairs
+
+    Raises:
+        ArchiveTooLarge: If a member, or the members so far, are over the limits
+    """
+    lower = filename.lower()
+    total = 0
+
+    def check(name: str, size: int) -> None:
+        nonlocal total
+        total += size
+        if max_member_bytes and size > max_member_bytes:
+            raise ArchiveTooLarge(
+                f"{filename}: {name} uncompresses to {size / MB:.0f} MB, over the {max_member_bytes / MB:.0f} MB limit per file"
+            )
+        if max_total_bytes and total > max_total_bytes:
+            raise ArchiveTooLarge(
+                f"{filename} uncompresses to over the {max_total_bytes / MB:.0f} MB limit per archive"
+            )
+
+    if lower.endswith(ZIP_EXTENSIONS):
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and info.filename.lower().endswith(FASTA_EXTENSIONS):
+                    check(info.filename, info.file_size)
+                    with archive.open(info) as member:
+                        yield os.path.basename(info.filename), member
+
+    elif lower.endswith(TAR_EXTENSIONS):
+        with tarfile.open(fileobj=fileobj, mode="r:*") as archive:
+            for member in archive:
+                if member.isfile() and member.name.lower().endswith(FASTA_EXTENSIONS):
+                    check(member.name, member.size)
+                    yield os.path.basename(member.name), archive.extractfile(member)
+
+    elif lower.endswith(FASTA_EXTENSIONS):
+        yield filename, fileobj
+
+def check_archive_sizes(filename: str, fileobj: BinaryIO, max_member_bytes: int = 0, max_total_bytes: int = 0) -> None:
+    """
+    Check an upload against the archive limits by walking its headers, then rewind it
+
+    Members aren't read, though walking a compressed tar still decompresses it.
+
+    Raises:
+        ArchiveTooLarge: If a FASTA member, or all of them, are over the limits
+    """
+    if not is_archive(filename):
+        return
+    try:
+        for _ in iter_fasta_entries(filename, fileobj, max_member_bytes, max_total_bytes):
+            pass
+    finally:
+        fileobj.seek(0)
+
+class BatchAnalysisService:
+    """Runs many samples through the analysis pipeline in parallel with batched saves"""
+
+    def __init__(self, pipeline: AnalysisPipeline, concurrency: int = 4, save_batch_size: int = 50):
+        """
+        Args:
+            pipeline: Pipeline used for each sample
+            concurrency: Maximum samples analyzed at once (and spooled to disk at once)
+            save_batch_size: Results per bulk insert into the results store
+        """
+        self.pipeline = pipeline
+        self.concurrency = concurrency
+        self.save_batch_size = save_batch_size
+        self.logger = logging.getLogger(__name__)
+
+    def run(
+        self,
+        entries: Iterator[Tuple[str, BinaryIO]],
+        threshold: float = 0.75,
+        user_id: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Analyze each entry and yield per-sample outcomes as they complete
+
+        Args:
+            entries: (sample name, binary stream) pairs, e.g. from iter_fasta_entries
+            threshold: Minimum alignment score threshold (0-1)
+            user_id: Owner of the saved results; nothing is saved when None
+
+        Returns:
+            Iterator of {"sample_id", "status", "result" | "error"} dicts, then a final
+            {"summary": {...}} dict
+        """
+        pending_saves: List[Tuple[str, ResistanceAnalysisResult, Dict[str, Any]]] = []
+        summary = {"samples": 0, "completed": 0, "failed": 0, "saved": 0}
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="batch") as executor:
+            in_flight: Set[Future] = set()
+
+            for sample_id, stream in entries:
+                summary["samples"] += 1
+                path = self._spool(stream)
+                # Run in a copy of the caller's context so metrics keep the request's endpoint label
+                in_flight.add(executor.submit(contextvars.copy_context().run, self._analyze, sample_id, path, threshold))
+
+                # Read the next archive entry only once a slot frees up
+                if len(in_flight) >= self.concurrency:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    yield from self._collect(done, pending_saves, summary, user_id)
+
+            while in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                yield from self._collect(done, pending_saves, summary, user_id)
+
+        if user_id and pending_saves:
+            self._flush(user_id, pending_saves, summary)
+
+        yield {"summary": summary}
+
+    def _spool(self, stream: BinaryIO) -> str:
+        path = os.path.join(tempfile.gettempdir(), f"batch_{uuid.uuid4()}.fasta")
+        with open(path, "wb") as f:
+            shutil.copyfileobj(stream, f)
+        return path
+
+    def _analyze(self, sample_id: str, path: str, threshold: float) -> Tuple[str, Optional[ResistanceAnalysisResult], Any]:
+        try:
+            # Described here, while the spooled file still exists, so the save can reference the content
+            content = self.pipeline.describe(path, threshold)
+            result = self.pipeline.run(path, sample_id=sample_id, threshold=threshold, content=content)
+            return sample_id, result, content
+        except Exception as e:
+            self.logger.error(f"Error analyzing batch sample {sample_id}: {str(e)}")
+            return sample_id, None, str(e)
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _collect(
+        self,
+        done: Set[Future],
+        pending_saves: List[Tuple[str, ResistanceAnalysisResult, Dict[str, Any]]],
+        summary: Dict[str, int],
+        user_id: Optional[str]
+    ) -> Iterator[Dict[str, Any]]:
+        for future in done:
+            sample_id, result, outcome = future.result()
+            if result is None:
+                summary["failed"] += 1
+                yield {"sample_id": sample_id, "status": "failed", "error": outcome}
+                continue
+
+            summary["completed"] += 1
+            pending_saves.append((sample_id, result, outcome))
+            yield {"sample_id": sample_id, "status": "completed", "result": result}
+
+        if user_id and len(pending_saves) >= self.save_batch_size:
+            self._flush(user_id, pending_saves, summary)
+
+    def _flush(self, user_id: str, pending_saves: List[Tuple[str, ResistanceAnalysisResult, Dict[str, Any]]], summary: Dict[str, int]) -> None:
+        summary["saved"] += len(self.pipeline.save_results(user_id, pending_saves))
+        pending_saves.clear()
@@ -1,23 +1,35 @@
 import os
+import time
+import heapq
+import shlex
+import hashlib
 import subprocess
 import tempfile
 import uuid
-from typing import List, Dict, Any, Optional
+from typing import Iterator, List, Dict, Any, Optional, Tuple
 import logging
-from Bio.Blast.Applications import NcbiblastnCommandline
-from Bio.Blast import NCBIXML
-from Bio import SeqIO
-from Bio import pairwise2
-from Bio.Seq import Seq
 from models.blast_model import BlastResult, BlastHit
 from utils.config import Settings
 from debug_logging import info_log
+from services.progress import ProgressCallback, report_progress
+from services.metrics import (
+    BLASTN_WALL_SECONDS, BLASTN_CPU_SECONDS, HITS_PER_QUERY, DIRECT_COMPARISON_FALLBACKS,
+    current_endpoint, set_engine, stage_timer
+)
+from services.tracing import start_span, current_traceparent
+from services.memory import MB, MemoryGuard, MemoryRejected
+
+# Bytes pairwise2 holds per cell of its score and traceback matrices (measured at ~57 with one_alignment_only)
+DIRECT_BYTES_PER_CELL = 64
+
+# Query windows overlap by this many reference lengths, so a gapped local hit fits wholly inside one
+WINDOW_OVERLAP_REFERENCES = 2
 
 class BlastService:
     """Service for running BLAST alignments"""
     
-    def __init__(self):
-        self.settings = Settings()
+    def __init__(self, settings: Optional[Settings] = None):
+        self.settings = settings or Settings()
         self.blast_db_path = self.settings.BLAST_DB_PATH
         
         # Ensure required directories exist
@@ -31,8 +43,145 @@ class BlastService:
         self.blastn_cmd = "blastn"
         self.makeblastdb_cmd = "makeblastdb"
         self.blastdbcmd = "blastdbcmd"
+        
+        # Reference sequences, reloaded only when the FASTA file changes
+        self._reference_cache: Dict[str, Any] = {}
+        
+        # (mtime, size) of the reference FASTA and its digest, rehashed only when the file changes
+        self._db_version: Optional[tuple] = None
+        
+        # Direct comparisons hold an alignment matrix per record pair, so they are admitted against memory budgets
+        self.memory_guard = MemoryGuard(
+            request_budget=self.settings.MEMORY_REQUEST_BUDGET_MB * MB,
+            process_limit=self.settings.MEMORY_PROCESS_LIMIT_MB * MB,
+            retry_after=self.settings.ADMISSION_RETRY_AFTER
+        )
+    
+    def warmup(self) -> int:
+        """
+        Load the reference index into memory so the first request doesn't pay for it
+        
+        Returns:
+            Number of reference sequences loaded
+        """
+        fasta_path = os.path.join(self.blast_db_path, "resistance_genes.fasta")
+        if not os.path.exists(fasta_path):
+            self.logger.warning(f"Reference FASTA not found at {fasta_path}, skipping warmup")
+            return 0
+        
+        return len(self._load_reference_records(fasta_path))
+    
+    def database_version(self) -> str:
+        """
+        Identify the reference database content, so stored results can be matched to it
+        
+        Returns:
+            Short digest of the reference FASTA file, or "none" if there is no database
+        """
+        fasta_path = os.path.join(self.blast_db_path, "resistance_genes.fasta")
+        try:
+            stat = os.stat(fasta_path)
+        except OSError:
+            return "none"
+        
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if self._db_version is None or self._db_version[0] != signature:
+            digest = hashlib.sha256()
+            with open(fasta_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+            self._db_version = (signature, digest.hexdigest()[:16])
+        return self._db_version[1]
+    
+    def preload_database(self, chunk_size: int = 1024 * 1024) -> int:
+        """
+        Read every reference database file once so its pages are in the OS page cache
+        
+        Args:
+            chunk_size: Read size in bytes
+            
+        Returns:
+            Total number of bytes read
+        """
+        total_bytes = 0
+        prefix = "resistance_genes."
+        
+        for name in sorted(os.listdir(self.blast_db_path)):
+            if not name.startswith(prefix):
+                continue
+            
+            path = os.path.join(self.blast_db_path, name)
+            if not os.path.isfile(path):
+                continue
+            
+            with open(path, "rb") as f:
+                # Ask the kernel to start readahead, then touch every page
+                if hasattr(os, "posix_fadvise"):
+                    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+                while True:
+                    chunk = f.read(chunk_size)
+                    if not chunk:
+                        break
+                    total_bytes += len(chunk)
+        
+        return total_bytes
+    
+    def run_synthetic_search(self, query_length: int = 200) -> int:
+        """
+        Run a small search against the reference DB so blastn and its libraries are loaded
+        
+        Args:
+            query_length: Length of the synthetic query taken from the first reference sequence
+            
+        Returns:
+            Number of hits found
+        """
+        fasta_path = os.path.join(self.blast_db_path, "resistance_genes.fasta")
+        if not os.path.exists(fasta_path):
+            return 0
+        
+        reference_records = self._load_reference_records(fasta_path)
+        if not reference_records:
+            return 0
+        
+        query_file_path = os.path.join(tempfile.gettempdir(), f"warmup_{uuid.uuid4()}.fasta")
+        try:
+            with open(query_file_path, "w") as f:
+                f.write(f">warmup_query\n{str(reference_records[0].seq[:query_length])}\n")
+            
+            results = self.run_blast(query_file_path, max_hits=1)
+            return sum(len(result.hits) for result in results)
+        finally:
+            if os.path.exists(query_file_path):
+                os.remove(query_file_path)
+    
+    def _load_reference_records(self, fasta_path: str) -> List[Any]:
+        """
+        Get the parsed reference records, re-reading the file only if it changed
+        
+        Args:
+            fasta_path: Path to the reference FASTA file
+            
+        Returns:
+            List of SeqRecord objects
+        """
+        mtime = os.path.getmtime(fasta_path)
+        cached = self._reference_cache.get(fasta_path)
+        if cached is None or cached[0] != mtime:
+            from Bio import SeqIO
+            
+            records = list(SeqIO.parse(fasta_path, "fasta"))
+            self._reference_cache[fasta_path] = (mtime, records)
+            return records
+        return cached[1]
     
-    def run_blast(self, query_file_path: str, evalue: float = 1e-10, max_hits: int = 10) -> List[BlastResult]:
+    def run_blast(
+        self,
+        query_file_path: str,
+        evalue: float = 1e-10,
+        max_hits: int = 10,
+        progress: Optional[ProgressCallback] = None
+    ) -> List[BlastResult]:
         """
         Run BLAST alignment on a query sequence
         
@@ -40,139 +189,238 @@ class BlastService:
             query_file_path: Path to the FASTA file containing the query sequence
             evalue: E-value threshold
             max_hits: Maximum number of hits to return
+            progress: Optional callback receiving "search_started" and per-record "hits" events
             
         Returns:
             List of BlastResult objects
         """
-        try:
-            info_log("===== BLAST ANALYSIS STARTING =====")
-            info_log(f"Query file: {query_file_path}")
-            info_log(f"E-value threshold: {evalue}")
-            info_log(f"Max hits: {max_hits}")
+        return list(self.iter_blast(query_file_path, evalue, max_hits, progress))
+    
+    def iter_blast(
+        self,
+        query_file_path: str,
+        evalue: float = 1e-10,
+        max_hits: int = 10,
+        progress: Optional[ProgressCallback] = None
+    ) -> Iterator[BlastResult]:
+        """
+        Run BLAST alignment on a query sequence, yielding each record's result as it's parsed
+        
+        Args:
+            query_file_path: Path to the FASTA file containing the query sequence
+            evalue: E-value threshold
+            max_hits: Maximum number of hits to return
+            progress: Optional callback receiving "search_started" and per-record "hits" events
             
-            # Check if BLAST database exists
-            db_path = os.path.join(self.blast_db_path, "resistance_genes")
-            fasta_path = f"{db_path}.fasta"
+        Returns:
+            Iterator of BlastResult objects
+        """
+        with start_span("blast.run_blast"):
+            # Once a result has been handed out, falling back would repeat it
+            yielded = False
+            try:
+                from Bio.Blast.Applications import NcbiblastnCommandline
             
-            # Log the query file contents for debugging
-            info_log(f"Processing query file: {query_file_path}")
-            with open(query_file_path, 'r') as f:
-                query_content = f.read()
-                info_log(f"Query file content (first 100 chars): {query_content[:100]}...")
-                
-                # Count sequences in the file
-                seq_count = query_content.count('>')
-                info_log(f"Number of sequences in query file: {seq_count}")
-            
-            # Log the reference database info
-            if os.path.exists(fasta_path):
-                info_log(f"Reference database exists at: {fasta_path}")
-                with open(fasta_path, 'r') as f:
-                    ref_content = f.read()
-                    ref_seq_count = ref_content.count('>')
+                info_log("===== BLAST ANALYSIS STARTING =====")
+                info_log(f"Query file: {query_file_path}")
+                info_log(f"E-value threshold: {evalue}")
+                info_log(f"Max hits: {max_hits}")
+            
+                # Check if BLAST database exists
+                db_path = os.path.join(self.blast_db_path, "resistance_genes")
+                fasta_path = f"{db_path}.fasta"
+            
+                # Log the query file contents for debugging
+                info_log(f"Processing query file: {query_file_path}")
+                # Only the head is read, so a large genome isn't loaded just for the log
+                with open(query_file_path, 'r') as f:
+                    query_preview = f.read(100)
+                info_log(f"Query file content (first 100 chars): {query_preview}...")
+                info_log(f"Query file size: {os.path.getsize(query_file_path)} bytes")
+            
+                # Log the reference database info
+                if os.path.exists(fasta_path):
+                    info_log(f"Reference database exists at: {fasta_path}")
+                    ref_seq_count = len(self._load_reference_records(fasta_path))
                     info_log(f"Reference database contains {ref_seq_count} sequences")
-                    info_log(f"First 100 chars of reference DB: {ref_content[:100]}...")
-            else:
-                info_log(f"WARNING: Reference database file not found at: {fasta_path}")
-            
-            # If BLAST database doesn't exist but we have a FASTA file, use direct comparison
-            if not (os.path.exists(f"{db_path}.nin") or os.path.exists(f"{db_path}.nsq")) and os.path.exists(fasta_path):
-                self.logger.info("BLAST database not found, using direct sequence comparison")
-                return self._run_direct_comparison(query_file_path, fasta_path, evalue, max_hits)
-            
-            # Otherwise, try to use BLAST
-            # Create a temporary file for BLAST output
-            output_file = os.path.join(tempfile.gettempdir(), f"{uuid.uuid4()}.xml")
-            
-            # Prepare the BLAST command
-            blast_cmd = NcbiblastnCommandline(
-                cmd=self.blastn_cmd,
-                query=query_file_path,
-                subject=fasta_path,  # Use subject instead of db
-                evalue=evalue,
-                outfmt=5,  # XML output format
-                max_target_seqs=max_hits,
-                out=output_file
-            )
+                else:
+                    info_log(f"WARNING: Reference database file not found at: {fasta_path}")
+            
+                # If BLAST database doesn't exist but we have a FASTA file, use direct comparison
+                if not (os.path.exists(f"{db_path}.nin") or os.path.exists(f"{db_path}.nsq")) and os.path.exists(fasta_path):
+                    self.logger.info("BLAST database not found, using direct sequence comparison")
+                    DIRECT_COMPARISON_FALLBACKS.inc(endpoint=current_endpoint(), reason="no_database")
+                    for result in self.iter_direct_comparison(query_file_path, fasta_path, max_hits, progress):
+                        yielded = True
+                        yield result
+                    return
             
-            # Run BLAST
-            self.logger.info(f"Running BLAST with command: {blast_cmd}")
-            stdout, stderr = blast_cmd()
-            
-            self.logger.info("BLAST command completed")
-            if stdout:
-                self.logger.info(f"BLAST stdout: {stdout}")
-            if stderr:
-                self.logger.warning(f"BLAST stderr: {stderr}")
-            
-            # Parse BLAST results
-            results = []
-            with open(output_file) as result_handle:
-                info_log(f"Parsing BLAST results from: {output_file}")
-                blast_records = NCBIXML.parse(result_handle)
-                record_count = 0
+                # Otherwise, try to use BLAST
+                # Create a temporary file for BLAST output
+                output_file = os.path.join(tempfile.gettempdir(), f"{uuid.uuid4()}.xml")
+            
+                # Prepare the BLAST command
+                blast_cmd = NcbiblastnCommandline(
+                    cmd=self.blastn_cmd,
+                    query=query_file_path,
+                    subject=fasta_path,  # Use subject instead of db
+                    evalue=evalue,
+                    outfmt=5,  # XML output format
+                    max_target_seqs=max_hits,
+                    out=output_file
+                )
+            
+                # Run BLAST
+                set_engine("blastn")
+                report_progress(progress, "search_started", engine="blastn")
+                self.logger.info(f"Running BLAST with command: {blast_cmd}")
+                stdout, stderr = self._run_blastn(blast_cmd)
+            
+                self.logger.info("BLAST command completed")
+                if stdout:
+                    self.logger.info(f"BLAST stdout: {stdout}")
+                if stderr:
+                    self.logger.warning(f"BLAST stderr: {stderr}")
+            
+                # Parse BLAST results
+                try:
+                    for result in self._parse_blast_output(output_file, progress):
+                        yielded = True
+                        yield result
+                finally:
+                    # Clean up temporary file
+                    if os.path.exists(output_file):
+                        os.remove(output_file)
+            
+            except MemoryRejected:
+                # Retrying with the direct comparison would only be rejected again
+                raise
+            except Exception as e:
+                self.logger.error(f"Error running BLAST: {str(e)}")
+                fasta_path = os.path.join(self.blast_db_path, "resistance_genes.fasta")
+                if yielded or not os.path.exists(fasta_path):
+                    raise
+                # If BLAST fails, try direct comparison as a fallback
+                self.logger.info("Falling back to direct sequence comparison")
+                DIRECT_COMPARISON_FALLBACKS.inc(endpoint=current_endpoint(), reason="blastn_error")
+                yield from self.iter_direct_comparison(query_file_path, fasta_path, max_hits, progress)
+    
+    def _parse_blast_output(self, output_file: str, progress: Optional[ProgressCallback]) -> Iterator[BlastResult]:
+        """Yield a BlastResult per record of blastn's XML output as it's read"""
+        from Bio.Blast import NCBIXML
+        
+        with open(output_file) as result_handle, stage_timer("parse"):
+            info_log(f"Parsing BLAST results from: {output_file}")
+            blast_records = NCBIXML.parse(result_handle)
+            record_count = 0
+            total_hits = 0
+            
+            for record in blast_records:
+                record_count += 1
+                query_id = record.query
+                query_length = record.query_length
+                info_log(f"Processing BLAST record {record_count}: Query ID={query_id}, Length={query_length}")
                 
-                for record in blast_records:
-                    record_count += 1
-                    query_id = record.query
-                    query_length = record.query_length
-                    info_log(f"Processing BLAST record {record_count}: Query ID={query_id}, Length={query_length}")
-                    
-                    hits = []
-                    hit_count = 0
-                    for alignment in record.alignments:
-                        info_log(f"  Found alignment to: {alignment.hit_id}, length: {alignment.length}")
-                        for hsp in alignment.hsps:
-                            hit_count += 1
-                            percent_identity = (hsp.identities / hsp.align_length) * 100
-                            info_log(f"    HSP {hit_count}: Identity={percent_identity:.2f}%, E-value={hsp.expect}, Align length={hsp.align_length}")
-                            info_log(f"    Query range: {hsp.query_start}-{hsp.query_end}, Subject range: {hsp.sbjct_start}-{hsp.sbjct_end}")
-                            
-                            hit = BlastHit(
-                                query_id=query_id,
-                                subject_id=alignment.hit_id,
-                                percent_identity=percent_identity,
-                                alignment_length=hsp.align_length,
-                                mismatches=hsp.align_length - hsp.identities,
-                                gap_opens=hsp.gaps,
-                                query_start=hsp.query_start,
-                                query_end=hsp.query_end,
-                                subject_start=hsp.sbjct_start,
-                                subject_end=hsp.sbjct_end,
-                                evalue=hsp.expect,
-                                bit_score=hsp.bits
-                            )
-                            hits.append(hit)
-                    
-                    info_log(f"Total of {hit_count} hits found for query {query_id}")
-                    
-                    result = BlastResult(
-                        query_id=query_id,
-                        query_length=query_length,
-                        hits=hits
-                    )
-                    results.append(result)
+                hits = []
+                hit_count = 0
+                for alignment in record.alignments:
+                    info_log(f"  Found alignment to: {alignment.hit_id}, length: {alignment.length}")
+                    for hsp in alignment.hsps:
+                        hit_count += 1
+                        percent_identity = (hsp.identities / hsp.align_length) * 100
+                        info_log(f"    HSP {hit_count}: Identity={percent_identity:.2f}%, E-value={hsp.expect}, Align length={hsp.align_length}")
+                        info_log(f"    Query range: {hsp.query_start}-{hsp.query_end}, Subject range: {hsp.sbjct_start}-{hsp.sbjct_end}")
+                        
+                        hit = BlastHit(
+                            query_id=query_id,
+                            subject_id=alignment.hit_id,
+                            percent_identity=percent_identity,
+                            alignment_length=hsp.align_length,
+                            mismatches=hsp.align_length - hsp.identities,
+                            gap_opens=hsp.gaps,
+                            query_start=hsp.query_start,
+                            query_end=hsp.query_end,
+                            subject_start=hsp.sbjct_start,
+                            subject_end=hsp.sbjct_end,
+                            evalue=hsp.expect,
+                            bit_score=hsp.bits
+                        )
+                        hits.append(hit)
                 
-                info_log(f"BLAST analysis complete: {record_count} records processed with a total of {sum(len(r.hits) for r in results)} hits")
-                info_log("===== BLAST ANALYSIS FINISHED =====")
-            
-            # Clean up temporary file
-            if os.path.exists(output_file):
-                os.remove(output_file)
+                info_log(f"Total of {hit_count} hits found for query {query_id}")
+                total_hits += hit_count
+                HITS_PER_QUERY.observe(hit_count, endpoint=current_endpoint(), engine="blastn")
+                report_progress(
+                    progress, "hits",
+                    query_id=query_id,
+                    records_processed=record_count,
+                    hits_so_far=total_hits,
+                    hits=hits
+                )
                 
-            return results
+                yield BlastResult(
+                    query_id=query_id,
+                    query_length=query_length,
+                    hits=hits
+                )
             
-        except Exception as e:
-            self.logger.error(f"Error running BLAST: {str(e)}")
-            # If BLAST fails, try direct comparison as a fallback
-            self.logger.info("Falling back to direct sequence comparison")
-            fasta_path = os.path.join(self.blast_db_path, "resistance_genes.fasta")
-            if os.path.exists(fasta_path):
-                return self._run_direct_comparison(query_file_path, fasta_path, evalue, max_hits)
+            info_log(f"BLAST analysis complete: {record_count} records processed with a total of {total_hits} hits")
+            info_log("===== BLAST ANALYSIS FINISHED =====")
+    
+    def _run_blastn(self, blast_cmd: Any) -> Tuple[str, str]:
+        """
+        Run a blastn command line, recording its wall and CPU time
+        
+        Args:
+            blast_cmd: NcbiblastnCommandline to run
+            
+        Returns:
+            (stdout, stderr) of the process
+            
+        Raises:
+            RuntimeError: If blastn exits with a non-zero status
+        """
+        with start_span("blast.blastn") as span, tempfile.TemporaryFile() as stdout, tempfile.TemporaryFile() as stderr:
+            # The trace context goes along in the environment, for wrappers that report their own spans
+            env = dict(os.environ, TRACEPARENT=current_traceparent() or "")
+            started = time.perf_counter()
+            process = subprocess.Popen(shlex.split(str(blast_cmd)), stdout=stdout, stderr=stderr, env=env)
+            if hasattr(os, "wait4"):
+                # wait4 reaps this process and returns its own rusage, unaffected by concurrent searches
+                _, status, usage = os.wait4(process.pid, 0)
+                process.returncode = os.waitstatus_to_exitcode(status)
             else:
-                raise
+                # Windows has no per-process rusage, so only wall time is recorded there
+                process.wait()
+                usage = None
+            
+            endpoint = current_endpoint()
+            BLASTN_WALL_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+            span.set_attribute("process.pid", process.pid)
+            span.set_attribute("process.exit_code", process.returncode)
+            if usage is not None:
+                cpu_seconds = usage.ru_utime + usage.ru_stime
+                BLASTN_CPU_SECONDS.observe(cpu_seconds, endpoint=endpoint)
+                span.set_attribute("process.cpu_seconds", cpu_seconds)
+                span.set_attribute("process.max_rss_kb", usage.ru_maxrss)
+            
+            stdout.seek(0)
+            stderr.seek(0)
+            out = stdout.read().decode(errors="replace")
+            err = stderr.read().decode(errors="replace")
+        
+        if process.returncode != 0:
+            raise RuntimeError(f"blastn exited with status {process.returncode}: {err.strip()}")
+        return out, err
     
-    def _run_direct_comparison(self, query_file_path: str, reference_fasta_path: str, evalue: float = 1e-10, max_hits: int = 10) -> List[BlastResult]:
+    def _run_direct_comparison(
+        self,
+        query_file_path: str,
+        reference_fasta_path: str,
+        evalue: float = 1e-10,
+        max_hits: int = 10,
+        progress: Optional[ProgressCallback] = None
+    ) -> List[BlastResult]:
         """
         Run direct sequence comparison using BioPython's pairwise alignment
         
@@ -181,105 +429,274 @@ class BlastService:
             reference_fasta_path: Path to the FASTA file with reference sequences
             evalue: E-value threshold (not directly used but kept for API consistency)
             max_hits: Maximum number of hits to return
+            progress: Optional callback receiving "search_started" and per-hit "hits" events
             
         Returns:
             List of BlastResult objects that emulate BLAST outputs
         """
-        self.logger.info(f"Running direct sequence comparison between {query_file_path} and {reference_fasta_path}")
+        return list(self.iter_direct_comparison(query_file_path, reference_fasta_path, max_hits, progress))
+    
+    def iter_direct_comparison(
+        self,
+        query_file_path: str,
+        reference_fasta_path: str,
+        max_hits: int = 10,
+        progress: Optional[ProgressCallback] = None
+    ) -> Iterator[BlastResult]:
+        """
+        Run direct sequence comparison, yielding each query record's result as soon as it completes
         
-        try:
-            # Load query sequences
-            query_records = list(SeqIO.parse(query_file_path, "fasta"))
+        Query records are parsed one at a time and only each record's best max_hits hits
+        are kept, so memory is bounded by the largest record's alignment, not the file size.
+        A record whose alignment matrix would exceed the per-request memory budget is
+        aligned in overlapping windows small enough to fit it.
+        
+        Args:
+            query_file_path: Path to the FASTA file with query sequence
+            reference_fasta_path: Path to the FASTA file with reference sequences
+            max_hits: Maximum number of hits to return per query record
+            progress: Optional callback receiving "search_started" and per-hit "hits" events
             
-            # Load reference sequences
-            reference_records = list(SeqIO.parse(reference_fasta_path, "fasta"))
+        Returns:
+            Iterator of BlastResult objects that emulate BLAST outputs
             
-            results = []
-            for query_record in query_records:
-                query_id = query_record.id
-                query_length = len(query_record.seq)
-                query_seq = query_record.seq
+        Raises:
+            MemoryRejected: If even a windowed alignment doesn't fit the memory budgets
+        """
+        with start_span("blast.direct_comparison"):
+            self.logger.info(f"Running direct sequence comparison between {query_file_path} and {reference_fasta_path}")
+        
+            try:
+                from Bio import SeqIO
+            
+                # Load reference sequences
+                reference_records = self._load_reference_records(reference_fasta_path)
+            
+                record_count, longest_query = self._scan_fasta(query_file_path)
+                longest_reference = max((len(record.seq) for record in reference_records), default=0)
+                window = self._direct_comparison_window(longest_query, longest_reference)
+                if window:
+                    self.logger.info(f"Aligning records longer than {window} bp in windows to stay within the memory budget")
+                aligned_length = min(longest_query, window) if window else longest_query
+                estimate = aligned_length * longest_reference * DIRECT_BYTES_PER_CELL + longest_query
+            
+                with self.memory_guard.reserve(estimate, f"Direct comparison of a {longest_query} bp record"):
+                    set_engine("direct_comparison")
+                    report_progress(progress, "search_started", engine="direct_comparison", records=record_count)
                 
-                hits = []
-                for ref_record in reference_records:
-                    # Perform global alignment
-                    # This is a simplified alternative to BLAST but will work for our demo
-                    alignments = pairwise2.align.localms(
-                        query_seq, 
-                        ref_record.seq,
-                        2,    # match score
-                        -1,   # mismatch penalty
-                        -2,   # gap open penalty
-                        -0.5  # gap extension penalty
-                    )
+                    total_hits = 0
+                    for record_index, query_record in enumerate(SeqIO.parse(query_file_path, "fasta"), start=1):
+                        query_id = query_record.id
                     
-                    # Take the best alignment
-                    if alignments:
-                        best_align = alignments[0]
-                        
-                        # Calculate alignment statistics
-                        align_len = 0
-                        identities = 0
-                        gaps = 0
-                        
-                        # Find the start and end of the alignment in the sequences
-                        q_start = 0
-                        s_start = 0
-                        
-                        for i, (q, s) in enumerate(zip(best_align[0], best_align[1])):
-                            if q != '-' and s != '-':
-                                align_len += 1
-                                if q == s:
-                                    identities += 1
-                            if q == '-' or s == '-':
-                                gaps += 1
-                        
-                        # Find the actual alignment coordinates
-                        q_start = best_align[0].find(next(ch for ch in best_align[0] if ch != '-'))
-                        q_end = len(best_align[0]) - best_align[0][::-1].find(next(ch for ch in best_align[0][::-1] if ch != '-'))
-                        
-                        s_start = best_align[1].find(next(ch for ch in best_align[1] if ch != '-'))
-                        s_end = len(best_align[1]) - best_align[1][::-1].find(next(ch for ch in best_align[1][::-1] if ch != '-'))
+                        # Min-heap of the best max_hits hits; ties go to the reference found first
+                        top_hits: List[Tuple[float, int, BlastHit]] = []
+                        for ref_index, ref_record in enumerate(reference_records):
+                            hit = self._align_record(query_record, ref_record, window)
+                            if hit is None:
+                                continue
+                            total_hits += 1
                         
-                        # Calculate other BLAST-like statistics
-                        percent_identity = (identities / align_len) * 100 if align_len > 0 else 0
-                        
-                        # Only include hits above a certain identity threshold
-                        if percent_identity >= 70:  # Arbitrary threshold
-                            hit = BlastHit(
+                            # Stream each hit as soon as it's found
+                            report_progress(
+                                progress, "hits",
                                 query_id=query_id,
-                                subject_id=ref_record.id,
-                                percent_identity=percent_identity,
-                                alignment_length=align_len,
-                                mismatches=align_len - identities,
-                                gap_opens=gaps,
-                                query_start=q_start,
-                                query_end=q_end,
-                                subject_start=s_start,
-                                subject_end=s_end,
-                                evalue=0.001,  # Placeholder value
-                                bit_score=best_align[2]  # Score of the alignment
+                                records_processed=record_index - 1,
+                                hits_so_far=total_hits,
+                                hits=[hit]
                             )
-                            hits.append(hit)
-                
-                # Sort hits by percent identity (descending)
-                hits.sort(key=lambda h: h.percent_identity, reverse=True)
-                
-                # Limit to max_hits
-                hits = hits[:max_hits]
-                
-                result = BlastResult(
-                    query_id=query_id,
-                    query_length=query_length,
-                    hits=hits
-                )
-                results.append(result)
+                        
+                            entry = (hit.percent_identity, -ref_index, hit)
+                            if len(top_hits) < max_hits:
+                                heapq.heappush(top_hits, entry)
+                            elif top_hits:
+                                heapq.heappushpop(top_hits, entry)
+                    
+                        # Sort hits by percent identity (descending)
+                        hits = [hit for _, _, hit in sorted(top_hits, reverse=True)]
+                        HITS_PER_QUERY.observe(len(hits), endpoint=current_endpoint(), engine="direct_comparison")
+                        report_progress(progress, "record_done", query_id=query_id, records_processed=record_index, hits_so_far=total_hits)
+                    
+                        yield BlastResult(
+                            query_id=query_id,
+                            query_length=len(query_record.seq),
+                            hits=hits
+                        )
             
-            return results
+            except Exception as e:
+                self.logger.error(f"Error in direct sequence comparison: {str(e)}")
+                raise
+    
+    def _direct_comparison_window(self, longest_query: int, longest_reference: int) -> Optional[int]:
+        """
+        Length of the query windows to align so one alignment fits the per-request memory budget
+        
+        Args:
+            longest_query: Length of the longest query record
+            longest_reference: Length of the longest reference record
             
-        except Exception as e:
-            self.logger.error(f"Error in direct sequence comparison: {str(e)}")
-            raise
+        Returns:
+            Window length, or None if whole records fit (or no window is long enough to hold a hit)
+        """
+        budget = self.memory_guard.request_budget
+        cell_bytes = longest_reference * DIRECT_BYTES_PER_CELL
+        if not budget or not cell_bytes or self.memory_guard.fits_budget(longest_query * cell_bytes + longest_query):
+            return None
+        
+        window = (budget - longest_query) // cell_bytes
+        # A window must still advance past its overlap with the previous one
+        if window <= (WINDOW_OVERLAP_REFERENCES + 1) * longest_reference:
+            return None
+        return window
+    
+    def _query_windows(self, sequence: Any, reference_length: int, window: Optional[int]) -> Iterator[Tuple[int, Any]]:
+        """(offset, piece) of a query sequence to align, the whole sequence when it fits in one window"""
+        if not window or len(sequence) <= window:
+            yield 0, sequence
+            return
+        
+        step = window - WINDOW_OVERLAP_REFERENCES * reference_length
+        offset = 0
+        while True:
+            yield offset, sequence[offset:offset + window]
+            if offset + window >= len(sequence):
+                return
+            offset += step
+    
+    def _align_record(self, query_record: Any, ref_record: Any, window: Optional[int] = None) -> Optional[BlastHit]:
+        """
+        Locally align a query record with a reference record
+        
+        Args:
+            query_record: Query SeqRecord
+            ref_record: Reference SeqRecord
+            window: Align the query in overlapping windows of this length, keeping the best
+            
+        Returns:
+            BlastHit for the best alignment, or None if it is under 70% identity
+        """
+        from Bio import pairwise2
+        
+        best = None
+        for offset, query_seq in self._query_windows(query_record.seq, len(ref_record.seq), window):
+            # This is a simplified alternative to BLAST but will work for our demo.
+            # Only the best alignment is used, so the equally scoring alternatives aren't enumerated
+            alignments = pairwise2.align.localms(
+                query_seq,
+                ref_record.seq,
+                2,    # match score
+                -1,   # mismatch penalty
+                -2,   # gap open penalty
+                -0.5, # gap extension penalty
+                one_alignment_only=True
+            )
+            # Keep the best alignment and its window's offset, and release the rest
+            if alignments and (best is None or alignments[0][2] > best[0][2]):
+                best = (alignments[0], offset)
+            del alignments
+        
+        if best is None:
+            return None
+        alignment, offset = best
+        score = alignment[2]
+        align_len, identities, gaps, (q_start, q_end, s_start, s_end) = self._alignment_stats(
+            str(query_record.seq), str(ref_record.seq), alignment, offset
+        )
+        
+        # Calculate other BLAST-like statistics
+        percent_identity = (identities / align_len) * 100 if align_len > 0 else 0
+        
+        # Only include hits above a certain identity threshold
+        if percent_identity < 70:  # Arbitrary threshold
+            return None
+        
+        return BlastHit(
+            query_id=query_record.id,
+            subject_id=ref_record.id,
+            percent_identity=percent_identity,
+            alignment_length=align_len,
+            mismatches=align_len - identities,
+            gap_opens=gaps,
+            query_start=q_start,
+            query_end=q_end,
+            subject_start=s_start,
+            subject_end=s_end,
+            evalue=0.001,  # Placeholder value
+            bit_score=score  # Score of the alignment
+        )
+    
+    def _alignment_stats(self, query: str, subject: str, alignment: Any, offset: int) -> Tuple[int, int, int, Tuple[int, int, int, int]]:
+        """
+        Alignment statistics of a local alignment, as if it were laid out against the whole query
+        
+        pairwise2 pads the residues before and after the aligned region so the two
+        sequences line up, and the statistics count every column of that layout.
+        They are worked out from the aligned region and the residue counts around it,
+        so an alignment of one window gives the same values as one of the whole
+        record, without walking a padded genome-length string per reference.
+        
+        Args:
+            query: Whole query sequence
+            subject: Reference sequence
+            alignment: pairwise2 alignment of query[offset:...] with subject
+            offset: Where the aligned window starts in the query
+            
+        Returns:
+            (aligned columns, identities, gap columns, (query start, query end, subject start, subject end))
+        """
+        seq_a, seq_b, _, start, end = alignment
+        core_a, core_b = str(seq_a[start:end]), str(seq_b[start:end])
+        
+        # Residues before and after the aligned region in the whole query and the reference
+        q_pre = offset + len(str(seq_a[:start]).replace("-", ""))
+        s_pre = len(str(seq_b[:start]).replace("-", ""))
+        q_post = len(query) - q_pre - len(core_a.replace("-", ""))
+        s_post = len(subject) - s_pre - len(core_b.replace("-", ""))
+        
+        # Unaligned residues line up at the end of the prefix and the start of the suffix
+        pre, post = min(q_pre, s_pre), min(q_post, s_post)
+        columns = list(zip(core_a, core_b))
+        columns += zip(query[q_pre - pre:q_pre], subject[s_pre - pre:s_pre])
+        columns += zip(query[len(query) - q_post:len(query) - q_post + post], subject[len(subject) - s_post:len(subject) - s_post + post])
+        
+        align_len = identities = 0
+        gaps = (max(q_pre, s_pre) - pre) + (max(q_post, s_post) - post)
+        for q, s in columns:
+            if q != '-' and s != '-':
+                align_len += 1
+                if q == s:
+                    identities += 1
+            else:
+                gaps += 1
+        
+        prefix = max(q_pre, s_pre)
+        coordinates = (
+            prefix - q_pre,
+            prefix + len(core_a) + q_post,
+            prefix - s_pre,
+            prefix + len(core_a) + s_post
+        )
+        return align_len, identities, gaps, coordinates
+    
+    def _scan_fasta(self, fasta_path: str) -> Tuple[int, int]:
+        """
+        Count a FASTA file's records and find the longest, reading one line at a time
+        
+        Args:
+            fasta_path: Path to the FASTA file
+            
+        Returns:
+            (number of records, length of the longest record)
+        """
+        records = longest = length = 0
+        with open(fasta_path, "rb") as f:
+            for line in f:
+                if line.startswith(b">"):
+                    records += 1
+                    longest = max(longest, length)
+                    length = 0
+                else:
+                    length += len(line.strip())
+        return records, max(longest, length)
     
     def get_available_reference_genes(self) -> List[str]:
         """
@@ -295,7 +712,7 @@ class BlastService:
             
             # If we're using a local FASTA file as the database
             if os.path.exists(f"{db_path}.fasta"):
-                for record in SeqIO.parse(f"{db_path}.fasta", "fasta"):
+                for record in self._load_reference_records(f"{db_path}.fasta"):
                     gene_list.append(record.id)
                 return gene_list
                 
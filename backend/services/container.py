@@ -0,0 +1,282 @@
+import time
+import logging
+import importlib
+import threading
+from typing import Optional, Dict, Any
+from utils.config import Settings
+from services.blast_service import BlastService
+from services.resistance_analysis_service import ResistanceAnalysisService
+from services.supabase_service import SupabaseService
+from services.results_store import create_results_store
+from services.analysis_pipeline import AnalysisPipeline
+from services.batch_service import BatchAnalysisService
+from services.job_queue import JobQueue
+from services.progress import ProgressBroker
+from services.admission import AdmissionController
+from services.result_writer import ResultWriter
+from services.metrics import registry, endpoint_label
+from services.memory import rss_bytes, peak_rss_bytes
+from services.tracing import configure_tracing
+from services.profiling import RequestProfiler
+from utils.serialization import to_jsonable
+
+# Heavy modules the analysis pipeline needs on its first request
+WARMUP_MODULES = [
+    "Bio.SeqIO",
+    "Bio.pairwise2",
+    "Bio.Blast.NCBIXML",
+    "Bio.Blast.Applications",
+]
+
+class ServiceContainer:
+    """Application-lifetime services shared by every request"""
+
+    def __init__(self, settings: Optional[Settings] = None, supabase_service: Optional[SupabaseService] = None):
+        """
+        Args:
+            settings: Application settings
+            supabase_service: Used instead of a SupabaseService built from the settings
+                (e.g. a stand-in for load tests)
+        """
+        self.logger = logging.getLogger(__name__)
+        self.settings = settings or Settings()
+        self.tracer = configure_tracing(self.settings)
+
+        # Build each service once and share the settings between them
+        self.blast_service = BlastService(self.settings)
+        self.analysis_service = ResistanceAnalysisService(self.settings)
+        self.supabase_service = supabase_service or SupabaseService(self.settings)
+        self.results_store = create_results_store(self.settings, self.supabase_service)
+        if self.results_store is not self.supabase_service:
+            self.supabase_service.profile_store = self.results_store
+
+        # Write-behind only pays off for the remote store
+        self.result_writer = None
+        if (
+            self.settings.RESULT_WRITE_BEHIND
+            and self.results_store is self.supabase_service
+            and self.supabase_service.supabase is not None
+        ):
+            self.result_writer = ResultWriter(
+                self.results_store,
+                spool_path=self.settings.RESULT_SPOOL_PATH,
+                batch_size=self.settings.RESULT_FLUSH_SIZE,
+                flush_interval=self.settings.RESULT_FLUSH_INTERVAL,
+                max_backoff=self.settings.RESULT_MAX_BACKOFF
+            )
+
+        self.pipeline = AnalysisPipeline(
+            self.blast_service,
+            self.analysis_service,
+            self.results_store,
+            result_writer=self.result_writer,
+            reuse_results=self.settings.RESULT_REUSE
+        )
+        self.batch_service = BatchAnalysisService(
+            self.pipeline,
+            concurrency=self.settings.BATCH_CONCURRENCY,
+            save_batch_size=self.settings.BATCH_SAVE_SIZE
+        )
+        self.progress = ProgressBroker(
+            retention_seconds=self.settings.PROGRESS_RETENTION_SECONDS,
+            max_age_seconds=self.settings.PROGRESS_MAX_AGE_SECONDS,
+            max_events=self.settings.PROGRESS_MAX_EVENTS
+        )
+        self.job_queue = JobQueue(
+            db_path=self.settings.JOB_DB_PATH,
+            spool_dir=self.settings.JOB_SPOOL_DIR,
+            handler=self._run_job,
+            workers=self.settings.JOB_WORKERS,
+            progress=self.progress
+        )
+
+        # Admission control for the synchronous analysis endpoints, keyed by path
+        self.admission = {
+            "/api/blast": AdmissionController(
+                "blast",
+                max_in_flight=self.settings.BLAST_MAX_IN_FLIGHT,
+                max_queued=self.settings.BLAST_MAX_QUEUED,
+                queue_timeout=self.settings.ADMISSION_QUEUE_TIMEOUT,
+                retry_after=self.settings.ADMISSION_RETRY_AFTER
+            ),
+            "/api/analyze": AdmissionController(
+                "analyze",
+                max_in_flight=self.settings.ANALYZE_MAX_IN_FLIGHT,
+                max_queued=self.settings.ANALYZE_MAX_QUEUED,
+                queue_timeout=self.settings.ADMISSION_QUEUE_TIMEOUT,
+                retry_after=self.settings.ADMISSION_RETRY_AFTER
+            ),
+            "/api/batch": AdmissionController(
+                "batch",
+                max_in_flight=self.settings.BATCH_MAX_IN_FLIGHT,
+                max_queued=self.settings.BATCH_MAX_QUEUED,
+                queue_timeout=self.settings.ADMISSION_QUEUE_TIMEOUT,
+                retry_after=self.settings.ADMISSION_RETRY_AFTER
+            )
+        }
+
+        # None unless enabled, so unprofiled serving pays nothing for it
+        self.profiler = None
+        if self.settings.PROFILING_ENABLED:
+            self.profiler = RequestProfiler(
+                self.settings.PROFILE_DIR,
+                sample_ratio=self.settings.PROFILE_SAMPLE_RATIO,
+                memory=self.settings.PROFILE_MEMORY,
+                max_artifacts=self.settings.PROFILE_MAX_ARTIFACTS,
+                admin_token=self.settings.ADMIN_TOKEN
+            )
+
+        self._register_metrics()
+
+        # Flipped once warmup has finished; the readiness probe reports it
+        self.ready = False
+        self.warmup_stages: Dict[str, Any] = {}
+        self._warmup_cancelled = threading.Event()
+
+    def start(self) -> None:
+        """Start background workers"""
+        if self.result_writer is not None:
+            self.result_writer.start()
+        self.job_queue.start()
+
+    def stop(self) -> None:
+        """Stop background workers"""
+        self.job_queue.stop()
+        # After the job workers, so results of jobs that just finished get flushed
+        if self.result_writer is not None:
+            self.result_writer.stop()
+        self.tracer.shutdown()
+
+    def queue_depths(self) -> Dict[str, Any]:
+        """Current admission queues, memory reservations, job queue depth, shared in-flight analyses and write-behind lag"""
+        return {
+            "admission": {path: controller.stats() for path, controller in self.admission.items()},
+            "memory": self.blast_service.memory_guard.stats(),
+            "jobs": self.job_queue.depth(),
+            "single_flight": self.pipeline.single_flight.stats(),
+            "result_writer": self.result_writer.stats() if self.result_writer is not None else None
+        }
+
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """Hits and misses of the stored-result reuse, single-flight sharing and auth caches"""
+        reuse = self.pipeline.stats()
+        single_flight = self.pipeline.single_flight.stats()
+        caches = {
+            "result_reuse": {"hits": reuse["reused"], "misses": reuse["computed"]},
+            "single_flight": {"hits": single_flight["shared"], "misses": single_flight["leaders"]}
+        }
+        for name, stats in self.supabase_service.auth_cache_stats().items():
+            caches[f"auth_{name}"] = {"hits": stats["hits"], "misses": stats["misses"]}
+        return caches
+
+    def _register_metrics(self) -> None:
+        """Expose queue depths, cache counters and memory, read from the services at scrape time"""
+        def cache_requests() -> Dict[tuple, float]:
+            return {
+                (cache, result): stats[field]
+                for cache, stats in self.cache_stats().items()
+                for result, field in (("hit", "hits"), ("miss", "misses"))
+            }
+
+        def cache_hit_ratio() -> Dict[tuple, float]:
+            return {
+                (cache,): stats["hits"] / (stats["hits"] + stats["misses"]) if stats["hits"] + stats["misses"] else 0.0
+                for cache, stats in self.cache_stats().items()
+            }
+
+        def admission(field: str):
+            return lambda: {
+                (path,): controller.stats()[field]
+                for path, controller in self.admission.items()
+            }
+
+        registry.gauge(
+            "mrsa_cache_requests_total", "Cache lookups by cache and outcome",
+            ("cache", "result"), cache_requests, kind="counter"
+        )
+        registry.gauge("mrsa_cache_hit_ratio", "Fraction of cache lookups that hit", ("cache",), cache_hit_ratio)
+        registry.gauge("mrsa_admission_in_flight", "Requests running per admission-controlled endpoint", ("endpoint",), admission("in_flight"))
+        registry.gauge("mrsa_admission_queued", "Requests waiting per admission-controlled endpoint", ("endpoint",), admission("queued"))
+        registry.gauge(
+            "mrsa_jobs", "Analysis jobs by status", ("status",),
+            lambda: {(status,): count for status, count in self.job_queue.depth().items()}
+        )
+        registry.gauge(
+            "mrsa_single_flight_in_flight", "Distinct analyses currently running", (),
+            lambda: {(): self.pipeline.single_flight.stats()["in_flight"]}
+        )
+        registry.gauge(
+            "mrsa_process_resident_bytes", "Resident memory of the API process", (),
+            lambda: {(): value for value in (rss_bytes(),) if value is not None}
+        )
+        registry.gauge(
+            "mrsa_process_peak_resident_bytes", "Highest resident memory the API process has reached", (),
+            lambda: {(): value for value in (peak_rss_bytes(),) if value is not None}
+        )
+        memory_guard = self.blast_service.memory_guard
+        registry.gauge(
+            "mrsa_memory_reserved_bytes", "Memory reserved by searches running against the memory budgets", (),
+            lambda: {(): memory_guard.stats()["reserved_bytes"]}
+        )
+        registry.gauge(
+            "mrsa_memory_rejections_total", "Searches rejected for memory, by reason", ("reason",),
+            lambda: {
+                ("request_budget",): memory_guard.stats()["rejected_budget"],
+                ("process_limit",): memory_guard.stats()["rejected_pressure"]
+            },
+            kind="counter"
+        )
+        if self.result_writer is not None:
+            registry.gauge(
+                "mrsa_result_writer_pending", "Results spooled but not yet written to the store", (),
+                lambda: {(): self.result_writer.stats()["pending"]}
+            )
+
+    def _run_job(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        with endpoint_label("/api/jobs"):
+            analysis_results = self.pipeline.run(
+                job["file_path"],
+                sample_id=job["sample_id"],
+                threshold=job["params"].get("threshold", 0.75),
+                user_id=job["user_id"],
+                progress=self.progress.reporter(job["id"])
+            )
+        return to_jsonable(analysis_results)
+
+    def warmup(self) -> None:
+        """Page in modules, the reference DB and blastn so the first request runs at steady-state speed"""
+        self._run_stage("import_modules", self._import_modules)
+        self._run_stage("reference_index", self.blast_service.warmup)
+        self._run_stage("page_cache_bytes", self.blast_service.preload_database)
+        if self.settings.WARMUP_SYNTHETIC_SEARCH:
+            self._run_stage("synthetic_search_hits", self.blast_service.run_synthetic_search)
+
+        if self._warmup_cancelled.is_set():
+            self.logger.info(f"Warmup cancelled: {self.warmup_stages}")
+            return
+        self.ready = True
+        self.logger.info(f"Warmup finished: {self.warmup_stages}")
+
+    def cancel_warmup(self) -> None:
+        """Stop warmup before its next stage; a stage already running finishes first"""
+        self._warmup_cancelled.set()
+
+    def _import_modules(self) -> int:
+        for module_name in WARMUP_MODULES:
+            importlib.import_module(module_name)
+        return len(WARMUP_MODULES)
+
+    def _run_stage(self, name: str, stage) -> None:
+        if self._warmup_cancelled.is_set():
+            return
+        start = time.perf_counter()
+        try:
+            result = stage()
+            self.warmup_stages[name] = {
+                "result": result,
+                "duration_ms": round((time.perf_counter() - start) * 1000, 1)
+            }
+        except Exception as e:
+            # A failed warmup stage only means the first request pays the cost
+            self.logger.error(f"Error during warmup stage {name}: {str(e)}")
+            self.warmup_stages[name] = {"error": str(e)}
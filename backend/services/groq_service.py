@@ -1,19 +1,24 @@
 import os
 import logging
 from typing import List, Dict, Any, Optional
-import requests
 import json
 from utils.config import Settings
+from services.tracing import traced
 
 class GroqService:
     """Service for interacting with Groq AI for treatment recommendations"""
     
-    def __init__(self):
-        self.settings = Settings()
+    def __init__(self, settings: Optional[Settings] = None):
+        self.settings = settings or Settings()
         self.logger = logging.getLogger(__name__)
         self.api_key = self.settings.GROQ_API_KEY
         self.api_url = "https://api.groq.com/openai/v1/chat/completions"
+        
+        # Reuse keep-alive connections from the shared pool
+        from services.http_client import get_http_pool
+        self.http_client = get_http_pool(self.settings).client()
     
+    @traced("groq.get_treatment_recommendations")
     def get_treatment_recommendations(
         self,
         identified_genes: List[str],
@@ -72,7 +77,7 @@ class GroqService:
             }
             
             # Make the API call
-            response = requests.post(self.api_url, headers=headers, json=data)
+            response = self.http_client.post(self.api_url, headers=headers, json=data)
             response.raise_for_status()
             
             # Extract the response
@@ -0,0 +1,287 @@
+import time
+import logging
+import ipaddress
+import threading
+from typing import Dict, Any, Optional, Type
+from urllib.request import getproxies
+import httpx
+from utils.config import Settings
+
+def environment_proxies() -> Dict[str, Optional[str]]:
+    """
+    Proxy mounts from the HTTP(S)_PROXY, ALL_PROXY and NO_PROXY environment variables
+
+    Returns:
+        URL pattern -> proxy URL, or None for hosts that NO_PROXY sends direct
+    """
+    proxies = getproxies()
+    mounts: Dict[str, Optional[str]] = {}
+    for scheme in ("http", "https", "all"):
+        url = proxies.get(scheme)
+        if url:
+            mounts[f"{scheme}://"] = url if "://" in url else f"http://{url}"
+
+    for host in (host.strip() for host in proxies.get("no", "").split(",")):
+        if host == "*":
+            return {}
+        if not host:
+            continue
+        if "://" in host:
+            mounts[host] = None
+            continue
+        try:
+            address = ipaddress.ip_address(host)
+        except ValueError:
+            address = None
+        if address is not None and address.version == 6:
+            mounts[f"all://[{host}]"] = None
+        elif address is not None or host.lower() == "localhost":
+            mounts[f"all://{host}"] = None
+        else:
+            # A domain covers its subdomains too
+            mounts[f"all://*{host}"] = None
+    return mounts
+
+class _SharedTransport(httpx.BaseTransport):
+    """Passes requests to a pool-owned transport; closing a client leaves the pool open"""
+
+    def __init__(self, transport: httpx.BaseTransport):
+        self.transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        return self.transport.handle_request(request)
+
+    def close(self) -> None:
+        pass
+
+class _SharedAsyncTransport(httpx.AsyncBaseTransport):
+    """Passes requests to a pool-owned async transport; closing a client leaves the pool open"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self.transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        pass
+
+class HttpClientPool:
+    """
+    Shared, pooled HTTP clients for all outbound integrations (Groq, Supabase)
+
+    The integrations are synchronous libraries called from worker threads, so they use
+    client(); async_client() shares an equivalent pool for code on the event loop.
+    Clients can be closed freely, as the pool is only closed by close()/aclose().
+    """
+
+    def __init__(self, settings: Optional[Settings] = None):
+        self.settings = settings or Settings()
+        self.logger = logging.getLogger(__name__)
+
+        self.limits = httpx.Limits(
+            max_connections=self.settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=self.settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=self.settings.HTTP_KEEPALIVE_EXPIRY
+        )
+        self.timeout = httpx.Timeout(self.settings.HTTP_TIMEOUT)
+        self.http2 = self.settings.HTTP2_ENABLED and self._http2_available()
+
+        # One connection pool per process, shared by every client handed out
+        self._transport = httpx.HTTPTransport(limits=self.limits, http2=self.http2)
+        self._async_transport = httpx.AsyncHTTPTransport(limits=self.limits, http2=self.http2)
+
+        # httpx ignores HTTP(S)_PROXY for clients given a transport, so the environment's
+        # proxies are mounted here, each with its own shared pool; NO_PROXY hosts map to None,
+        # which sends them through the direct transport
+        self._proxy_transports: Dict[str, Optional[httpx.HTTPTransport]] = {}
+        self._async_proxy_transports: Dict[str, Optional[httpx.AsyncHTTPTransport]] = {}
+        for pattern, url in environment_proxies().items():
+            proxy = httpx.Proxy(url) if url else None
+            self._proxy_transports[pattern] = proxy and httpx.HTTPTransport(limits=self.limits, http2=self.http2, proxy=proxy)
+            self._async_proxy_transports[pattern] = proxy and httpx.AsyncHTTPTransport(limits=self.limits, http2=self.http2, proxy=proxy)
+
+        # Per-host metrics
+        self._lock = threading.Lock()
+        self._host_metrics: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def _http2_available() -> bool:
+        try:
+            import h2  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def client(
+        self,
+        base_url: str = "",
+        headers: Optional[Dict[str, str]] = None,
+        client_class: Type[httpx.Client] = httpx.Client
+    ) -> httpx.Client:
+        """
+        Get a synchronous client backed by the shared connection pool
+
+        Args:
+            base_url: Base URL for relative requests
+            headers: Default headers for every request
+            client_class: httpx.Client subclass to instantiate (e.g. postgrest's SyncClient)
+
+        Returns:
+            Client sharing the process-wide keep-alive pool
+        """
+        return client_class(
+            base_url=base_url,
+            headers=headers,
+            timeout=self.timeout,
+            transport=_SharedTransport(self._transport),
+            mounts={
+                pattern: transport and _SharedTransport(transport)
+                for pattern, transport in self._proxy_transports.items()
+            },
+            event_hooks={
+                "request": [self._on_request],
+                "response": [self._on_response]
+            }
+        )
+
+    def async_client(self, base_url: str = "", headers: Optional[Dict[str, str]] = None) -> httpx.AsyncClient:
+        """
+        Get an asynchronous client backed by the shared connection pool
+
+        Args:
+            base_url: Base URL for relative requests
+            headers: Default headers for every request
+
+        Returns:
+            AsyncClient sharing the process-wide keep-alive pool
+        """
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=self.timeout,
+            transport=_SharedAsyncTransport(self._async_transport),
+            mounts={
+                pattern: transport and _SharedAsyncTransport(transport)
+                for pattern, transport in self._async_proxy_transports.items()
+            },
+            event_hooks={
+                "request": [self._on_async_request],
+                "response": [self._on_async_response]
+            }
+        )
+
+    def _host_entry(self, host: str) -> Dict[str, Any]:
+        entry = self._host_metrics.get(host)
+        if entry is None:
+            entry = {
+                "requests": 0,
+                "errors": 0,
+                "connections_opened": 0,
+                "total_latency_ms": 0.0,
+                "max_latency_ms": 0.0
+            }
+            self._host_metrics[host] = entry
+        return entry
+
+    def _record_connection(self, host: str) -> None:
+        with self._lock:
+            self._host_entry(host)["connections_opened"] += 1
+
+    def _on_request(self, request: httpx.Request) -> None:
+        host = request.url.host
+
+        # httpcore reports every new TCP connection through the trace extension
+        def trace(event_name: str, info: Dict[str, Any]) -> None:
+            if event_name == "connection.connect_tcp.complete":
+                self._record_connection(host)
+
+        request.extensions["trace"] = trace
+        request.extensions["pool_started_at"] = time.perf_counter()
+
+    def _on_response(self, response: httpx.Response) -> None:
+        request = response.request
+        started_at = request.extensions.get("pool_started_at")
+        latency_ms = (time.perf_counter() - started_at) * 1000 if started_at else 0.0
+
+        with self._lock:
+            entry = self._host_entry(request.url.host)
+            entry["requests"] += 1
+            if response.status_code >= 400:
+                entry["errors"] += 1
+            entry["total_latency_ms"] += latency_ms
+            entry["max_latency_ms"] = max(entry["max_latency_ms"], latency_ms)
+
+    async def _on_async_request(self, request: httpx.Request) -> None:
+        host = request.url.host
+
+        async def trace(event_name: str, info: Dict[str, Any]) -> None:
+            if event_name == "connection.connect_tcp.complete":
+                self._record_connection(host)
+
+        request.extensions["trace"] = trace
+        request.extensions["pool_started_at"] = time.perf_counter()
+
+    async def _on_async_response(self, response: httpx.Response) -> None:
+        self._on_response(response)
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Get connection and latency metrics per outbound host
+
+        Returns:
+            Pool configuration and per-host counters
+        """
+        with self._lock:
+            hosts = {}
+            for host, entry in self._host_metrics.items():
+                requests_made = entry["requests"]
+                hosts[host] = {
+                    **entry,
+                    "avg_latency_ms": round(entry["total_latency_ms"] / requests_made, 2) if requests_made else 0.0,
+                    # Requests that did not need a fresh TCP+TLS handshake
+                    "connection_reuse_ratio": round(1 - entry["connections_opened"] / requests_made, 3) if requests_made else 0.0
+                }
+
+        return {
+            "http2": self.http2,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "keepalive_expiry": self.limits.keepalive_expiry,
+            "hosts": hosts
+        }
+
+    def close(self) -> None:
+        """Close the synchronous connection pools"""
+        self._transport.close()
+        for transport in self._proxy_transports.values():
+            if transport is not None:
+                transport.close()
+
+    async def aclose(self) -> None:
+        """Close both kinds of connection pool"""
+        self.close()
+        await self._async_transport.aclose()
+        for transport in self._async_proxy_transports.values():
+            if transport is not None:
+                await transport.aclose()
+
+_pool: Optional[HttpClientPool] = None
+_pool_lock = threading.Lock()
+
+def get_http_pool(settings: Optional[Settings] = None) -> HttpClientPool:
+    """Get the process-wide HTTP client pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = HttpClientPool(settings)
+    return _pool
+
+async def close_http_pool() -> None:
+    """Close the process-wide pool; the next get_http_pool() call builds a fresh one"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        await pool.aclose()
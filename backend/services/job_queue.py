@@ -0,0 +1,260 @@
+import os
+import uuid
+import shutil
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import BinaryIO, Callable, Dict, Any, List, Optional, Union
+from services.progress import ProgressBroker
+from services.tracing import start_span, current_traceparent
+from utils.serialization import encode, decode
+
+class JobStatus:
+    """Lifecycle states of a queued analysis job"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class JobQueue:
+    """Durable SQLite-backed queue of analysis jobs processed by a bounded worker pool"""
+
+    def __init__(
+        self,
+        db_path: str,
+        spool_dir: str,
+        handler: Callable[[Dict[str, Any]], Dict[str, Any]],
+        workers: int = 2,
+        poll_interval: float = 0.5,
+        progress: Optional[ProgressBroker] = None
+    ):
+        """
+        Args:
+            db_path: SQLite file holding the queue
+            spool_dir: Directory where uploaded FASTA files wait for a worker
+            handler: Called with the job row, returns the JSON-serializable result
+            workers: Number of worker threads
+            poll_interval: Seconds an idle worker waits before checking the queue again
+            progress: Broker receiving upload/start/finish events for each job
+        """
+        self.db_path = db_path
+        self.spool_dir = spool_dir
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.progress = progress
+        self.logger = logging.getLogger(__name__)
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        os.makedirs(spool_dir, exist_ok=True)
+
+        self._claim_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_schema(self) -> None:
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS analysis_jobs (
+                    id TEXT PRIMARY KEY,
+                    user_id TEXT,
+                    sample_id TEXT NOT NULL,
+                    file_path TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    started_at TEXT,
+                    finished_at TEXT,
+                    trace_context TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_analysis_jobs_status ON analysis_jobs (status, created_at)")
+
+            columns = [row["name"] for row in conn.execute("PRAGMA table_info(analysis_jobs)")]
+            if "trace_context" not in columns:
+                conn.execute("ALTER TABLE analysis_jobs ADD COLUMN trace_context TEXT")
+
+    def start(self) -> None:
+        """Requeue jobs interrupted by a restart and start the worker threads"""
+        with self._connect() as conn:
+            recovered = conn.execute(
+                "UPDATE analysis_jobs SET status = ?, started_at = NULL WHERE status = ?",
+                (JobStatus.QUEUED, JobStatus.RUNNING)
+            ).rowcount
+        if recovered:
+            self.logger.info(f"Requeued {recovered} jobs interrupted by a restart")
+
+        self._stopping.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"analysis-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the workers; running jobs are requeued on the next start if they don't finish"""
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(
+        self,
+        content: Union[bytes, BinaryIO],
+        sample_id: str,
+        user_id: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Spool an uploaded file and queue it for analysis
+
+        Args:
+            content: Uploaded FASTA content, or a binary stream of it copied in chunks
+            sample_id: Identifier stored with the result
+            user_id: Owner of the job
+            params: Analysis parameters (e.g. threshold)
+
+        Returns:
+            Job ID
+        """
+        job_id = str(uuid.uuid4())
+        file_path = os.path.join(self.spool_dir, f"{job_id}.fasta")
+        with open(file_path, "wb") as f:
+            if isinstance(content, bytes):
+                f.write(content)
+            else:
+                shutil.copyfileobj(content, f, 1024 * 1024)
+            size = f.tell()
+        self._publish(job_id, "upload_received", sample_id=sample_id, bytes=size)
+
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO analysis_jobs (id, user_id, sample_id, file_path, params, status, created_at, trace_context)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    job_id, user_id, sample_id, file_path, encode(params or {}).decode(),
+                    JobStatus.QUEUED, datetime.now().isoformat(), current_traceparent()
+                )
+            )
+
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a job's status and, once finished, its result or error
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            Job data, or None if the job doesn't exist
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM analysis_jobs WHERE id = ?", (job_id,)).fetchone()
+
+        if row is None:
+            return None
+
+        job = dict(row)
+        job["params"] = decode(job["params"])
+        job["result"] = decode(job["result"]) if job["result"] else None
+        job.pop("file_path")
+        job.pop("trace_context")
+        return job
+
+    def depth(self) -> Dict[str, int]:
+        """Number of jobs per status"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM analysis_jobs GROUP BY status").fetchall()
+        counts = {status: 0 for status in (JobStatus.QUEUED, JobStatus.RUNNING, JobStatus.COMPLETED, JobStatus.FAILED)}
+        counts.update({row["status"]: row["n"] for row in rows})
+        return counts
+
+    def _claim_next(self) -> Optional[Dict[str, Any]]:
+        # BEGIN IMMEDIATE takes the write lock, so two workers never claim the same job
+        with self._claim_lock:
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute(
+                    "SELECT * FROM analysis_jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                    (JobStatus.QUEUED,)
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                conn.execute(
+                    "UPDATE analysis_jobs SET status = ?, started_at = ? WHERE id = ?",
+                    (JobStatus.RUNNING, datetime.now().isoformat(), row["id"])
+                )
+                conn.execute("COMMIT")
+                job = dict(row)
+                job["params"] = decode(job["params"])
+                return job
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.close()
+
+    def _finish(self, job_id: str, status: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE analysis_jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, encode(result).decode() if result is not None else None, error, datetime.now().isoformat(), job_id)
+            )
+
+    def _worker_loop(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                job = self._claim_next()
+            except Exception as e:
+                self.logger.error(f"Error claiming job: {str(e)}")
+                job = None
+
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            self._process(job)
+
+    def _publish(self, job_id: str, stage: str, **data: Any) -> None:
+        if self.progress is not None:
+            self.progress.publish(job_id, stage, **data)
+
+    def _process(self, job: Dict[str, Any]) -> None:
+        self.logger.info(f"Processing job {job['id']} ({job['sample_id']})")
+        self._publish(job["id"], JobStatus.RUNNING)
+        try:
+            # The worker's spans continue the trace of the request that submitted the job
+            with start_span("job", traceparent=job.get("trace_context"), job_id=job["id"]):
+                result = self.handler(job)
+            self._finish(job["id"], JobStatus.COMPLETED, result=result)
+            self._publish(job["id"], JobStatus.COMPLETED)
+        except Exception as e:
+            self.logger.error(f"Job {job['id']} failed: {str(e)}")
+            try:
+                self._finish(job["id"], JobStatus.FAILED, error=str(e))
+            except Exception as finish_error:
+                # The worker must outlive this; the job stays running and is requeued on restart
+                self.logger.error(f"Error recording failure of job {job['id']}: {str(finish_error)}")
+            self._publish(job["id"], JobStatus.FAILED, error=str(e))
+        finally:
+            if os.path.exists(job["file_path"]):
+                os.remove(job["file_path"])
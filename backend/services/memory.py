@@ -0,0 +1,164 @@
+import os
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+try:
+    import resource
+except ImportError:
+    # Windows: resident memory isn't measured there
+    resource = None
+
+MB = 1024 * 1024
+
+_page_size: Optional[int] = None
+
+class MemoryRejected(Exception):
+    """Raised when work can't be given the memory it needs; carries the HTTP status and Retry-After"""
+
+    def __init__(self, status_code: int, detail: str, retry_after: Optional[int] = None):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+    def headers(self) -> Optional[Dict[str, str]]:
+        return {"Retry-After": str(self.retry_after)} if self.retry_after is not None else None
+
+def _get_page_size() -> Optional[int]:
+    global _page_size
+    if _page_size is None and hasattr(os, "sysconf"):
+        try:
+            _page_size = os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError):
+            pass
+    return _page_size
+
+def rss_bytes() -> Optional[int]:
+    """Resident memory of this process, None where it can't be read"""
+    page_size = _get_page_size()
+    if page_size is not None:
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * page_size
+        except (OSError, ValueError, IndexError):
+            pass
+    return peak_rss_bytes()
+
+def peak_rss_bytes() -> Optional[int]:
+    """Highest resident memory this process has reached, None where it can't be read"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+def memory_sample() -> Tuple[Optional[int], Optional[int], Optional[int]]:
+    """
+    (resident, peak resident, live traced) bytes
+
+    Resident figures are None where the platform doesn't report them, the traced one
+    unless tracemalloc is tracing.
+    """
+    traced = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+    return rss_bytes(), peak_rss_bytes(), traced
+
+def memory_growth(before: Tuple[Optional[int], Optional[int], Optional[int]]) -> Dict[str, Optional[int]]:
+    """
+    How memory changed since a memory_sample(), None for figures that weren't measured
+
+    Resident and peak figures are process-wide, so concurrent requests add to each
+    other's; the allocated figure is only known while tracemalloc is tracing.
+    """
+    after = memory_sample()
+    rss, peak, allocated = (
+        now - then if now is not None and then is not None else None
+        for now, then in zip(after, before)
+    )
+    return {"rss": rss, "peak_rss": peak, "allocated": allocated}
+
+class MemoryGuard:
+    """Admits memory-hungry work against a per-request budget and a process-wide limit"""
+
+    def __init__(self, request_budget: int = 0, process_limit: int = 0, retry_after: int = 5):
+        """
+        Args:
+            request_budget: Bytes one request's work may be estimated to need; 0 disables the check
+            process_limit: Resident bytes the process should stay under; 0 disables the check,
+                as does a platform where resident memory can't be read
+            retry_after: Value of the Retry-After header when the process is short of memory
+        """
+        self.request_budget = request_budget
+        self.process_limit = process_limit
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+
+        self.reserved = 0
+        self.admitted = 0
+        self.rejected_budget = 0
+        self.rejected_pressure = 0
+
+    def fits_budget(self, estimate: int) -> bool:
+        return not self.request_budget or estimate <= self.request_budget
+
+    @contextmanager
+    def reserve(self, estimate: int, description: str) -> Iterator[None]:
+        """
+        Hold a reservation of estimate bytes while the block runs
+
+        Args:
+            estimate: Bytes the work is expected to need at its peak
+            description: What the work is, for the rejection message
+
+        Raises:
+            MemoryRejected: 413 when the estimate is over the request budget, 503 when it
+                would take the process past its limit given the reservations already held
+        """
+        if not self.fits_budget(estimate):
+            with self._lock:
+                self.rejected_budget += 1
+            raise MemoryRejected(
+                413,
+                f"{description} needs an estimated {estimate / MB:.0f} MB, "
+                f"over the {self.request_budget / MB:.0f} MB per-request memory budget"
+            )
+
+        with self._lock:
+            # Running work is counted both in the resident size and in its reservation,
+            # which errs on the side of rejecting
+            resident = rss_bytes() if self.process_limit else None
+            if resident is not None and resident + self.reserved + estimate > self.process_limit:
+                self.rejected_pressure += 1
+                raise MemoryRejected(
+                    503,
+                    f"{description} would take the process past its memory limit, retry later",
+                    self.retry_after
+                )
+            self.reserved += estimate
+            self.admitted += 1
+
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.reserved -= estimate
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "reserved_bytes": self.reserved,
+                "request_budget_bytes": self.request_budget,
+                "process_limit_bytes": self.process_limit,
+                "admitted": self.admitted,
+                "rejected_budget": self.rejected_budget,
+                "rejected_pressure": self.rejected_pressure
+            }
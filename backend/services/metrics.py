@@ -0,0 +1,283 @@
+import time
+import bisect
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from services.tracing import start_span, record_timing
+from services.memory import MB, memory_sample, memory_growth
+
+# Default latency buckets in seconds, from a cached lookup to a long blastn run
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# Memory buckets in bytes, from a cached lookup to a pairwise alignment of a long record
+MEMORY_BUCKETS = tuple(size * MB for size in (0.25, 1, 4, 16, 64, 256, 1024, 4096))
+
+# Label values of the request being served; set by MetricsMiddleware and the job workers
+_endpoint: contextvars.ContextVar[str] = contextvars.ContextVar("metrics_endpoint", default="none")
+_engine: contextvars.ContextVar[str] = contextvars.ContextVar("metrics_engine", default="none")
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    """Monotonic count, e.g. fallbacks to direct comparison"""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in sorted(values.items())]
+
+class Histogram(_Metric):
+    """Distribution of observations in cumulative buckets, e.g. stage latencies"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last one is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the wall time of a block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            series = {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+
+        lines = []
+        for key, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="%s"' % _format_value(float(bound))
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+class Gauge(_Metric):
+    """
+    Values read from a callback at scrape time, e.g. queue depths
+
+    With kind="counter" the callback reports running totals kept elsewhere (such
+    as a cache's hit count), so the hot path pays nothing for the metric.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        collect: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None,
+        kind: str = "gauge"
+    ):
+        super().__init__(name, documentation, labels)
+        self.collect = collect
+        self.kind = kind
+
+    def _samples(self) -> List[str]:
+        values = self.collect() if self.collect else {}
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in sorted(values.items())]
+
+class MetricsRegistry:
+    """Process-wide set of metrics rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            # Re-registering (e.g. a second ServiceContainer in tests) replaces the old metric
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        collect: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None,
+        kind: str = "gauge"
+    ) -> Gauge:
+        return self._register(Gauge(name, documentation, labels, collect, kind))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception:
+                # A failing gauge callback must not take the whole scrape down
+                continue
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+REQUEST_SECONDS = registry.histogram(
+    "mrsa_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("endpoint", "method", "status")
+)
+STAGE_SECONDS = registry.histogram(
+    "mrsa_stage_duration_seconds",
+    "Time spent in each analysis pipeline stage",
+    ("endpoint", "engine", "stage")
+)
+BLASTN_WALL_SECONDS = registry.histogram(
+    "mrsa_blastn_wall_seconds",
+    "Wall-clock time of blastn processes",
+    ("endpoint",)
+)
+BLASTN_CPU_SECONDS = registry.histogram(
+    "mrsa_blastn_cpu_seconds",
+    "User plus system CPU time of blastn processes",
+    ("endpoint",)
+)
+HITS_PER_QUERY = registry.histogram(
+    "mrsa_hits_per_query",
+    "Alignment hits found per query record",
+    ("endpoint", "engine"),
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 500)
+)
+STAGE_RSS_GROWTH_BYTES = registry.histogram(
+    "mrsa_stage_rss_growth_bytes",
+    "Growth of the process's resident memory over each analysis pipeline stage",
+    ("endpoint", "engine", "stage"),
+    buckets=MEMORY_BUCKETS
+)
+STAGE_PEAK_RSS_GROWTH_BYTES = registry.histogram(
+    "mrsa_stage_peak_rss_growth_bytes",
+    "Rise of the process's peak resident memory during each analysis pipeline stage",
+    ("endpoint", "engine", "stage"),
+    buckets=MEMORY_BUCKETS
+)
+STAGE_ALLOCATED_BYTES = registry.histogram(
+    "mrsa_stage_allocated_bytes",
+    "Python allocations still live at the end of each stage, while tracemalloc is tracing (memory profiles)",
+    ("endpoint", "engine", "stage"),
+    buckets=MEMORY_BUCKETS
+)
+DIRECT_COMPARISON_FALLBACKS = registry.counter(
+    "mrsa_direct_comparison_fallbacks_total",
+    "Searches run with the pairwise-alignment fallback instead of blastn",
+    ("endpoint", "reason")
+)
+
+def current_endpoint() -> str:
+    return _endpoint.get()
+
+def current_engine() -> str:
+    return _engine.get()
+
+def set_engine(engine: str) -> None:
+    """Record the search engine serving the current request, used as the engine label of later stages"""
+    _engine.set(engine)
+
+@contextmanager
+def endpoint_label(endpoint: str) -> Iterator[None]:
+    """Attribute the metrics recorded inside the block to an endpoint"""
+    endpoint_token = _endpoint.set(endpoint)
+    engine_token = _engine.set("none")
+    try:
+        yield
+    finally:
+        _engine.reset(engine_token)
+        _endpoint.reset(endpoint_token)
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """
+    Observe a pipeline stage's duration and memory growth, labeled with the current endpoint and engine
+
+    The stage also gets a tracing span and an entry in the request's Server-Timing header.
+    """
+    started = time.perf_counter()
+    before = memory_sample()
+    growth = None
+    try:
+        with start_span(stage) as span:
+            try:
+                yield
+            finally:
+                growth = memory_growth(before)
+                if growth["rss"] is not None:
+                    span.set_attribute("memory.rss_growth_bytes", growth["rss"])
+                    span.set_attribute("memory.peak_rss_growth_bytes", growth["peak_rss"])
+    finally:
+        duration = time.perf_counter() - started
+        labels = {"endpoint": _endpoint.get(), "engine": _engine.get(), "stage": stage}
+        STAGE_SECONDS.observe(duration, **labels)
+        record_timing(stage, duration * 1000)
+        if growth is not None:
+            if growth["rss"] is not None:
+                STAGE_RSS_GROWTH_BYTES.observe(max(0, growth["rss"]), **labels)
+            if growth["peak_rss"] is not None:
+                STAGE_PEAK_RSS_GROWTH_BYTES.observe(growth["peak_rss"], **labels)
+            if growth["allocated"] is not None:
+                STAGE_ALLOCATED_BYTES.observe(max(0, growth["allocated"]), **labels)
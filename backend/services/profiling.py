@@ -0,0 +1,271 @@
+import os
+import re
+import hmac
+import json
+import time
+import pstats
+import random
+import cProfile
+import logging
+import threading
+import contextvars
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Functions and allocation sites kept in an artifact's summary
+TOP_ENTRIES = 25
+
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+_session: contextvars.ContextVar[Optional["ProfileSession"]] = contextvars.ContextVar("profile_session", default=None)
+
+# cProfile hooks one thread; a nested profiled() block in the same thread reuses the outer profile
+_thread_state = threading.local()
+
+class ProfileSession:
+    """Profiles collected while serving one request, from every thread that ran its pipeline"""
+
+    def __init__(self, request_id: str, trigger: str, memory: bool):
+        self.request_id = request_id
+        self.trigger = trigger
+        self.memory = memory
+        self.started = time.perf_counter()
+        self.stats: Optional[pstats.Stats] = None
+        self.snapshot: Optional[tracemalloc.Snapshot] = None
+        self.traced_peak_bytes = 0
+        self._lock = threading.Lock()
+
+    def add(self, profile: cProfile.Profile) -> None:
+        with self._lock:
+            if self.stats is None:
+                self.stats = pstats.Stats(profile)
+            else:
+                self.stats.add(profile)
+
+    def take_snapshot(self) -> None:
+        if not tracemalloc.is_tracing():
+            return
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, cProfile.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>")
+        ))
+        with self._lock:
+            self.snapshot = snapshot
+            self.traced_peak_bytes = max(self.traced_peak_bytes, tracemalloc.get_traced_memory()[1])
+
+@contextmanager
+def profiled() -> Iterator[None]:
+    """
+    CPU-profile a block (and snapshot allocations) if the current request is being profiled
+
+    Costs one context variable lookup when it isn't.
+    """
+    session = _session.get()
+    if session is None or getattr(_thread_state, "active", False):
+        yield
+        return
+
+    profile = cProfile.Profile()
+    _thread_state.active = True
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        _thread_state.active = False
+        session.add(profile)
+        if session.memory:
+            session.take_snapshot()
+
+class RequestProfiler:
+    """Decides which requests to profile and stores their artifacts by request ID"""
+
+    def __init__(
+        self,
+        directory: str,
+        sample_ratio: float = 0.0,
+        memory: bool = False,
+        max_artifacts: int = 100,
+        admin_token: str = ""
+    ):
+        """
+        Args:
+            directory: Where artifacts are written
+            sample_ratio: Fraction of requests profiled without being asked to
+            memory: Also trace allocations of sampled requests
+            max_artifacts: Profiles kept before the oldest are deleted
+            admin_token: Value of X-Admin-Token that lets a request ask for a profile
+        """
+        self.directory = directory
+        self.sample_ratio = sample_ratio
+        self.memory = memory
+        self.max_artifacts = max_artifacts
+        self.admin_token = admin_token
+        self.logger = logging.getLogger(__name__)
+
+        # Requests tracing allocations; tracemalloc is process-wide, so it runs while any is
+        self._tracing = 0
+        self._tracing_lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+
+    def decide(self, profile_header: Optional[str], admin_token: Optional[str]) -> Optional[Tuple[str, bool]]:
+        """
+        Whether to profile a request
+
+        Args:
+            profile_header: X-Profile value, "cpu" or "cpu,memory"
+            admin_token: X-Admin-Token value
+
+        Returns:
+            (trigger, trace allocations), or None to serve the request unprofiled
+        """
+        if profile_header and self.authorized(admin_token):
+            kinds = {part.strip().lower() for part in profile_header.split(",")}
+            return "header", "memory" in kinds
+        if self.sample_ratio and random.random() < self.sample_ratio:
+            return "sampled", self.memory
+        return None
+
+    def authorized(self, admin_token: Optional[str]) -> bool:
+        return bool(self.admin_token and admin_token and hmac.compare_digest(admin_token, self.admin_token))
+
+    @contextmanager
+    def session(self, request_id: str, trigger: str, memory: bool) -> Iterator[ProfileSession]:
+        """Profile the pipeline blocks run inside this context for one request"""
+        session = ProfileSession(request_id, trigger, memory)
+        if memory:
+            self._start_tracing()
+        token = _session.set(session)
+        try:
+            yield session
+        finally:
+            _session.reset(token)
+            if memory:
+                self._stop_tracing()
+
+    def save(self, session: ProfileSession, **metadata: Any) -> Optional[str]:
+        """
+        Write a session's artifacts
+
+        Args:
+            session: Finished session
+            **metadata: Request details stored alongside (method, route, status, ...)
+
+        Returns:
+            The request ID, or None if the request never reached a profiled block
+
+        Raises:
+            FileExistsError: If a profile is already stored under the request ID
+        """
+        if session.stats is None:
+            return None
+
+        base = os.path.join(self.directory, session.request_id)
+        if os.path.exists(f"{base}.json"):
+            raise FileExistsError(f"A profile named {session.request_id} is already stored")
+        session.stats.dump_stats(f"{base}.prof")
+        if session.snapshot is not None:
+            session.snapshot.dump(f"{base}.tracemalloc")
+
+        summary = {
+            "request_id": session.request_id,
+            "created_at": datetime.now().isoformat(),
+            "trigger": session.trigger,
+            "duration_ms": round((time.perf_counter() - session.started) * 1000, 1),
+            **metadata,
+            "cpu": _top_functions(session.stats),
+            "memory": _top_allocations(session.snapshot, session.traced_peak_bytes) if session.snapshot is not None else None
+        }
+        with open(f"{base}.json", "w") as f:
+            json.dump(summary, f, indent=2)
+
+        self._prune()
+        self.logger.info(f"Saved {session.trigger} profile {session.request_id} ({summary['duration_ms']} ms)")
+        return session.request_id
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Stored profiles, newest first, without their function and allocation tables"""
+        profiles = []
+        for path in self._summaries():
+            try:
+                with open(path) as f:
+                    summary = json.load(f)
+            except (OSError, ValueError):
+                continue
+            summary.pop("cpu", None)
+            memory = summary.pop("memory", None)
+            summary["memory"] = memory is not None
+            profiles.append(summary)
+        return profiles
+
+    def get(self, request_id: str) -> Optional[Dict[str, Any]]:
+        """A stored profile's summary, None if there is none"""
+        path = self.artifact_path(request_id, "json")
+        if path is None:
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def artifact_path(self, request_id: str, kind: str) -> Optional[str]:
+        """Path of a stored artifact ("prof", "tracemalloc" or "json"), None if it doesn't exist"""
+        if not valid_request_id(request_id):
+            return None
+        path = os.path.join(self.directory, f"{request_id}.{kind}")
+        return path if os.path.exists(path) else None
+
+    def _summaries(self) -> List[str]:
+        paths = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(".json")]
+        return sorted(paths, key=os.path.getmtime, reverse=True)
+
+    def _prune(self) -> None:
+        for path in self._summaries()[self.max_artifacts:]:
+            base = path[:-len(".json")]
+            for kind in ("json", "prof", "tracemalloc"):
+                try:
+                    os.remove(f"{base}.{kind}")
+                except OSError:
+                    pass
+
+    def _start_tracing(self) -> None:
+        with self._tracing_lock:
+            self._tracing += 1
+            if self._tracing == 1:
+                tracemalloc.start(16)
+
+    def _stop_tracing(self) -> None:
+        with self._tracing_lock:
+            self._tracing -= 1
+            if self._tracing == 0:
+                tracemalloc.stop()
+
+def valid_request_id(request_id: str) -> bool:
+    """Request IDs name files, so only short IDs of letters, digits, - and _ are accepted"""
+    return bool(request_id and _REQUEST_ID.match(request_id))
+
+def _top_functions(stats: pstats.Stats) -> Dict[str, Any]:
+    entries = []
+    for (filename, line, name), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        entries.append({
+            "function": f"{filename}:{line}({name})",
+            "calls": calls,
+            "tottime_ms": round(tottime * 1000, 2),
+            "cumtime_ms": round(cumtime * 1000, 2)
+        })
+    entries.sort(key=lambda entry: entry["cumtime_ms"], reverse=True)
+    return {"total_ms": round(stats.total_tt * 1000, 2), "top": entries[:TOP_ENTRIES]}
+
+def _top_allocations(snapshot: tracemalloc.Snapshot, peak_bytes: int) -> Dict[str, Any]:
+    # Allocations still live when the pipeline finished; with concurrent requests they include theirs
+    statistics = snapshot.statistics("lineno")
+    return {
+        "traced_peak_mb": round(peak_bytes / (1024 * 1024), 2),
+        "live_mb": round(sum(stat.size for stat in statistics) / (1024 * 1024), 2),
+        "top": [
+            {"location": str(stat.traceback[0]), "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+            for stat in statistics[:TOP_ENTRIES]
+        ]
+    }
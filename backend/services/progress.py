@@ -0,0 +1,96 @@
+import time
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Called as progress(stage, **data) by the pipeline stages
+ProgressCallback = Callable[..., None]
+
+# Stages after which a job emits no further events
+TERMINAL_STAGES = ("completed", "failed")
+
+class ProgressBroker:
+    """In-memory log of pipeline progress events per job, read by streaming clients"""
+
+    def __init__(self, retention_seconds: float = 600.0, max_age_seconds: float = 3600.0, max_events: int = 1000):
+        """
+        Args:
+            retention_seconds: How long a finished job's events stay available
+            max_age_seconds: How long events of a job that never finishes (e.g. one
+                requeued by a restart) stay available after its last event
+            max_events: Events kept per job; older ones are dropped first
+        """
+        self.retention_seconds = retention_seconds
+        self.max_age_seconds = max_age_seconds
+        self.max_events = max_events
+        self._lock = threading.Lock()
+        self._events: Dict[str, List[Dict[str, Any]]] = {}
+        # Events dropped from the front of each job's list, so indices stay stable
+        self._dropped: Dict[str, int] = {}
+        self._finished_at: Dict[str, float] = {}
+        self._last_event_at: Dict[str, float] = {}
+
+    def publish(self, job_id: str, stage: str, **data: Any) -> None:
+        """
+        Record a progress event for a job
+
+        Args:
+            job_id: Job ID
+            stage: Pipeline stage name (e.g. "search_started", "matching_region")
+            **data: JSON-serializable event details
+        """
+        now = time.time()
+        event = {"stage": stage, "timestamp": now, **data}
+        with self._lock:
+            events = self._events.setdefault(job_id, [])
+            events.append(event)
+            if len(events) > self.max_events:
+                excess = len(events) - self.max_events
+                del events[:excess]
+                self._dropped[job_id] = self._dropped.get(job_id, 0) + excess
+            self._last_event_at[job_id] = now
+            if stage in TERMINAL_STAGES:
+                self._finished_at[job_id] = now
+            self._expire(now)
+
+    def reporter(self, job_id: str) -> ProgressCallback:
+        """Get a progress callback bound to a job"""
+        def report(stage: str, **data: Any) -> None:
+            self.publish(job_id, stage, **data)
+        return report
+
+    def events_since(self, job_id: str, index: int) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Get the events recorded after the first `index` events
+
+        Args:
+            job_id: Job ID
+            index: Index returned by the previous call, 0 at first
+
+        Returns:
+            (new events oldest first, index to pass next time); events dropped
+            by max_events before the caller read them are skipped
+        """
+        with self._lock:
+            events = self._events.get(job_id, [])
+            dropped = self._dropped.get(job_id, 0)
+            return list(events[max(0, index - dropped):]), dropped + len(events)
+
+    def _expire(self, now: float) -> None:
+        finished_cutoff = now - self.retention_seconds
+        idle_cutoff = now - self.max_age_seconds
+        expired = [j for j, finished in self._finished_at.items() if finished < finished_cutoff]
+        expired += [j for j, last in self._last_event_at.items() if last < idle_cutoff]
+        for job_id in expired:
+            self._events.pop(job_id, None)
+            self._dropped.pop(job_id, None)
+            self._finished_at.pop(job_id, None)
+            self._last_event_at.pop(job_id, None)
+
+def report_progress(progress: Optional[ProgressCallback], stage: str, **data: Any) -> None:
+    """Call a progress callback if one was given, never letting it break the pipeline"""
+    if progress is None:
+        return
+    try:
+        progress(stage, **data)
+    except Exception:
+        pass
@@ -1,7 +1,7 @@
 import os
 import uuid
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Optional, Union
 from models.blast_model import BlastResult, BlastHit
 from models.resistance_model import (
     ResistanceAnalysisResult,
@@ -10,19 +10,54 @@ from models.resistance_model import (
     TreatmentRecommendation
 )
 from utils.config import Settings
+from services.metrics import stage_timer
+from services.tracing import traced
+
+class ResistanceFindings:
+    """
+    Resistance gene matches gathered from BLAST results one at a time
+
+    Lets a caller fold results into the analysis as a search yields them, instead of
+    holding every result until the search is done; only the first result is kept,
+    for the confidence calculation.
+    """
+
+    def __init__(self, service: "ResistanceAnalysisService"):
+        self.service = service
+        self.matching_regions: List[MatchingRegion] = []
+        self.identified_genes: List[str] = []
+        self.first_result: Optional[BlastResult] = None
+        self.sample_id = "unknown"
+        self.records = 0
+
+    def add(self, result: BlastResult) -> None:
+        if self.first_result is None:
+            self.first_result = result
+        self.records += 1
+        self.sample_id = result.query_id  # Use the query ID as the sample ID
+
+        for hit in result.hits:
+            region = self.service.matching_region_for_hit(hit)
+            if region is not None:
+                # Add to identified genes if not already there
+                if region.gene_name not in self.identified_genes:
+                    self.identified_genes.append(region.gene_name)
+
+                # Add matching region
+                self.matching_regions.append(region)
 
 class ResistanceAnalysisService:
     """Service for analyzing antibiotic resistance based on BLAST results"""
     
-    def __init__(self):
-        self.settings = Settings()
+    def __init__(self, settings: Optional[Settings] = None):
+        self.settings = settings or Settings()
         self.logger = logging.getLogger(__name__)
         
         # Initialize Groq service if API key is available
         try:
             from services.groq_service import GroqService
             if hasattr(self.settings, 'GROQ_API_KEY') and self.settings.GROQ_API_KEY:
-                self.groq_service = GroqService()
+                self.groq_service = GroqService(self.settings)
             else:
                 self.groq_service = None
         except ImportError:
@@ -62,68 +97,51 @@ class ResistanceAnalysisService:
             }
         }
     
+    def start_findings(self) -> ResistanceFindings:
+        """Findings to add BLAST results to as they arrive, then pass to analyze_resistance"""
+        return ResistanceFindings(self)
+    
+    @traced("resistance.analyze_resistance")
     def analyze_resistance(
         self, 
-        blast_results: List[BlastResult], 
+        blast_results: Union[Iterable[BlastResult], ResistanceFindings], 
         threshold: float = 0.75
     ) -> ResistanceAnalysisResult:
         """
         Analyze BLAST results to determine antibiotic resistance
         
         Args:
-            blast_results: List of BlastResult objects
+            blast_results: BlastResult objects, or findings already gathered from them
             threshold: Minimum alignment score threshold (0-1)
             
         Returns:
             ResistanceAnalysisResult object
         """
         try:
-            # Initialize variables
-            resistance_status = ResistanceStatus.SUSCEPTIBLE
-            confidence_score = 0.0
-            matching_regions = []
-            identified_genes = []
-            sample_id = "unknown"
-            
             # Process BLAST hits
-            for result in blast_results:
-                sample_id = result.query_id  # Use the query ID as the sample ID
-                
-                for hit in result.hits:
-                    # FIXED: Better gene name extraction
-                    gene_name = self._extract_gene_name(hit.subject_id)
-                    
-                    # Check if this is a known resistance gene
-                    if gene_name in self.resistance_genes:
-                        # Check if the percent identity exceeds the significance threshold
-                        if hit.percent_identity >= self.resistance_genes[gene_name]["significance_threshold"]:
-                            # Add to identified genes if not already there
-                            if gene_name not in identified_genes:
-                                identified_genes.append(gene_name)
-                            
-                            # Add matching region
-                            region = MatchingRegion(
-                                gene_name=gene_name,
-                                query_start=hit.query_start,
-                                query_end=hit.query_end,
-                                subject_start=hit.subject_start,
-                                subject_end=hit.subject_end,
-                                percent_identity=hit.percent_identity,
-                                alignment_length=hit.alignment_length,
-                                evalue=hit.evalue
-                            )
-                            matching_regions.append(region)
+            if isinstance(blast_results, ResistanceFindings):
+                findings = blast_results
+            else:
+                findings = self.start_findings()
+                for result in blast_results:
+                    findings.add(result)
+            
+            matching_regions = findings.matching_regions
+            identified_genes = findings.identified_genes
+            sample_id = findings.sample_id
+            # The confidence calculations only look at the first result
+            first_results = [findings.first_result] if findings.first_result is not None else []
             
             # Determine resistance status and confidence
             if len(identified_genes) > 0:
                 resistance_status = ResistanceStatus.RESISTANT
                 # FIXED: Better confidence calculation
-                confidence_score = self._calculate_confidence_score_fixed(matching_regions, blast_results)
+                confidence_score = self._calculate_confidence_score_fixed(matching_regions, first_results)
             else:
                 # No resistance genes found
                 resistance_status = ResistanceStatus.SUSCEPTIBLE
                 # FIXED: More nuanced susceptible confidence calculation
-                confidence_score = self._calculate_susceptible_confidence(blast_results)
+                confidence_score = self._calculate_susceptible_confidence(first_results)
             
             # Get treatment recommendations if resistance genes were found
             treatment_recommendations = None
@@ -144,6 +162,38 @@ class ResistanceAnalysisService:
             self.logger.error(f"Error analyzing resistance: {str(e)}")
             raise
     
+    def matching_region_for_hit(self, hit: BlastHit) -> Optional[MatchingRegion]:
+        """
+        Get the matching region for a hit if it is a significant resistance gene match
+        
+        Args:
+            hit: BlastHit to evaluate
+            
+        Returns:
+            MatchingRegion, or None if the hit is not a known gene above its significance threshold
+        """
+        # FIXED: Better gene name extraction
+        gene_name = self._extract_gene_name(hit.subject_id)
+        
+        # Check if this is a known resistance gene
+        if gene_name not in self.resistance_genes:
+            return None
+        
+        # Check if the percent identity exceeds the significance threshold
+        if hit.percent_identity < self.resistance_genes[gene_name]["significance_threshold"]:
+            return None
+        
+        return MatchingRegion(
+            gene_name=gene_name,
+            query_start=hit.query_start,
+            query_end=hit.query_end,
+            subject_start=hit.subject_start,
+            subject_end=hit.subject_end,
+            percent_identity=hit.percent_identity,
+            alignment_length=hit.alignment_length,
+            evalue=hit.evalue
+        )
+    
     def _extract_gene_name(self, subject_id: str) -> str:
         """
         FIXED: Better gene name extraction from subject ID
@@ -327,11 +377,12 @@ class ResistanceAnalysisService:
         
         if self.groq_service:
             try:
-                notes = self.groq_service.get_treatment_recommendations(
-                    identified_genes=identified_genes,
-                    recommended_antibiotics=recommended_antibiotics,
-                    avoid_antibiotics=avoid_antibiotics
-                )
+                with stage_timer("treatment"):
+                    notes = self.groq_service.get_treatment_recommendations(
+                        identified_genes=identified_genes,
+                        recommended_antibiotics=recommended_antibiotics,
+                        avoid_antibiotics=avoid_antibiotics
+                    )
                 confidence = 98.0  # Higher confidence with AI-generated recommendations
             except Exception as e:
                 self.logger.error(f"Error getting AI treatment recommendations: {str(e)}")
@@ -0,0 +1,218 @@
+import os
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+from services.results_store import ResultsStore
+from utils.serialization import encode, decode, to_jsonable
+
+class ResultWriter:
+    """Write-behind buffer that spools analysis results locally and bulk-inserts them into a remote store"""
+
+    def __init__(
+        self,
+        store: ResultsStore,
+        spool_path: str,
+        batch_size: int = 50,
+        flush_interval: float = 2.0,
+        max_backoff: float = 60.0
+    ):
+        """
+        Args:
+            store: Destination of the results
+            spool_path: SQLite file holding results not yet written, so a crash loses nothing
+            batch_size: Results per bulk insert; reaching it triggers an early flush
+            flush_interval: Seconds between flushes of a partial batch
+            max_backoff: Upper bound in seconds on the retry delay after failed inserts
+        """
+        self.store = store
+        self.spool_path = spool_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_backoff = max_backoff
+        self.logger = logging.getLogger(__name__)
+
+        os.makedirs(os.path.dirname(os.path.abspath(spool_path)), exist_ok=True)
+
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+        self.flushed = 0
+        self.failed_flushes = 0
+        self.last_flush_ms = 0.0
+
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.spool_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_schema(self) -> None:
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS pending_results (
+                    id TEXT PRIMARY KEY,
+                    user_id TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    enqueued_at REAL NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_pending_results_due ON pending_results (next_attempt_at)")
+
+    def start(self) -> None:
+        """Start the flusher; results spooled before a restart are picked up on its first pass"""
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._flush_loop, name="result-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop the flusher after a last flush; anything still pending stays in the spool"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def enqueue(self, user_id: str, results: List[Dict[str, Any]]) -> List[str]:
+        """
+        Spool results for a later bulk insert
+
+        Args:
+            user_id: Owner of the results
+            results: Analysis result data, one dict per sample
+
+        Returns:
+            IDs the results will have in analysis_results
+        """
+        now = time.time()
+        rows = []
+        for result in results:
+            row = to_jsonable(result)
+            row["id"] = row.get("id") or str(uuid.uuid4())
+            rows.append((row["id"], user_id, encode(row).decode(), now, now))
+
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO pending_results (id, user_id, payload, enqueued_at, next_attempt_at) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            pending = conn.execute("SELECT COUNT(*) FROM pending_results").fetchone()[0]
+
+        if pending >= self.batch_size:
+            self._wakeup.set()
+        return [row[0] for row in rows]
+
+    def get_pending(self, user_id: str, result_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a spooled result that hasn't been written to the store yet
+
+        Args:
+            user_id: Owner of the result
+            result_id: ID returned by enqueue
+
+        Returns:
+            Result data, or None if it isn't pending for this user
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT payload FROM pending_results WHERE id = ? AND user_id = ?",
+                (result_id, user_id)
+            ).fetchone()
+        return {**decode(row["payload"]), "user_id": user_id} if row else None
+
+    def flush(self) -> int:
+        """
+        Insert the results that are due, one bulk write per user
+
+        Returns:
+            Number of results written
+        """
+        with self._flush_lock:
+            with self._connect() as conn:
+                due = conn.execute(
+                    "SELECT * FROM pending_results WHERE next_attempt_at <= ? ORDER BY enqueued_at LIMIT ?",
+                    (time.time(), self.batch_size)
+                ).fetchall()
+
+            if not due:
+                return 0
+
+            by_user: Dict[str, List[sqlite3.Row]] = defaultdict(list)
+            for row in due:
+                by_user[row["user_id"]].append(row)
+
+            written = 0
+            start = time.perf_counter()
+            for user_id, rows in by_user.items():
+                try:
+                    # Duplicates are ignored, so retrying a batch that partly landed is safe
+                    self.store.save_analysis_results(
+                        user_id,
+                        [decode(row["payload"]) for row in rows],
+                        ignore_duplicates=True
+                    )
+                    self._delete([row["id"] for row in rows])
+                    written += len(rows)
+                except Exception as e:
+                    self.failed_flushes += 1
+                    self.logger.error(f"Error flushing {len(rows)} results for user {user_id}, will retry: {str(e)}")
+                    self._backoff(rows)
+
+            self.last_flush_ms = round((time.perf_counter() - start) * 1000, 1)
+            self.flushed += written
+            return written
+
+    def _delete(self, ids: List[str]) -> None:
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM pending_results WHERE id = ?", [(result_id,) for result_id in ids])
+
+    def _backoff(self, rows: List[sqlite3.Row]) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE pending_results SET attempts = ?, next_attempt_at = ? WHERE id = ?",
+                [
+                    (row["attempts"] + 1, now + min(self.max_backoff, 2 ** row["attempts"]), row["id"])
+                    for row in rows
+                ]
+            )
+
+    def _flush_loop(self) -> None:
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                # Keep going while full batches are waiting
+                while self.flush() >= self.batch_size:
+                    pass
+            except Exception as e:
+                self.logger.error(f"Error in result writer: {str(e)}")
+
+        try:
+            self.flush()
+        except Exception as e:
+            self.logger.error(f"Error in final result flush: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Pending results, queue lag and flush counters"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) AS pending, MIN(enqueued_at) AS oldest, MAX(attempts) AS attempts FROM pending_results"
+            ).fetchone()
+        return {
+            "pending": row["pending"],
+            "lag_seconds": round(time.time() - row["oldest"], 3) if row["oldest"] else 0.0,
+            "max_attempts": row["attempts"] or 0,
+            "flushed": self.flushed,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_ms": self.last_flush_ms
+        }
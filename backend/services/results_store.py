@@ -0,0 +1,250 @@
+import base64
+from abc import ABC, abstractmethod
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple, Union
+from utils.config import Settings
+
+# Columns returned by default in history listings
+HISTORY_SUMMARY_FIELDS = (
+    "id", "sample_id", "resistance_status", "confidence_score",
+    "identified_genes", "analysis_timestamp", "created_at"
+)
+
+# Columns a history listing may project; the JSONB blobs only load through get_analysis_result
+HISTORY_FIELDS = HISTORY_SUMMARY_FIELDS + ("user_id",)
+
+def encode_history_cursor(created_at: str, result_id: str) -> str:
+    """Opaque cursor pointing just after the row with this (created_at, id)"""
+    return base64.urlsafe_b64encode(f"{created_at}|{result_id}".encode()).decode()
+
+def decode_history_cursor(cursor: str) -> tuple:
+    """
+    Decode a cursor from encode_history_cursor
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        created_at, result_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+    except Exception:
+        raise ValueError("Invalid history cursor")
+    return created_at, result_id
+
+def history_fields(fields: Optional[List[str]]) -> List[str]:
+    """
+    Validate a history projection, defaulting to the summary columns
+
+    Raises:
+        ValueError: If a field isn't in HISTORY_FIELDS
+    """
+    fields = list(fields or HISTORY_SUMMARY_FIELDS)
+    unknown = [field for field in fields if field not in HISTORY_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown history fields: {', '.join(unknown)}")
+    return fields
+
+# Heavy columns identical for every analysis of the same content, stored once in analysis_contents
+CONTENT_COLUMNS = ("matching_regions", "treatment_recommendations")
+
+# Columns describing what was analyzed: the sequence, reference database and parameters
+CONTENT_KEY_FIELDS = ("content_key", "sequence_hash", "db_version", "analysis_params")
+
+# Columns a full result takes from its content row when read back
+CONTENT_READ_FIELDS = CONTENT_COLUMNS + CONTENT_KEY_FIELDS[1:]
+
+def split_content(result: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """
+    Split a result carrying a content_key into its history row and its shared content row
+
+    Args:
+        result: Analysis result dict, optionally with the CONTENT_KEY_FIELDS
+
+    Returns:
+        (history row, content row); the history row references the content by
+        content_key and leaves out the CONTENT_COLUMNS. Results without a
+        content_key are returned whole with no content row.
+    """
+    history = {key: value for key, value in result.items() if key not in CONTENT_KEY_FIELDS[1:]}
+    if not result.get("content_key"):
+        history.pop("content_key", None)
+        return history, None
+
+    content = {field: result.get(field) for field in CONTENT_KEY_FIELDS}
+    for column in ("resistance_status", "confidence_score", "identified_genes"):
+        content[column] = result.get(column)
+    for column in CONTENT_COLUMNS:
+        content[column] = history.pop(column, None)
+    return history, content
+
+def merge_content(result: Dict[str, Any], content: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Fill a history row's CONTENT_READ_FIELDS from its content row"""
+    if content:
+        for column in CONTENT_READ_FIELDS:
+            if result.get(column) is None:
+                result[column] = content.get(column)
+    return result
+
+# Surveillance aggregates are kept per scope and period
+AGGREGATE_SCOPES = ("user", "institution")
+AGGREGATE_PERIODS = ("day", "week")
+
+def period_start(timestamp: Union[str, datetime, None], period: str) -> str:
+    """
+    First day of the day/week (ISO weeks start on Monday) containing a timestamp
+
+    Args:
+        timestamp: ISO 8601 string or datetime; None means now
+        period: "day" or "week"
+
+    Returns:
+        ISO date string
+    """
+    if timestamp is None:
+        day = date.today()
+    elif isinstance(timestamp, datetime):
+        day = timestamp.date()
+    else:
+        day = datetime.fromisoformat(str(timestamp).replace("Z", "+00:00")).date()
+    if period == "week":
+        day -= timedelta(days=day.weekday())
+    return day.isoformat()
+
+def aggregate_keys(user_id: str, institution: Optional[str], result: Dict[str, Any]) -> List[tuple]:
+    """
+    Counters one saved result increments
+
+    Returns:
+        (scope_type, scope_id, period, period_start, dimension, value) tuples: one
+        "total" counter, one for the resistance status and one per identified gene,
+        for each period and for the user and (if known) their institution
+    """
+    timestamp = result.get("analysis_timestamp") or result.get("created_at")
+    dimensions = [("total", ""), ("status", str(result.get("resistance_status") or "unknown"))]
+    dimensions += [("gene", gene) for gene in dict.fromkeys(result.get("identified_genes") or [])]
+
+    scopes = [("user", user_id)]
+    if institution:
+        scopes.append(("institution", institution))
+
+    keys = []
+    for period in AGGREGATE_PERIODS:
+        start = period_start(timestamp, period)
+        for scope_type, scope_id in scopes:
+            for dimension, value in dimensions:
+                keys.append((scope_type, scope_id, period, start, dimension, value))
+    return keys
+
+def surveillance_buckets(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Group aggregate counter rows into one bucket per period
+
+    Args:
+        rows: {"period_start", "dimension", "value", "count"} rows
+
+    Returns:
+        Buckets sorted by period_start, each with sample count and counts per gene
+        and per resistance status
+    """
+    buckets: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        start = str(row["period_start"])
+        bucket = buckets.setdefault(start, {"period_start": start, "samples": 0, "genes": {}, "resistance_status": {}})
+        if row["dimension"] == "total":
+            bucket["samples"] = row["count"]
+        elif row["dimension"] == "gene":
+            bucket["genes"][row["value"]] = row["count"]
+        elif row["dimension"] == "status":
+            bucket["resistance_status"][row["value"]] = row["count"]
+    return [buckets[start] for start in sorted(buckets)]
+
+class ResultsStore(ABC):
+    """Persistence for user profiles and analysis results"""
+
+    @abstractmethod
+    def get_profile(self, user_id: str) -> Dict[str, Any]:
+        """Get a user's profile, empty if the user has none"""
+
+    @abstractmethod
+    def save_profile(self, user_id: str, profile: Dict[str, Any]) -> None:
+        """Create or update a user's profile"""
+
+    @abstractmethod
+    def save_analysis_result(self, user_id: str, analysis_result: Dict[str, Any]) -> str:
+        """Save one analysis result and return its ID"""
+
+    @abstractmethod
+    def save_analysis_results(
+        self,
+        user_id: str,
+        analysis_results: List[Dict[str, Any]],
+        ignore_duplicates: bool = False
+    ) -> List[str]:
+        """Save several analysis results in one write and return their IDs"""
+
+    @abstractmethod
+    def get_user_analysis_results(self, user_id: str) -> List[Dict[str, Any]]:
+        """Get all of a user's analysis results, newest first"""
+
+    @abstractmethod
+    def get_user_analysis_history(
+        self,
+        user_id: str,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        gene: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Get one page of a user's history as {"items": [...], "next_cursor": str or None},
+        optionally only results in which a gene was identified
+        """
+
+    @abstractmethod
+    def get_gene_matching_regions(self, user_id: str, gene_name: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """Get the user's most recent matching regions for a gene, each with its result_id"""
+
+    @abstractmethod
+    def get_analysis_result(self, user_id: str, result_id: str) -> Optional[Dict[str, Any]]:
+        """Get one of the user's full analysis results, None if the user has none with that ID"""
+
+    @abstractmethod
+    def get_content(self, content_key: str) -> Optional[Dict[str, Any]]:
+        """Get the stored result of an already analyzed content key, None if it was never analyzed"""
+
+    @abstractmethod
+    def find_sequence_results(self, user_id: str, sequence_hash: str) -> List[Dict[str, Any]]:
+        """
+        Get the user's history rows for a sequence, newest first, whatever the database
+        version or parameters they were analyzed with
+
+        Each row has id, sample_id, content_key, db_version, analysis_params and created_at.
+        """
+
+    @abstractmethod
+    def get_surveillance_counts(self, scope_type: str, scope_id: str, period: str, since: str) -> List[Dict[str, Any]]:
+        """
+        Get the aggregate counter rows of a scope from a period onwards
+
+        Counters are maintained as results are saved, so this reads a number of
+        rows bounded by periods x (genes + statuses), not by the size of the history.
+        """
+
+def create_results_store(settings: Settings, supabase_service) -> ResultsStore:
+    """
+    Build the results store selected by RESULTS_STORE
+
+    Args:
+        settings: Application settings
+        supabase_service: Used as the store when RESULTS_STORE is "supabase"
+
+    Returns:
+        ResultsStore implementation
+    """
+    if settings.RESULTS_STORE == "supabase":
+        return supabase_service
+
+    if settings.RESULTS_STORE == "sqlite":
+        from services.sqlite_store import SQLiteResultsStore
+        return SQLiteResultsStore(settings.RESULTS_DB_PATH, pool_size=settings.RESULTS_DB_POOL_SIZE)
+
+    raise ValueError(f"Unknown RESULTS_STORE: {settings.RESULTS_STORE}")
@@ -0,0 +1,89 @@
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Tuple
+
+def file_digest(path: str) -> str:
+    """SHA-256 hex digest of a file's content"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def params_key(digest: str, **params: Any) -> str:
+    """
+    Key identifying an analysis by a content digest and its parameters
+
+    Args:
+        digest: Digest of the analyzed content, e.g. from file_digest
+        **params: Parameters that change the result (e.g. threshold, evalue)
+
+    Returns:
+        Hex digest usable as a single-flight key
+    """
+    key = hashlib.sha256(digest.encode())
+    for name in sorted(params):
+        key.update(f"|{name}={params[name]!r}".encode())
+    return key.hexdigest()
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+
+class SingleFlight:
+    """Runs one computation per key at a time; concurrent callers with the same key share its result"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run fn, or wait for the identical call already in flight
+
+        Args:
+            key: Identifies identical work (see params_key)
+            fn: Computation to run when no call with this key is in flight
+
+        Returns:
+            (result, shared) where shared is True if another caller computed it
+
+        Raises:
+            Whatever fn raised, for the leader and every caller attached to it
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.shared += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.leaders += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            # Later callers start a fresh computation rather than reusing this one
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"in_flight": len(self._calls), "leaders": self.leaders, "shared": self.shared}
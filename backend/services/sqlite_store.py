@@ -0,0 +1,423 @@
+import os
+import uuid
+import queue
+import sqlite3
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+from services.results_store import (
+    ResultsStore, encode_history_cursor, decode_history_cursor, history_fields, aggregate_keys,
+    split_content, CONTENT_COLUMNS, CONTENT_KEY_FIELDS
+)
+from utils.serialization import encode, decode, to_jsonable
+
+# Columns stored as JSON text
+JSON_COLUMNS = ("identified_genes", "matching_regions", "treatment_recommendations", "analysis_params")
+
+RESULT_COLUMNS = (
+    "id", "user_id", "sample_id", "resistance_status", "confidence_score",
+    "identified_genes", "matching_regions", "treatment_recommendations",
+    "content_key", "analysis_timestamp", "created_at"
+)
+
+CONTENT_TABLE_COLUMNS = (
+    "content_key", "sequence_hash", "db_version", "analysis_params", "resistance_status",
+    "confidence_score", "identified_genes", "matching_regions", "treatment_recommendations", "created_at"
+)
+
+# Statements are module constants so each pooled connection prepares them once
+# and reuses them from its statement cache
+INSERT_RESULT_SQL = f"""
+    INSERT INTO analysis_results ({", ".join(RESULT_COLUMNS)})
+    VALUES ({", ".join("?" for _ in RESULT_COLUMNS)})
+"""
+INSERT_RESULT_IGNORE_SQL = INSERT_RESULT_SQL.replace("INSERT INTO", "INSERT OR IGNORE INTO")
+# Full results read the shared columns from the content row when the history row has none
+_FULL_RESULT_COLUMNS = ", ".join(
+    [f"COALESCE(r.{column}, c.{column}) AS {column}" if column in CONTENT_COLUMNS else f"r.{column}" for column in RESULT_COLUMNS]
+    + [f"c.{field}" for field in CONTENT_KEY_FIELDS[1:]]
+)
+SELECT_RESULT_SQL = f"""
+    SELECT {_FULL_RESULT_COLUMNS} FROM analysis_results r
+    LEFT JOIN analysis_contents c ON c.content_key = r.content_key WHERE r.id = ? AND r.user_id = ?
+"""
+SELECT_USER_RESULTS_SQL = f"""
+    SELECT {_FULL_RESULT_COLUMNS} FROM analysis_results r
+    LEFT JOIN analysis_contents c ON c.content_key = r.content_key
+    WHERE r.user_id = ? ORDER BY r.created_at DESC, r.id DESC
+"""
+INSERT_CONTENT_SQL = f"""
+    INSERT OR IGNORE INTO analysis_contents ({", ".join(CONTENT_TABLE_COLUMNS)})
+    VALUES ({", ".join("?" for _ in CONTENT_TABLE_COLUMNS)})
+"""
+SELECT_CONTENT_SQL = "SELECT * FROM analysis_contents WHERE content_key = ?"
+SELECT_SEQUENCE_RESULTS_SQL = """
+    SELECT r.id, r.sample_id, r.content_key, c.db_version, c.analysis_params, r.created_at
+    FROM analysis_contents c JOIN analysis_results r ON r.content_key = c.content_key
+    WHERE c.sequence_hash = ? AND r.user_id = ? ORDER BY r.created_at DESC, r.id DESC
+"""
+INSERT_GENE_SQL = "INSERT OR IGNORE INTO analysis_result_genes (result_id, user_id, gene_name, created_at) VALUES (?, ?, ?, ?)"
+REGION_COLUMNS = (
+    "gene_name", "query_start", "query_end", "subject_start", "subject_end",
+    "percent_identity", "alignment_length", "evalue"
+)
+INSERT_REGION_SQL = f"""
+    INSERT INTO analysis_matching_regions (result_id, user_id, created_at, {", ".join(REGION_COLUMNS)})
+    VALUES (?, ?, ?, {", ".join("?" for _ in REGION_COLUMNS)})
+"""
+SELECT_GENE_REGIONS_SQL = f"""
+    SELECT result_id, {", ".join(REGION_COLUMNS)}, created_at FROM analysis_matching_regions
+    WHERE user_id = ? AND gene_name = ? ORDER BY created_at DESC LIMIT ?
+"""
+BUMP_AGGREGATE_SQL = """
+    INSERT INTO analysis_aggregates (scope_type, scope_id, period, period_start, dimension, value, count)
+    VALUES (?, ?, ?, ?, ?, ?, 1)
+    ON CONFLICT (scope_type, scope_id, period, period_start, dimension, value) DO UPDATE SET count = count + 1
+"""
+SELECT_AGGREGATES_SQL = """
+    SELECT period_start, dimension, value, count FROM analysis_aggregates
+    WHERE scope_type = ? AND scope_id = ? AND period = ? AND period_start >= ?
+"""
+SELECT_INSTITUTION_SQL = "SELECT institution FROM profiles WHERE id = ?"
+SELECT_PROFILE_SQL = "SELECT * FROM profiles WHERE id = ?"
+UPSERT_PROFILE_SQL = """
+    INSERT INTO profiles (id, email, full_name, institution, created_at, updated_at)
+    VALUES (:id, :email, :full_name, :institution, :now, :now)
+    ON CONFLICT (id) DO UPDATE SET
+        email = COALESCE(excluded.email, profiles.email),
+        full_name = excluded.full_name,
+        institution = excluded.institution,
+        updated_at = excluded.updated_at
+"""
+
+class SQLiteResultsStore(ResultsStore):
+    """Embedded results store for single-node and air-gapped installs"""
+
+    def __init__(self, db_path: str, pool_size: int = 4):
+        """
+        Args:
+            db_path: SQLite database file
+            pool_size: Connections kept open and shared between threads
+        """
+        self.db_path = db_path
+        self.logger = logging.getLogger(__name__)
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+        self._pool: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        for _ in range(pool_size):
+            self._pool.put(self._open())
+
+        with self._connection() as conn:
+            self._init_schema(conn)
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=30,
+            check_same_thread=False,
+            cached_statements=128,
+            isolation_level=None
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        # Safe with WAL: a crash can lose the last commits but never corrupts the database
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _init_schema(self, conn: sqlite3.Connection) -> None:
+        had_children = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'analysis_result_genes'"
+        ).fetchone() is not None
+        had_aggregates = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'analysis_aggregates'"
+        ).fetchone() is not None
+
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS profiles (
+                id TEXT PRIMARY KEY,
+                email TEXT,
+                full_name TEXT,
+                institution TEXT,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS analysis_results (
+                id TEXT PRIMARY KEY,
+                user_id TEXT,
+                sample_id TEXT NOT NULL,
+                resistance_status TEXT NOT NULL,
+                confidence_score REAL NOT NULL,
+                identified_genes TEXT,
+                matching_regions TEXT,
+                treatment_recommendations TEXT,
+                content_key TEXT REFERENCES analysis_contents(content_key),
+                analysis_timestamp TEXT,
+                created_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_analysis_results_user_created
+                ON analysis_results (user_id, created_at DESC, id DESC);
+            CREATE TABLE IF NOT EXISTS analysis_result_genes (
+                result_id TEXT NOT NULL REFERENCES analysis_results(id) ON DELETE CASCADE,
+                user_id TEXT,
+                gene_name TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                PRIMARY KEY (result_id, gene_name)
+            );
+            CREATE INDEX IF NOT EXISTS idx_analysis_result_genes_user_gene
+                ON analysis_result_genes (user_id, gene_name, created_at DESC, result_id DESC);
+            CREATE TABLE IF NOT EXISTS analysis_matching_regions (
+                id INTEGER PRIMARY KEY,
+                result_id TEXT NOT NULL REFERENCES analysis_results(id) ON DELETE CASCADE,
+                user_id TEXT,
+                gene_name TEXT NOT NULL,
+                query_start INTEGER,
+                query_end INTEGER,
+                subject_start INTEGER,
+                subject_end INTEGER,
+                percent_identity REAL,
+                alignment_length INTEGER,
+                evalue REAL,
+                created_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_analysis_matching_regions_result
+                ON analysis_matching_regions (result_id);
+            CREATE INDEX IF NOT EXISTS idx_analysis_matching_regions_user_gene
+                ON analysis_matching_regions (user_id, gene_name, created_at DESC);
+            CREATE TABLE IF NOT EXISTS analysis_aggregates (
+                scope_type TEXT NOT NULL,
+                scope_id TEXT NOT NULL,
+                period TEXT NOT NULL,
+                period_start TEXT NOT NULL,
+                dimension TEXT NOT NULL,
+                value TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (scope_type, scope_id, period, period_start, dimension, value)
+            );
+            CREATE TABLE IF NOT EXISTS analysis_contents (
+                content_key TEXT PRIMARY KEY,
+                sequence_hash TEXT NOT NULL,
+                db_version TEXT NOT NULL,
+                analysis_params TEXT,
+                resistance_status TEXT NOT NULL,
+                confidence_score REAL NOT NULL,
+                identified_genes TEXT,
+                matching_regions TEXT,
+                treatment_recommendations TEXT,
+                created_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_analysis_contents_sequence
+                ON analysis_contents (sequence_hash);
+        """)
+
+        result_columns = [row["name"] for row in conn.execute("PRAGMA table_info(analysis_results)")]
+        if "content_key" not in result_columns:
+            conn.execute("ALTER TABLE analysis_results ADD COLUMN content_key TEXT REFERENCES analysis_contents(content_key)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_analysis_results_content ON analysis_results (content_key)")
+
+        if not had_children:
+            # Results saved before the child tables existed
+            conn.executescript(f"""
+                INSERT OR IGNORE INTO analysis_result_genes (result_id, user_id, gene_name, created_at)
+                SELECT r.id, r.user_id, gene.value, r.created_at
+                FROM analysis_results r, json_each(COALESCE(r.identified_genes, '[]')) AS gene;
+                INSERT INTO analysis_matching_regions (result_id, user_id, created_at, {", ".join(REGION_COLUMNS)})
+                SELECT r.id, r.user_id, r.created_at, {", ".join(f"json_extract(region.value, '$.{column}')" for column in REGION_COLUMNS)}
+                FROM analysis_results r, json_each(COALESCE(r.matching_regions, '[]')) AS region
+                WHERE json_extract(region.value, '$.gene_name') IS NOT NULL;
+            """)
+
+        if not had_aggregates:
+            # Count results saved before the counters existed
+            rows = conn.execute(
+                "SELECT r.*, p.institution AS institution FROM analysis_results r LEFT JOIN profiles p ON p.id = r.user_id"
+            ).fetchall()
+            conn.execute("BEGIN")
+            for row in rows:
+                result = self._from_row(row)
+                conn.executemany(BUMP_AGGREGATE_SQL, aggregate_keys(result["user_id"], result.pop("institution"), result))
+            conn.execute("COMMIT")
+
+    def close(self) -> None:
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+    def get_profile(self, user_id: str) -> Dict[str, Any]:
+        with self._connection() as conn:
+            row = conn.execute(SELECT_PROFILE_SQL, (user_id,)).fetchone()
+        return dict(row) if row else {}
+
+    def save_profile(self, user_id: str, profile: Dict[str, Any]) -> None:
+        with self._transaction() as conn:
+            conn.execute(UPSERT_PROFILE_SQL, {
+                "id": user_id,
+                "email": profile.get("email"),
+                "full_name": profile.get("full_name"),
+                "institution": profile.get("institution"),
+                "now": _now()
+            })
+
+    def save_analysis_result(self, user_id: str, analysis_result: Dict[str, Any]) -> str:
+        return self.save_analysis_results(user_id, [analysis_result])[0]
+
+    def save_analysis_results(
+        self,
+        user_id: str,
+        analysis_results: List[Dict[str, Any]],
+        ignore_duplicates: bool = False
+    ) -> List[str]:
+        if not analysis_results:
+            return []
+
+        rows, contents = [], []
+        for result in analysis_results:
+            history, content = split_content(result)
+            rows.append(self._to_row(user_id, history))
+            if content is not None:
+                contents.append(self._to_content_row(content))
+
+        insert_sql = INSERT_RESULT_IGNORE_SQL if ignore_duplicates else INSERT_RESULT_SQL
+        with self._transaction() as conn:
+            # Each distinct content is stored once; later analyses of it only add a history row
+            conn.executemany(INSERT_CONTENT_SQL, contents)
+            institution = conn.execute(SELECT_INSTITUTION_SQL, (user_id,)).fetchone()
+            institution = institution[0] if institution else None
+            for row, result in zip(rows, analysis_results):
+                # Child rows and counters only for results actually inserted, not ignored duplicates
+                if conn.execute(insert_sql, row).rowcount:
+                    self._insert_children(conn, row, result)
+                    conn.executemany(BUMP_AGGREGATE_SQL, aggregate_keys(user_id, institution, to_jsonable(result)))
+        return [row[0] for row in rows]
+
+    def _insert_children(self, conn: sqlite3.Connection, row: tuple, result: Dict[str, Any]) -> None:
+        result_id, user_id = row[0], row[1]
+        created_at = row[RESULT_COLUMNS.index("created_at")]
+        conn.executemany(INSERT_GENE_SQL, [
+            (result_id, user_id, gene, created_at)
+            for gene in result.get("identified_genes") or []
+        ])
+        conn.executemany(INSERT_REGION_SQL, [
+            (result_id, user_id, created_at, *(to_jsonable(region).get(column) for column in REGION_COLUMNS))
+            for region in result.get("matching_regions") or []
+        ])
+
+    def get_user_analysis_results(self, user_id: str) -> List[Dict[str, Any]]:
+        with self._connection() as conn:
+            rows = conn.execute(SELECT_USER_RESULTS_SQL, (user_id,)).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def get_user_analysis_history(
+        self,
+        user_id: str,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        gene: Optional[str] = None
+    ) -> Dict[str, Any]:
+        fields = history_fields(fields)
+        columns = ", ".join(f"r.{column}" for column in dict.fromkeys(fields + ["id", "created_at"]))
+
+        # Row-value comparisons walk the (user_id, created_at, id) index from the cursor;
+        # a gene filter walks the (user_id, gene_name, created_at, result_id) index instead
+        if gene:
+            sql = (
+                f"SELECT {columns} FROM analysis_result_genes g JOIN analysis_results r ON r.id = g.result_id "
+                "WHERE g.user_id = ? AND g.gene_name = ?"
+            )
+            params: list = [user_id, gene]
+            key = ("g.created_at", "g.result_id")
+        else:
+            sql = f"SELECT {columns} FROM analysis_results r WHERE r.user_id = ?"
+            params = [user_id]
+            key = ("r.created_at", "r.id")
+
+        if cursor:
+            sql += f" AND ({key[0]}, {key[1]}) < (?, ?)"
+            params.extend(decode_history_cursor(cursor))
+
+        sql += f" ORDER BY {key[0]} DESC, {key[1]} DESC LIMIT ?"
+        params.append(limit + 1)
+
+        with self._connection() as conn:
+            rows = [self._from_row(row) for row in conn.execute(sql, params).fetchall()]
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_history_cursor(rows[-1]["created_at"], rows[-1]["id"])
+
+        return {"items": [{field: row.get(field) for field in fields} for row in rows], "next_cursor": next_cursor}
+
+    def get_gene_matching_regions(self, user_id: str, gene_name: str, limit: int = 100) -> List[Dict[str, Any]]:
+        with self._connection() as conn:
+            rows = conn.execute(SELECT_GENE_REGIONS_SQL, (user_id, gene_name, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_analysis_result(self, user_id: str, result_id: str) -> Optional[Dict[str, Any]]:
+        with self._connection() as conn:
+            row = conn.execute(SELECT_RESULT_SQL, (result_id, user_id)).fetchone()
+        return self._from_row(row) if row else None
+
+    def get_content(self, content_key: str) -> Optional[Dict[str, Any]]:
+        with self._connection() as conn:
+            row = conn.execute(SELECT_CONTENT_SQL, (content_key,)).fetchone()
+        return self._from_row(row) if row else None
+
+    def find_sequence_results(self, user_id: str, sequence_hash: str) -> List[Dict[str, Any]]:
+        with self._connection() as conn:
+            rows = conn.execute(SELECT_SEQUENCE_RESULTS_SQL, (sequence_hash, user_id)).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def get_surveillance_counts(self, scope_type: str, scope_id: str, period: str, since: str) -> List[Dict[str, Any]]:
+        with self._connection() as conn:
+            rows = conn.execute(SELECT_AGGREGATES_SQL, (scope_type, scope_id, period, since)).fetchall()
+        return [dict(row) for row in rows]
+
+    def _to_row(self, user_id: str, result: Dict[str, Any]) -> tuple:
+        data = to_jsonable(result)
+        data["id"] = data.get("id") or str(uuid.uuid4())
+        data["user_id"] = user_id
+        data.setdefault("created_at", _now())
+        for column in JSON_COLUMNS:
+            if data.get(column) is not None:
+                data[column] = encode(data[column]).decode()
+        return tuple(data.get(column) for column in RESULT_COLUMNS)
+
+    def _to_content_row(self, content: Dict[str, Any]) -> tuple:
+        data = to_jsonable(content)
+        data.setdefault("created_at", _now())
+        for column in JSON_COLUMNS:
+            if data.get(column) is not None:
+                data[column] = encode(data[column]).decode()
+        return tuple(data.get(column) for column in CONTENT_TABLE_COLUMNS)
+
+    def _from_row(self, row: sqlite3.Row) -> Dict[str, Any]:
+        data = dict(row)
+        for column in JSON_COLUMNS:
+            if data.get(column) is not None:
+                data[column] = decode(data[column])
+        return data
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
@@ -1,26 +1,69 @@
 import os
+import time
 import logging
 from typing import List, Dict, Any, Optional
-from supabase import create_client, Client
 from utils.config import Settings
+from utils.serialization import to_jsonable, encode
+from utils.ttl_cache import TTLCache
+from services.token_verifier import TokenVerifier
+from services.tracing import traced
+from services.results_store import (
+    ResultsStore, encode_history_cursor, decode_history_cursor, history_fields,
+    split_content, merge_content, CONTENT_READ_FIELDS
+)
 
-class SupabaseService:
+class SupabaseService(ResultsStore):
     """Service for interacting with Supabase"""
     
-    def __init__(self):
-        self.settings = Settings()
+    def __init__(self, settings: Optional[Settings] = None):
+        self.settings = settings or Settings()
         self.logger = logging.getLogger(__name__)
         
         # Initialize Supabase client
         if self.settings.SUPABASE_URL and self.settings.SUPABASE_KEY:
+            from supabase import create_client
+            
             self.supabase = create_client(
                 self.settings.SUPABASE_URL,
                 self.settings.SUPABASE_KEY
             )
+            self._use_pooled_sessions()
         else:
             self.logger.warning("Supabase URL or key not set. Supabase functionality will be limited.")
             self.supabase = None
+        
+        # Verify access tokens locally when a signing key is configured
+        self.token_verifier = TokenVerifier.from_settings(self.settings)
+        
+        # Where profiles are read from; the container points this at a local store when one is used
+        self.profile_store: ResultsStore = self
+        
+        # Token -> identity until the token expires; user ID -> profile for a short TTL
+        self._token_cache = TTLCache(max_size=self.settings.AUTH_CACHE_SIZE)
+        self._profile_cache = TTLCache(
+            max_size=self.settings.AUTH_CACHE_SIZE,
+            ttl=self.settings.AUTH_PROFILE_CACHE_TTL
+        )
+    
+    def _use_pooled_sessions(self):
+        """Route the PostgREST and GoTrue clients through the shared HTTP pool"""
+        from postgrest.utils import SyncClient
+        from services.http_client import get_http_pool
+        
+        pool = get_http_pool(self.settings)
+        
+        postgrest = self.supabase.postgrest
+        postgrest.session = pool.client(
+            base_url=str(postgrest.session.base_url),
+            headers=dict(postgrest.session.headers),
+            client_class=SyncClient
+        )
+        
+        auth = self.supabase.auth
+        auth._http_client = pool.client(client_class=SyncClient)
+        auth.admin._http_client = auth._http_client
     
+    @traced("supabase.register_user")
     def register_user(self, email: str, password: str, user_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Register a new user
@@ -48,31 +91,22 @@ class SupabaseService:
             
             self.logger.info(f"User registered with ID: {user_id}")
             
-            # If additional user data provided and we have both user_id and access_token, store it in the profiles table
-            if user_data and user_id and access_token:
-                # Set the auth token for the supabase client to enable RLS
-                self.supabase.auth.set_session(access_token, data.session.refresh_token if data.session else "")
-                
-                profile_data = {
-                    "id": user_id,
-                    "email": email,
-                    **user_data
-                }
+            # Store additional user data wherever profiles are read from (Supabase or the local store)
+            if user_data and user_id:
+                if access_token and self.profile_store is self:
+                    # Set the auth token for the supabase client to enable RLS
+                    self.supabase.auth.set_session(access_token, data.session.refresh_token if data.session else "")
                 
                 try:
-                    profile_result = self.supabase.table("profiles").insert(profile_data).execute()
-                    self.logger.info(f"Profile created successfully: {profile_result.data}")
+                    self.profile_store.save_profile(user_id, {"email": email, **user_data})
+                    self.invalidate_profile(user_id)
+                    self.logger.info(f"Profile created for user {user_id}")
                 except Exception as profile_error:
                     self.logger.error(f"Failed to create profile: {str(profile_error)}")
-                    # Try inserting with admin privileges (bypass RLS)
-                    try:
-                        admin_result = self.supabase.table("profiles").insert(profile_data).execute()
-                        self.logger.info(f"Profile created with admin privileges: {admin_result.data}")
-                    except Exception as admin_error:
-                        self.logger.error(f"Failed to create profile even with admin: {str(admin_error)}")
-                        # Continue without failing the entire registration
+                    # Continue without failing the entire registration
             
             return {
+                "id": user_id,
                 "email": email,
                 "full_name": user_data.get("full_name") if user_data else None,
                 "institution": user_data.get("institution") if user_data else None,
@@ -83,6 +117,7 @@ class SupabaseService:
             self.logger.error(f"Error registering user: {str(e)}")
             raise
     
+    @traced("supabase.login_user")
     def login_user(self, email: str, password: str) -> str:
         """
         Login a user
@@ -110,33 +145,33 @@ class SupabaseService:
             self.logger.error(f"Error logging in user: {str(e)}")
             raise
     
+    @traced("supabase.get_user_from_token")
     def get_user_from_token(self, token: str) -> Dict[str, Any]:
         """
         Get user data from access token
         
+        The token is verified locally when SUPABASE_JWT_SECRET or SUPABASE_JWKS_URL
+        is set, otherwise by the Supabase auth API. Either way the identity is cached
+        until the token expires and the profile (from profile_store) for
+        AUTH_PROFILE_CACHE_TTL seconds.
+        
         Args:
             token: Access token
             
         Returns:
             User data
         """
-        if not self.supabase:
-            raise Exception("Supabase client not initialized")
-        
         try:
-            # Get user from token
-            response = self.supabase.auth.get_user(token)
-            user = response.user
+            identity = self._token_cache.get(token)
+            if identity is None:
+                identity = self._verify_token(token)
+                self._token_cache.set(token, identity, expires_at=identity["expires_at"])
             
-            # Get additional user data from profiles table
-            user_id = user.id
-            profile = self.supabase.table("profiles").select("*").eq("id", user_id).execute()
-            
-            profile_data = profile.data[0] if profile.data else {}
+            profile_data = self._cached_profile(identity["id"])
             
             return {
-                "id": user.id,  # Add the user ID here
-                "email": user.email,
+                "id": identity["id"],  # Add the user ID here
+                "email": identity["email"],
                 "full_name": profile_data.get("full_name"),
                 "institution": profile_data.get("institution"),
                 "is_active": True
@@ -146,6 +181,70 @@ class SupabaseService:
             self.logger.error(f"Error getting user from token: {str(e)}")
             raise
     
+    def _verify_token(self, token: str) -> Dict[str, Any]:
+        import jwt
+        
+        if self.token_verifier is not None:
+            claims = self.token_verifier.verify(token)
+            return {"id": claims["sub"], "email": claims.get("email", ""), "expires_at": claims["exp"]}
+        
+        if not self.supabase:
+            raise Exception("Supabase client not initialized")
+        
+        # Remote check; the token is only decoded locally to learn when it expires
+        response = self.supabase.auth.get_user(token)
+        user = response.user
+        claims = jwt.decode(token, options={"verify_signature": False})
+        return {"id": user.id, "email": user.email, "expires_at": claims.get("exp", time.time())}
+    
+    def _cached_profile(self, user_id: str) -> Dict[str, Any]:
+        profile_data = self._profile_cache.get(user_id)
+        if profile_data is None:
+            profile_data = self.profile_store.get_profile(user_id)
+            self._profile_cache.set(user_id, profile_data)
+        return profile_data
+    
+    @traced("supabase.get_profile")
+    def get_profile(self, user_id: str) -> Dict[str, Any]:
+        """
+        Get a user's profile row
+        
+        Args:
+            user_id: User ID
+            
+        Returns:
+            Profile data, empty if the user has no profile or Supabase isn't configured
+        """
+        if not self.supabase:
+            return {}
+        
+        # Get additional user data from profiles table
+        profile = self.supabase.table("profiles").select("*").eq("id", user_id).execute()
+        return profile.data[0] if profile.data else {}
+    
+    @traced("supabase.save_profile")
+    def save_profile(self, user_id: str, profile: Dict[str, Any]) -> None:
+        """
+        Create or update a user's profile row
+        
+        Args:
+            user_id: User ID
+            profile: Profile fields (email, full_name, institution)
+        """
+        if not self.supabase:
+            raise Exception("Supabase client not initialized")
+        
+        self.supabase.table("profiles").upsert({"id": user_id, **profile}).execute()
+        self.invalidate_profile(user_id)
+    
+    def invalidate_profile(self, user_id: str) -> None:
+        """Drop a cached profile after it changes"""
+        self._profile_cache.pop(user_id)
+    
+    def auth_cache_stats(self) -> Dict[str, Any]:
+        return {"tokens": self._token_cache.stats(), "profiles": self._profile_cache.stats()}
+    
+    @traced("supabase.save_analysis_result")
     def save_analysis_result(self, user_id: str, analysis_result: Dict[str, Any]) -> str:
         """
         Save analysis result to database
@@ -160,14 +259,19 @@ class SupabaseService:
         if not self.supabase:
             raise Exception("Supabase client not initialized")
         
+        # Set before the try, as saving the content row can fail before the insert data is built
+        data = None
         try:
             # Convert any non-serializable objects to strings
             serialized_result = self._prepare_for_storage(analysis_result)
+            history, content = split_content(serialized_result)
+            if content is not None:
+                self._save_contents([content])
             
             # Save analysis result
             data = {
                 "user_id": user_id,
-                **serialized_result
+                **history
             }
             
             self.logger.info(f"Attempting to save analysis result for user: {user_id}")
@@ -186,6 +290,56 @@ class SupabaseService:
             self.logger.error(f"Data attempted to save: {data}")
             raise
     
+    @traced("supabase.save_analysis_results")
+    def save_analysis_results(
+        self,
+        user_id: str,
+        analysis_results: List[Dict[str, Any]],
+        ignore_duplicates: bool = False
+    ) -> List[str]:
+        """
+        Save several analysis results in a single bulk insert
+        
+        Args:
+            user_id: User ID
+            analysis_results: Analysis result data, one dict per sample
+            ignore_duplicates: Skip rows whose ID already exists, so a retried insert is safe
+            
+        Returns:
+            IDs of the saved results
+        """
+        if not self.supabase:
+            raise Exception("Supabase client not initialized")
+        
+        if not analysis_results:
+            return []
+        
+        try:
+            rows, contents = [], []
+            for result in analysis_results:
+                history, content = split_content(self._prepare_for_storage(result))
+                rows.append({"user_id": user_id, **history})
+                if content is not None:
+                    contents.append(content)
+            
+            # Each distinct content is stored once; later analyses of it only add a history row
+            if contents:
+                self._save_contents(contents)
+            
+            self.logger.info(f"Saving {len(rows)} analysis results for user: {user_id}")
+            table = self.supabase.table("analysis_results")
+            if ignore_duplicates:
+                response = table.upsert(rows, ignore_duplicates=True).execute()
+            else:
+                response = table.insert(rows).execute()
+            
+            return [row["id"] for row in response.data or []]
+            
+        except Exception as e:
+            self.logger.error(f"Error saving analysis results: {str(e)}")
+            raise
+    
+    @traced("supabase.get_user_analysis_results")
     def get_user_analysis_results(self, user_id: str) -> List[Dict[str, Any]]:
         """
         Get analysis results for a user
@@ -205,41 +359,286 @@ class SupabaseService:
             response = self.supabase.table("analysis_results").select("*").eq("user_id", user_id).order("created_at", desc=True).execute()
             
             self.logger.info(f"Found {len(response.data)} analysis results")
-            return response.data
+            return self._merge_contents(response.data)
             
         except Exception as e:
             self.logger.error(f"Error getting analysis results: {str(e)}")
             raise
     
-    def get_analysis_result(self, result_id: str) -> Dict[str, Any]:
+    @traced("supabase.get_user_analysis_history")
+    def get_user_analysis_history(
+        self,
+        user_id: str,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        gene: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
-        Get a specific analysis result
+        Get one page of a user's analysis history, newest first
+        
+        Pages are keyed on (created_at, id), so each page is a range scan of the
+        (user_id, created_at, id) index no matter how deep the client has paged. The
+        gene filter is a JSONB containment test served by the identified_genes GIN
+        index (see utils/db_init.py).
         
         Args:
+            user_id: User ID
+            limit: Maximum rows in the page
+            cursor: next_cursor from the previous page, or None for the first page
+            fields: Columns to return (from HISTORY_FIELDS); defaults to the summary projection
+            gene: Only results in which this gene was identified
+            
+        Returns:
+            {"items": [...], "next_cursor": str or None}
+            
+        Raises:
+            ValueError: If the cursor or a field is invalid
+        """
+        if not self.supabase:
+            raise Exception("Supabase client not initialized")
+        
+        fields = history_fields(fields)
+        
+        # The cursor is built from the last row, so always select its key columns
+        columns = list(dict.fromkeys(fields + ["id", "created_at"]))
+        
+        try:
+            query = (
+                self.supabase.table("analysis_results")
+                .select(",".join(columns))
+                .eq("user_id", user_id)
+            )
+            if gene:
+                query = query.filter("identified_genes", "cs", encode([gene]).decode())
+            if cursor:
+                created_at, result_id = decode_history_cursor(cursor)
+                # Rows strictly after the cursor in (created_at desc, id desc) order;
+                # this postgrest client has no or_() builder, so add the filter directly
+                query.params = query.params.add(
+                    "or",
+                    f'(created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{result_id}))'
+                )
+            
+            # Both sort keys in a single order parameter, matching the cursor
+            query.params = query.params.add("order", "created_at.desc,id.desc")
+            
+            # Fetch one extra row to know whether another page exists
+            response = query.limit(limit + 1).execute()
+            rows = response.data or []
+            
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = encode_history_cursor(rows[-1]["created_at"], rows[-1]["id"])
+            
+            items = [{field: row.get(field) for field in fields} for row in rows]
+            return {"items": items, "next_cursor": next_cursor}
+            
+        except ValueError:
+            raise
+        except Exception as e:
+            self.logger.error(f"Error getting analysis history: {str(e)}")
+            raise
+    
+    @traced("supabase.get_gene_matching_regions")
+    def get_gene_matching_regions(self, user_id: str, gene_name: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Get a user's most recent matching regions for a gene
+        
+        Reads the analysis_matching_regions child table through its
+        (user_id, gene_name, created_at) index instead of unpacking JSONB.
+        
+        Args:
+            user_id: User ID
+            gene_name: Resistance gene (e.g. mecA)
+            limit: Maximum regions to return
+            
+        Returns:
+            Matching regions, newest first, each with its result_id
+        """
+        if not self.supabase:
+            raise Exception("Supabase client not initialized")
+        
+        try:
+            response = (
+                self.supabase.table("analysis_matching_regions")
+                .select(
+                    "result_id,gene_name,query_start,query_end,subject_start,subject_end,"
+                    "percent_identity,alignment_length,evalue,created_at"
+                )
+                .eq("user_id", user_id)
+                .eq("gene_name", gene_name)
+                .order("created_at", desc=True)
+                .limit(limit)
+                .execute()
+            )
+            return response.data or []
+            
+        except Exception as e:
+            self.logger.error(f"Error getting matching regions for {gene_name}: {str(e)}")
+            raise
+    
+    @traced("supabase.get_surveillance_counts")
+    def get_surveillance_counts(self, scope_type: str, scope_id: str, period: str, since: str) -> List[Dict[str, Any]]:
+        """
+        Get surveillance counters of a user or institution from a period onwards
+        
+        The analysis_aggregates table is incremented by a trigger on every insert
+        into analysis_results (see utils/db_init.py).
+        
+        Args:
+            scope_type: "user" or "institution"
+            scope_id: User ID or institution name
+            period: "day" or "week"
+            since: ISO date of the first period to include
+            
+        Returns:
+            {"period_start", "dimension", "value", "count"} rows
+        """
+        if not self.supabase:
+            raise Exception("Supabase client not initialized")
+        
+        try:
+            response = (
+                self.supabase.table("analysis_aggregates")
+                .select("period_start,dimension,value,count")
+                .eq("scope_type", scope_type)
+                .eq("scope_id", scope_id)
+                .eq("period", period)
+                .gte("period_start", since)
+                .execute()
+            )
+            return response.data or []
+            
+        except Exception as e:
+            self.logger.error(f"Error getting surveillance counts: {str(e)}")
+            raise
+    
+    @traced("supabase.get_analysis_result")
+    def get_analysis_result(self, user_id: str, result_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a specific analysis result belonging to a user
+        
+        Args:
+            user_id: User ID
             result_id: Result ID
             
         Returns:
-            Analysis result
+            Analysis result, or None if the user has no result with this ID
         """
         if not self.supabase:
             raise Exception("Supabase client not initialized")
         
         try:
             # Get analysis result
-            response = self.supabase.table("analysis_results").select("*").eq("id", result_id).execute()
+            response = self.supabase.table("analysis_results").select("*").eq("id", result_id).eq("user_id", user_id).execute()
             
             if not response.data:
-                raise Exception(f"Analysis result with ID {result_id} not found")
+                return None
             
-            return response.data[0]
+            return self._merge_contents(response.data)[0]
             
         except Exception as e:
             self.logger.error(f"Error getting analysis result: {str(e)}")
             raise
     
+    @traced("supabase.get_content")
+    def get_content(self, content_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the stored result of an already analyzed sequence/database/parameters combination
+        
+        Args:
+            content_key: Key from AnalysisPipeline.describe
+            
+        Returns:
+            analysis_contents row, or None if this content was never analyzed
+        """
+        if not self.supabase:
+            raise Exception("Supabase client not initialized")
+        
+        try:
+            response = self.supabase.table("analysis_contents").select("*").eq("content_key", content_key).execute()
+            return response.data[0] if response.data else None
+            
+        except Exception as e:
+            self.logger.error(f"Error getting analysis content: {str(e)}")
+            raise
+    
+    @traced("supabase.find_sequence_results")
+    def find_sequence_results(self, user_id: str, sequence_hash: str) -> List[Dict[str, Any]]:
+        """
+        Get the user's analyses of a sequence, whatever database version or parameters were used
+        
+        Args:
+            user_id: User ID
+            sequence_hash: SHA-256 of the uploaded FASTA file
+            
+        Returns:
+            History rows (id, sample_id, content_key, db_version, analysis_params, created_at), newest first
+        """
+        if not self.supabase:
+            raise Exception("Supabase client not initialized")
+        
+        try:
+            contents = (
+                self.supabase.table("analysis_contents")
+                .select("content_key,db_version,analysis_params")
+                .eq("sequence_hash", sequence_hash)
+                .execute()
+            ).data or []
+            if not contents:
+                return []
+            
+            by_key = {content["content_key"]: content for content in contents}
+            rows = (
+                self.supabase.table("analysis_results")
+                .select("id,sample_id,content_key,created_at")
+                .eq("user_id", user_id)
+                .in_("content_key", list(by_key))
+                .order("created_at", desc=True)
+                .execute()
+            ).data or []
+            
+            for row in rows:
+                content = by_key[row["content_key"]]
+                row["db_version"] = content["db_version"]
+                row["analysis_params"] = content["analysis_params"]
+            return rows
+            
+        except Exception as e:
+            self.logger.error(f"Error finding results for sequence: {str(e)}")
+            raise
+    
+    def _save_contents(self, contents: List[Dict[str, Any]]) -> None:
+        # Content rows are immutable, so one that already exists is left as is
+        self.supabase.table("analysis_contents").upsert(
+            contents,
+            ignore_duplicates=True,
+            on_conflict="content_key"
+        ).execute()
+    
+    def _merge_contents(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Fill deduplicated history rows with the shared columns of their content"""
+        keys = {
+            row["content_key"] for row in rows
+            if row.get("content_key") and any(row.get(column) is None for column in CONTENT_READ_FIELDS)
+        }
+        if not keys:
+            return rows
+        
+        response = (
+            self.supabase.table("analysis_contents")
+            .select(",".join(("content_key",) + CONTENT_READ_FIELDS))
+            .in_("content_key", list(keys))
+            .execute()
+        )
+        contents = {content["content_key"]: content for content in response.data or []}
+        return [merge_content(row, contents.get(row.get("content_key"))) for row in rows]
+    
     def _prepare_for_storage(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Prepare data for storage in Supabase by converting non-serializable objects to strings
+        Prepare data for storage in Supabase by converting non-JSON values to JSON types
         
         Args:
             data: Data to prepare
@@ -247,19 +646,9 @@ class SupabaseService:
         Returns:
             Prepared data
         """
-        import json
-        from datetime import datetime
-        
-        def json_serializer(obj):
-            if isinstance(obj, datetime):
-                return obj.isoformat()
-            return str(obj)
-        
-        # Convert the entire object to JSON and back to handle nested objects
+        # Convert nested datetimes/enums/models in place of a dumps/loads round trip
         try:
-            json_str = json.dumps(data, default=json_serializer)
-            prepared_data = json.loads(json_str)
-            return prepared_data
+            return to_jsonable(data)
         except Exception as e:
             self.logger.error(f"Error preparing data for storage: {str(e)}")
             # If conversion fails, return a simplified version
@@ -270,3 +659,12 @@ class SupabaseService:
                 "identified_genes": list(data.get("identified_genes", [])),
                 "raw_data": str(data)
             }
+
+_supabase_service: Optional[SupabaseService] = None
+
+def get_supabase_service(settings: Optional[Settings] = None) -> SupabaseService:
+    """Get the process-wide SupabaseService, creating it on first use"""
+    global _supabase_service
+    if _supabase_service is None:
+        _supabase_service = SupabaseService(settings)
+    return _supabase_service
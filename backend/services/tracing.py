@@ -0,0 +1,353 @@
+import os
+import time
+import queue
+import random
+import logging
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from utils.config import Settings
+from utils.serialization import encode
+
+SERVICE_NAME = "mrsa-kds"
+
+# OTLP span kinds
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+class Span:
+    """One timed operation of a trace"""
+
+    __slots__ = (
+        "name", "trace_id", "span_id", "parent_id", "kind", "sampled", "root",
+        "start_ns", "end_ns", "attributes", "error", "_timings", "_timings_lock"
+    )
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str],
+        sampled: bool,
+        root: Optional["Span"] = None,
+        kind: int = SPAN_KIND_INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.kind = kind
+        self.sampled = sampled
+        # The request's root span collects stage durations for the Server-Timing header
+        self.root = root or self
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = dict(attributes or {})
+        self.error: Optional[str] = None
+        self._timings: Dict[str, float] = {}
+        self._timings_lock = threading.Lock()
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def traceparent(self) -> str:
+        """W3C traceparent header value pointing at this span"""
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def add_timing(self, stage: str, duration_ms: float) -> None:
+        with self.root._timings_lock:
+            self.root._timings[stage] = self.root._timings.get(stage, 0.0) + duration_ms
+
+    def server_timing(self) -> str:
+        """Server-Timing header value with the stages recorded under this root span"""
+        with self._timings_lock:
+            timings = list(self._timings.items())
+        entries = [f"{stage};dur={duration:.1f}" for stage, duration in timings]
+        entries.append(f"total;dur={self.duration_ms:.1f}")
+        return ", ".join(entries)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": [_otlp_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1}
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+def _resource_spans(spans: List[Span]) -> Dict[str, Any]:
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [_otlp_attribute("service.name", SERVICE_NAME)]},
+            "scopeSpans": [{"scope": {"name": SERVICE_NAME}, "spans": [span.to_otlp() for span in spans]}]
+        }]
+    }
+
+class ConsoleSpanExporter:
+    """Logs one line per finished span"""
+
+    def __init__(self):
+        self.logger = logging.getLogger("tracing")
+
+    def export(self, spans: List[Span]) -> None:
+        for span in spans:
+            self.logger.info(
+                f"trace={span.trace_id} span={span.span_id} parent={span.parent_id or '-'} "
+                f"{span.name} {span.duration_ms:.1f}ms{' error=' + span.error if span.error else ''}"
+            )
+
+    def shutdown(self) -> None:
+        pass
+
+class FileSpanExporter:
+    """Appends spans to a JSON lines file, one OTLP/JSON ResourceSpans document per batch"""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "ab")
+
+    def export(self, spans: List[Span]) -> None:
+        self._file.write(encode(_resource_spans(spans)) + b"\n")
+        self._file.flush()
+
+    def shutdown(self) -> None:
+        self._file.close()
+
+class OTLPSpanExporter:
+    """Sends spans to an OpenTelemetry collector over OTLP/HTTP with JSON encoding"""
+
+    def __init__(self, endpoint: str, settings: Optional[Settings] = None):
+        from services.http_client import get_http_pool
+
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.client = get_http_pool(settings).client(headers={"Content-Type": "application/json"})
+
+    def export(self, spans: List[Span]) -> None:
+        response = self.client.post(self.url, content=encode(_resource_spans(spans)))
+        response.raise_for_status()
+
+    def shutdown(self) -> None:
+        # Only this client is closed; the pool's connections stay open for the other integrations
+        self.client.close()
+
+class Tracer:
+    """Creates spans and hands finished, sampled ones to the exporters from a background thread"""
+
+    def __init__(
+        self,
+        exporters: Optional[List[Any]] = None,
+        sample_ratio: float = 1.0,
+        batch_size: int = 256,
+        flush_interval: float = 2.0,
+        max_queue: int = 8192
+    ):
+        """
+        Args:
+            exporters: Objects with export(spans) and shutdown(); no exporters means spans
+                are only used for Server-Timing
+            sample_ratio: Fraction of new traces exported (incoming sampled traces always are)
+            batch_size: Spans per export call
+            flush_interval: Seconds between exports of a partial batch
+            max_queue: Finished spans buffered before new ones are dropped
+        """
+        self.exporters = exporters or []
+        self.sample_ratio = sample_ratio
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.logger = logging.getLogger(__name__)
+
+        self._queue: "queue.Queue[Span]" = queue.Queue(maxsize=max_queue)
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        if self.exporters:
+            self._thread = threading.Thread(target=self._export_loop, name="span-exporter", daemon=True)
+            self._thread.start()
+
+    def start_span(
+        self,
+        name: str,
+        parent: Optional[Span] = None,
+        traceparent: Optional[str] = None,
+        kind: int = SPAN_KIND_INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None
+    ) -> Span:
+        """
+        Start a span under a parent span, a remote traceparent, or as a new trace
+
+        The caller must pass the span to end().
+        """
+        if parent is not None:
+            return Span(name, parent.trace_id, parent.span_id, parent.sampled, parent.root, kind, attributes)
+
+        remote = _parse_traceparent(traceparent) if traceparent else None
+        if remote is not None:
+            trace_id, parent_id, sampled = remote
+        else:
+            trace_id, parent_id = f"{random.getrandbits(128):032x}", None
+            sampled = random.random() < self.sample_ratio
+        return Span(name, trace_id, parent_id, sampled, kind=kind, attributes=attributes)
+
+    def end(self, span: Span) -> None:
+        span.end_ns = time.time_ns()
+        if not (span.sampled and self.exporters):
+            return
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Export what is buffered and close the exporters"""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        for exporter in self.exporters:
+            try:
+                exporter.shutdown()
+            except Exception as e:
+                self.logger.warning(f"Error closing span exporter: {str(e)}")
+
+    def _export_loop(self) -> None:
+        while True:
+            batch: List[Span] = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=min(remaining, 0.2)))
+                except queue.Empty:
+                    if self._stopping.is_set():
+                        break
+
+            if batch:
+                for exporter in self.exporters:
+                    try:
+                        exporter.export(batch)
+                    except Exception as e:
+                        # Tracing must never affect the request path; the batch is dropped
+                        self.logger.warning(f"Error exporting {len(batch)} spans: {str(e)}")
+
+            if self._stopping.is_set() and self._queue.empty():
+                return
+
+def _parse_traceparent(value: str) -> Optional[tuple]:
+    parts = value.strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        sampled = bool(int(parts[3], 16) & 1)
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    return parts[1], parts[2], sampled
+
+_tracer = Tracer()
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+def configure_tracing(settings: Settings) -> Tracer:
+    """
+    Replace the process-wide tracer with one exporting to TRACE_EXPORTERS
+
+    Args:
+        settings: Application settings; TRACE_EXPORTERS is a comma-separated list
+            of "console", "file" and "otlp"
+
+    Returns:
+        The new tracer
+    """
+    global _tracer
+    exporters: List[Any] = []
+    for name in filter(None, (part.strip().lower() for part in settings.TRACE_EXPORTERS.split(","))):
+        if name == "console":
+            exporters.append(ConsoleSpanExporter())
+        elif name == "file":
+            exporters.append(FileSpanExporter(settings.TRACE_FILE_PATH))
+        elif name == "otlp":
+            exporters.append(OTLPSpanExporter(settings.OTLP_ENDPOINT, settings))
+        else:
+            raise ValueError(f"Unknown trace exporter: {name}")
+
+    _tracer = Tracer(exporters, sample_ratio=settings.TRACE_SAMPLE_RATIO)
+    return _tracer
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+def current_traceparent() -> Optional[str]:
+    """traceparent of the current span, for carrying the trace into a queued job or subprocess"""
+    span = _current_span.get()
+    return span.traceparent() if span is not None else None
+
+@contextmanager
+def start_span(
+    name: str,
+    traceparent: Optional[str] = None,
+    kind: int = SPAN_KIND_INTERNAL,
+    **attributes: Any
+) -> Iterator[Span]:
+    """
+    Run a block inside a span, a child of the current span if there is one
+
+    Args:
+        name: Span name
+        traceparent: Remote parent used when there is no current span (e.g. a queued job)
+        kind: OTLP span kind
+        **attributes: Span attributes
+    """
+    tracer = _tracer
+    span = tracer.start_span(name, parent=_current_span.get(), traceparent=traceparent, kind=kind, attributes=attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        tracer.end(span)
+
+def traced(name: str) -> Callable:
+    """Decorator running each call of a function inside a span"""
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with start_span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def record_timing(stage: str, duration_ms: float) -> None:
+    """Add a stage's duration to the current request's Server-Timing header"""
+    span = _current_span.get()
+    if span is not None:
+        span.add_timing(stage, duration_ms)
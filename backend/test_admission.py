@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Tests for admission control: bounded in-flight and queued requests, 429 when the
+queue is full, 503 when a queued request waits too long, and 401 before a slot is
+taken for requests without a valid token
+"""
+
+import os
+import sys
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services.admission import AdmissionController, AdmissionRejected
+
+async def _rejection(awaitable):
+    try:
+        await awaitable
+    except AdmissionRejected as e:
+        return e
+    raise AssertionError("request was admitted")
+
+def test_queue_full_is_rejected_with_429():
+    async def scenario():
+        controller = AdmissionController("blast", max_in_flight=1, max_queued=1, queue_timeout=5, retry_after=7)
+        await controller.acquire()
+        queued = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+
+        rejected = await _rejection(controller.acquire())
+        assert rejected.status_code == 429
+        assert rejected.retry_after == 7
+
+        # The queued request gets the slot once it's released
+        controller.release()
+        await asyncio.wait_for(queued, 1)
+        controller.release()
+        return controller.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["in_flight"] == 0 and stats["queued"] == 0
+    assert stats["admitted"] == 2
+    assert stats["rejected_queue_full"] == 1 and stats["rejected_timeout"] == 0
+
+def test_queue_timeout_is_rejected_with_503():
+    async def scenario():
+        controller = AdmissionController("analyze", max_in_flight=1, max_queued=4, queue_timeout=0.05, retry_after=3)
+        await controller.acquire()
+
+        rejected = await _rejection(controller.acquire())
+        assert rejected.status_code == 503
+        assert rejected.retry_after == 3
+
+        # A timed-out request leaves no waiter behind to take the next free slot
+        controller.release()
+        return controller.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["in_flight"] == 0 and stats["queued"] == 0
+    assert stats["rejected_timeout"] == 1 and stats["rejected_queue_full"] == 0
+
+def test_slots_are_handed_over_in_arrival_order():
+    async def scenario():
+        controller = AdmissionController("blast", max_in_flight=1, max_queued=3, queue_timeout=5)
+        await controller.acquire()
+        order = []
+
+        async def request(name):
+            await controller.acquire()
+            order.append(name)
+            controller.release()
+
+        tasks = [asyncio.create_task(request(name)) for name in ("a", "b", "c")]
+        await asyncio.sleep(0)
+        assert controller.stats()["queued"] == 3
+        controller.release()
+        await asyncio.wait_for(asyncio.gather(*tasks), 1)
+        return order, controller.stats()
+
+    order, stats = asyncio.run(scenario())
+    assert order == ["a", "b", "c"]
+    assert stats["in_flight"] == 0
+
+def test_cancelled_waiter_gives_its_slot_back():
+    async def scenario():
+        controller = AdmissionController("blast", max_in_flight=1, max_queued=2, queue_timeout=5)
+        await controller.acquire()
+        waiter = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+        controller.release()
+        # The slot is free again rather than held for the client that went away
+        await asyncio.wait_for(controller.acquire(), 1)
+        controller.release()
+        return controller.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["in_flight"] == 0 and stats["queued"] == 0
+
+def _services(admission):
+    from types import SimpleNamespace
+
+    def get_user_from_token(token):
+        if token != "valid-token":
+            raise ValueError("invalid token")
+        return {"id": "alice", "email": "alice@example.org"}
+
+    return SimpleNamespace(admission=admission, supabase_service=SimpleNamespace(get_user_from_token=get_user_from_token))
+
+def test_rejections_carry_cors_and_retry_after():
+    from fastapi.testclient import TestClient
+    import main
+
+    full = AdmissionController("blast", max_in_flight=0, max_queued=0, retry_after=9)
+    main.app.state.services = _services({"/api/blast": full})
+    try:
+        response = TestClient(main.app).post(
+            "/api/blast",
+            headers={"Origin": "http://frontend.example", "Authorization": "Bearer valid-token"}
+        )
+    finally:
+        del main.app.state.services
+
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "9"
+    assert response.headers["access-control-allow-origin"] == "*"
+    assert "Retry-After" in response.headers["access-control-expose-headers"]
+
+def test_unauthenticated_requests_never_take_a_slot():
+    from fastapi.testclient import TestClient
+    import main
+
+    controller = AdmissionController("analyze", max_in_flight=0, max_queued=0)
+    main.app.state.services = _services({"/api/analyze": controller})
+    try:
+        client = TestClient(main.app)
+        missing = client.post("/api/analyze")
+        forged = client.post("/api/analyze", headers={"Authorization": "Bearer forged-token"})
+        admitted = client.post("/api/analyze", headers={"Authorization": "Bearer valid-token"})
+    finally:
+        del main.app.state.services
+
+    for response in (missing, forged):
+        assert response.status_code == 401
+        assert response.headers["www-authenticate"] == "Bearer"
+    # Only the signed-in request reached admission control
+    assert admitted.status_code == 429
+    assert controller.stats()["rejected_queue_full"] == 1
+
+if __name__ == "__main__":
+    test_queue_full_is_rejected_with_429()
+    test_queue_timeout_is_rejected_with_503()
+    test_slots_are_handed_over_in_arrival_order()
+    test_cancelled_waiter_gives_its_slot_back()
+    test_rejections_carry_cors_and_retry_after()
+    test_unauthenticated_requests_never_take_a_slot()
+    print("✅ Admission control tests passed")
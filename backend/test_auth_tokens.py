@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Tests for access token verification and the auth caches: bad tokens are rejected,
+cached identities expire with their token and cached profiles can be invalidated
+"""
+
+import os
+import sys
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+import jwt
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services.supabase_service import SupabaseService
+from services.token_verifier import TokenVerifier
+from utils.config import Settings
+
+SECRET = "test-secret"
+
+def _token(secret=SECRET, **claims):
+    claims = {"sub": "alice", "email": "alice@example.org", "aud": "authenticated", "exp": int(time.time()) + 600, **claims}
+    return jwt.encode(claims, secret, algorithm="HS256")
+
+def _rejected(verifier, token):
+    try:
+        verifier.verify(token)
+    except jwt.InvalidTokenError as e:
+        return e
+    raise AssertionError("token was accepted")
+
+def _service(secret=SECRET, profiles=None):
+    settings = Settings()
+    settings.SUPABASE_URL = settings.SUPABASE_KEY = ""
+    settings.SUPABASE_JWT_SECRET = secret
+    settings.SUPABASE_JWKS_URL = ""
+    service = SupabaseService(settings)
+
+    reads = []
+
+    def get_profile(user_id):
+        reads.append(user_id)
+        return dict((profiles or {}).get(user_id, {}))
+
+    service.profile_store = SimpleNamespace(get_profile=get_profile)
+    return service, reads
+
+def test_valid_token_is_accepted():
+    claims = TokenVerifier(secret=SECRET).verify(_token())
+    assert claims["sub"] == "alice" and claims["email"] == "alice@example.org"
+
+def test_expired_token_is_rejected():
+    error = _rejected(TokenVerifier(secret=SECRET), _token(exp=int(time.time()) - 5))
+    assert isinstance(error, jwt.ExpiredSignatureError)
+
+def test_bad_signature_audience_and_algorithm_are_rejected():
+    verifier = TokenVerifier(secret=SECRET)
+    assert isinstance(_rejected(verifier, _token(secret="someone-elses-secret")), jwt.InvalidSignatureError)
+    assert isinstance(_rejected(verifier, _token(aud="anon")), jwt.InvalidAudienceError)
+    # An unsigned token must not fall through to a key-less decode
+    unsigned = jwt.encode({"sub": "alice", "exp": int(time.time()) + 600}, None, algorithm="none")
+    _rejected(verifier, unsigned)
+    # Without a secret there is no key to check HS256 tokens against
+    _rejected(TokenVerifier(secret=None), _token())
+
+def test_cached_identity_is_dropped_at_token_expiry():
+    service, _ = _service()
+    expires_at = int(time.time()) + 600
+    token = _token(exp=expires_at)
+
+    with mock.patch.object(service, "_verify_token", wraps=service._verify_token) as verify:
+        assert service.get_user_from_token(token)["id"] == "alice"
+        assert service.get_user_from_token(token)["id"] == "alice"
+        assert verify.call_count == 1
+
+        # Once the token's exp has passed the cached identity is no longer served
+        with mock.patch("utils.ttl_cache.time.time", return_value=expires_at + 1):
+            service.get_user_from_token(token)
+        assert verify.call_count == 2
+
+def test_invalidated_profile_is_read_again():
+    profiles = {"alice": {"full_name": "Alice", "institution": "St Mary's"}}
+    service, reads = _service(profiles=profiles)
+    token = _token()
+
+    assert service.get_user_from_token(token)["institution"] == "St Mary's"
+    assert service.get_user_from_token(token)["institution"] == "St Mary's"
+    assert reads == ["alice"]
+
+    profiles["alice"]["institution"] = "St Thomas'"
+    service.invalidate_profile("alice")
+    assert service.get_user_from_token(token)["institution"] == "St Thomas'"
+    assert reads == ["alice", "alice"]
+
+def test_remote_check_only_takes_expiry_from_the_token():
+    service, _ = _service(secret="")
+    assert service.token_verifier is None
+
+    # The payload claims to be someone else; only its exp may be used
+    expires_at = int(time.time()) + 300
+    token = _token(secret="unknown-key", sub="mallory", email="mallory@example.org", exp=expires_at)
+    verified = []
+
+    def get_user(access_token):
+        verified.append(access_token)
+        return SimpleNamespace(user=SimpleNamespace(id="alice", email="alice@example.org"))
+
+    service.supabase = SimpleNamespace(auth=SimpleNamespace(get_user=get_user))
+    identity = service._verify_token(token)
+    assert identity == {"id": "alice", "email": "alice@example.org", "expires_at": expires_at}
+
+    user = service.get_user_from_token(token)
+    assert user["id"] == "alice" and user["email"] == "alice@example.org"
+    assert verified == [token, token]
+
+if __name__ == "__main__":
+    test_valid_token_is_accepted()
+    test_expired_token_is_rejected()
+    test_bad_signature_audience_and_algorithm_are_rejected()
+    test_cached_identity_is_dropped_at_token_expiry()
+    test_invalidated_profile_is_read_again()
+    test_remote_check_only_takes_expiry_from_the_token()
+    print("✅ Auth token tests passed")
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Check that the streaming direct comparison gives the same hits as the original
+list-based implementation, which aligned every query against every reference,
+kept all hits and sorted them
+"""
+
+import os
+import sys
+import random
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from Bio import SeqIO, pairwise2
+
+from models.blast_model import BlastHit, BlastResult
+from services.blast_service import BlastService, DIRECT_BYTES_PER_CELL
+from services.resistance_analysis_service import ResistanceAnalysisService
+from utils.config import Settings
+
+SAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+GENES = ["mecA", "mecC", "ermA", "ermC"]
+FRAGMENT_LENGTH = 120
+
+def list_based_comparison(query_file_path, reference_fasta_path, max_hits):
+    """The direct comparison as it was before it streamed, without progress events"""
+    reference_records = list(SeqIO.parse(reference_fasta_path, "fasta"))
+    results = []
+    for query_record in SeqIO.parse(query_file_path, "fasta"):
+        hits = []
+        for ref_record in reference_records:
+            alignments = pairwise2.align.localms(query_record.seq, ref_record.seq, 2, -1, -2, -0.5)
+            if not alignments:
+                continue
+            best_align = alignments[0]
+            align_len = identities = gaps = 0
+            for q, s in zip(best_align[0], best_align[1]):
+                if q != '-' and s != '-':
+                    align_len += 1
+                    if q == s:
+                        identities += 1
+                if q == '-' or s == '-':
+                    gaps += 1
+            q_start = best_align[0].find(next(ch for ch in best_align[0] if ch != '-'))
+            q_end = len(best_align[0]) - best_align[0][::-1].find(next(ch for ch in best_align[0][::-1] if ch != '-'))
+            s_start = best_align[1].find(next(ch for ch in best_align[1] if ch != '-'))
+            s_end = len(best_align[1]) - best_align[1][::-1].find(next(ch for ch in best_align[1][::-1] if ch != '-'))
+            percent_identity = (identities / align_len) * 100 if align_len > 0 else 0
+            if percent_identity >= 70:
+                hits.append(BlastHit(
+                    query_id=query_record.id,
+                    subject_id=ref_record.id,
+                    percent_identity=percent_identity,
+                    alignment_length=align_len,
+                    mismatches=align_len - identities,
+                    gap_opens=gaps,
+                    query_start=q_start,
+                    query_end=q_end,
+                    subject_start=s_start,
+                    subject_end=s_end,
+                    evalue=0.001,
+                    bit_score=best_align[2]
+                ))
+        hits.sort(key=lambda h: h.percent_identity, reverse=True)
+        results.append(BlastResult(query_id=query_record.id, query_length=len(query_record.seq), hits=hits[:max_hits]))
+    return results
+
+def _mutate(sequence, rate, rng):
+    return "".join(rng.choice("ACGT".replace(base, "")) if rng.random() < rate else base for base in sequence)
+
+def _write_fixtures(directory):
+    """Short reference genes (with near-duplicates, so hits tie and get cut) and queries"""
+    rng = random.Random(7)
+    fragments = {
+        gene: str(SeqIO.read(os.path.join(SAMPLES_DIR, f"{gene}_gene_sample.fasta"), "fasta").seq[:FRAGMENT_LENGTH])
+        for gene in GENES
+    }
+
+    reference_path = os.path.join(directory, "resistance_genes.fasta")
+    with open(reference_path, "w") as f:
+        for gene, fragment in fragments.items():
+            f.write(f">{gene}\n{fragment}\n")
+            f.write(f">{gene}_copy\n{fragment}\n")
+            f.write(f">{gene}_variant\n{_mutate(fragment, 0.08, rng)}\n")
+
+    query_path = os.path.join(directory, "query.fasta")
+    with open(query_path, "w") as f:
+        for gene, fragment in fragments.items():
+            f.write(f">{gene}_query\n{_mutate(fragment[10:110], 0.04, rng)}\n")
+        f.write(f">random_query\n{''.join(rng.choice('ACGT') for _ in range(100))}\n")
+    return query_path, reference_path
+
+def _blast_service(directory):
+    settings = Settings()
+    settings.BLAST_DB_PATH = directory
+    settings.TEMP_UPLOADS_DIR = os.path.join(directory, "uploads")
+    return BlastService(settings)
+
+def _as_dicts(results):
+    return [(r.query_id, r.query_length, [h.model_dump() for h in r.hits]) for r in results]
+
+def test_direct_comparison_matches_list_based():
+    with tempfile.TemporaryDirectory() as directory:
+        query_path, reference_path = _write_fixtures(directory)
+        blast_service = _blast_service(directory)
+
+        for max_hits in (0, 1, 2, 10):
+            expected = _as_dicts(list_based_comparison(query_path, reference_path, max_hits))
+            assert _as_dicts(blast_service._run_direct_comparison(query_path, reference_path, max_hits=max_hits)) == expected
+            assert _as_dicts(blast_service.iter_direct_comparison(query_path, reference_path, max_hits=max_hits)) == expected
+
+def test_iter_blast_streams_direct_comparison_without_database():
+    with tempfile.TemporaryDirectory() as directory:
+        query_path, reference_path = _write_fixtures(directory)
+        blast_service = _blast_service(directory)
+
+        results = blast_service.iter_blast(query_path)
+        first = next(results)
+        assert first.query_id == "mecA_query"
+        assert _as_dicts([first, *results]) == _as_dicts(list_based_comparison(query_path, reference_path, 10))
+
+def test_streamed_findings_match_analysis_of_list():
+    with tempfile.TemporaryDirectory() as directory:
+        query_path, _ = _write_fixtures(directory)
+        blast_service = _blast_service(directory)
+        analysis_service = ResistanceAnalysisService()
+
+        findings = analysis_service.start_findings()
+        for result in blast_service.iter_blast(query_path):
+            findings.add(result)
+        streamed = analysis_service.analyze_resistance(findings)
+        from_list = analysis_service.analyze_resistance(blast_service.run_blast(query_path))
+        assert findings.records == 5
+        assert streamed.model_dump(exclude={"analysis_timestamp"}) == from_list.model_dump(exclude={"analysis_timestamp"})
+
+def _write_long_queries(directory, reference_path, window):
+    """Genome-length queries with gene fragments inside, at and across window boundaries"""
+    rng = random.Random(11)
+    fragments = {record.id: str(record.seq) for record in SeqIO.parse(reference_path, "fasta")}
+    background = lambda length: "".join(rng.choice("ACGT") for _ in range(length))
+
+    query_path = os.path.join(directory, "long_query.fasta")
+    with open(query_path, "w") as f:
+        # Inside the first window, straddling the first boundary, and in the last window
+        f.write(f">contig_1\n{background(50)}{_mutate(fragments['mecA'], 0.03, rng)}{background(window * 2)}\n")
+        f.write(f">contig_2\n{background(window - 60)}{_mutate(fragments['ermC'], 0.03, rng)}{background(window)}\n")
+        f.write(f">contig_3\n{background(window * 2)}{_mutate(fragments['mecC'], 0.03, rng)}{background(40)}\n")
+    return query_path
+
+def test_windowed_comparison_matches_whole_records():
+    with tempfile.TemporaryDirectory() as directory:
+        _, reference_path = _write_fixtures(directory)
+        window = 400
+        query_path = _write_long_queries(directory, reference_path, window)
+        longest_query = max(len(record.seq) for record in SeqIO.parse(query_path, "fasta"))
+
+        whole = _blast_service(directory)
+        whole.memory_guard.request_budget = 0
+        expected = _as_dicts(whole.iter_direct_comparison(query_path, reference_path))
+
+        # A budget that only fits a window-length slice of the query against the longest reference
+        windowed = _blast_service(directory)
+        windowed.memory_guard.request_budget = window * FRAGMENT_LENGTH * DIRECT_BYTES_PER_CELL + longest_query
+        assert windowed._direct_comparison_window(longest_query, FRAGMENT_LENGTH) == window
+        pieces = list(windowed._query_windows("N" * longest_query, FRAGMENT_LENGTH, window))
+        assert len(pieces) >= 4 and pieces[-1][0] + len(pieces[-1][1]) == longest_query
+
+        assert _as_dicts(windowed.iter_direct_comparison(query_path, reference_path)) == expected
+        assert [hits[0]["subject_id"] for _, _, hits in expected] == ["mecA", "ermC", "mecC"]
+
+if __name__ == "__main__":
+    test_direct_comparison_matches_list_based()
+    test_iter_blast_streams_direct_comparison_without_database()
+    test_streamed_findings_match_analysis_of_list()
+    test_windowed_comparison_matches_whole_records()
+    print("✅ Direct comparison matches the list-based implementation")
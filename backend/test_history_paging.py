@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Tests for keyset pagination of analysis history: walking every page returns each of
+the user's results exactly once, newest first, even with identical timestamps and
+results added between pages
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services.sqlite_store import SQLiteResultsStore
+
+def _result(index, genes, created_at):
+    return {
+        "id": f"result-{index:03d}",
+        "sample_id": f"sample_{index}.fasta",
+        "resistance_status": "resistant" if genes else "susceptible",
+        "confidence_score": 0.9,
+        "matching_regions": [],
+        "identified_genes": genes,
+        "created_at": created_at
+    }
+
+def _store(directory):
+    store = SQLiteResultsStore(os.path.join(directory, "results.db"))
+    results = []
+    for index in range(23):
+        # Timestamps repeat in threes, so pages break inside runs of equal created_at
+        created_at = f"2026-01-01T00:00:{index // 3:02d}"
+        genes = ["mecA"] if index % 2 == 0 else []
+        result = _result(index, genes, created_at)
+        store.save_analysis_result("alice", result)
+        store.save_analysis_result("bob", _result(index + 100, genes, created_at))
+        results.append(result)
+    return store, results
+
+def _walk(store, limit, **kwargs):
+    ids, cursor, pages = [], None, 0
+    while True:
+        page = store.get_user_analysis_history("alice", limit=limit, cursor=cursor, **kwargs)
+        assert len(page["items"]) <= limit
+        ids.extend(item["id"] for item in page["items"])
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids, pages
+
+def _newest_first(results):
+    return [r["id"] for r in sorted(results, key=lambda r: (r["created_at"], r["id"]), reverse=True)]
+
+def test_pages_cover_every_result_once():
+    with tempfile.TemporaryDirectory() as directory:
+        store, results = _store(directory)
+        expected = _newest_first(results)
+
+        for limit in (1, 2, 3, 4, 7, 23, 50):
+            ids, pages = _walk(store, limit)
+            assert ids == expected, f"limit {limit}"
+            assert pages == max(1, -(-len(expected) // limit))
+
+def test_gene_filtered_pages_cover_every_match_once():
+    with tempfile.TemporaryDirectory() as directory:
+        store, results = _store(directory)
+        expected = _newest_first([r for r in results if r["identified_genes"]])
+
+        for limit in (1, 3, 5):
+            ids, _ = _walk(store, limit, gene="mecA")
+            assert ids == expected, f"limit {limit}"
+
+def test_results_added_between_pages_do_not_shift_later_pages():
+    with tempfile.TemporaryDirectory() as directory:
+        store, results = _store(directory)
+        expected = _newest_first(results)
+
+        first = store.get_user_analysis_history("alice", limit=5)
+        # A newer result arriving mid-walk belongs before the cursor, so it isn't repeated or skipped
+        store.save_analysis_result("alice", _result(999, [], "2026-01-02T00:00:00"))
+
+        ids = [item["id"] for item in first["items"]]
+        cursor = first["next_cursor"]
+        while cursor:
+            page = store.get_user_analysis_history("alice", limit=5, cursor=cursor)
+            ids.extend(item["id"] for item in page["items"])
+            cursor = page["next_cursor"]
+
+        assert ids == expected
+
+def test_invalid_cursor_is_rejected():
+    with tempfile.TemporaryDirectory() as directory:
+        store, _ = _store(directory)
+        try:
+            store.get_user_analysis_history("alice", cursor="not a cursor")
+        except ValueError:
+            return
+        raise AssertionError("invalid cursor was accepted")
+
+if __name__ == "__main__":
+    test_pages_cover_every_result_once()
+    test_gene_filtered_pages_cover_every_match_once()
+    test_results_added_between_pages_do_not_shift_later_pages()
+    test_invalid_cursor_is_rejected()
+    print("✅ History paging tests passed")
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared HTTP client pool's proxy mounts, built from the environment
+"""
+
+import os
+import sys
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services.http_client import HttpClientPool, environment_proxies
+from utils.config import Settings
+
+PROXY_ENV = {
+    "HTTPS_PROXY": "proxy.internal:3128",
+    "HTTP_PROXY": "http://proxy.internal:3128",
+    "NO_PROXY": "localhost, 127.0.0.1,::1,.supabase.co"
+}
+
+def test_proxies_and_exclusions_come_from_the_environment():
+    with mock.patch.dict(os.environ, PROXY_ENV, clear=True):
+        mounts = environment_proxies()
+
+    assert mounts == {
+        "http://": "http://proxy.internal:3128",
+        "https://": "http://proxy.internal:3128",
+        "all://localhost": None,
+        "all://127.0.0.1": None,
+        "all://[::1]": None,
+        "all://*.supabase.co": None
+    }
+
+def test_no_proxy_wildcard_disables_proxies():
+    with mock.patch.dict(os.environ, {**PROXY_ENV, "NO_PROXY": "*"}, clear=True):
+        assert environment_proxies() == {}
+    with mock.patch.dict(os.environ, {}, clear=True):
+        assert environment_proxies() == {}
+
+def test_pool_mounts_a_shared_transport_per_proxy():
+    with mock.patch.dict(os.environ, PROXY_ENV, clear=True):
+        pool = HttpClientPool(Settings())
+    try:
+        assert set(pool._proxy_transports) == set(pool._async_proxy_transports) == {
+            "http://", "https://", "all://localhost", "all://127.0.0.1", "all://[::1]", "all://*.supabase.co"
+        }
+        assert pool._proxy_transports["https://"] is not None
+        # Excluded hosts go through the direct transport
+        assert pool._proxy_transports["all://*.supabase.co"] is None
+        pool.client().close()
+    finally:
+        pool.close()
+
+if __name__ == "__main__":
+    test_proxies_and_exclusions_come_from_the_environment()
+    test_no_proxy_wildcard_disables_proxies()
+    test_pool_mounts_a_shared_transport_per_proxy()
+    print("✅ HTTP client pool tests passed")
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Tests for the durable job queue: jobs interrupted by a restart are requeued and run,
+workers outlive failures they can't record, event streams end even when a job's
+events were lost with the restart, and the events kept per job are bounded
+"""
+
+import os
+import sys
+import time
+import asyncio
+import tempfile
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services.job_queue import JobQueue, JobStatus
+from services.progress import ProgressBroker
+from api.routes.jobs import _job_event_stream
+
+FASTA = b">sample\nACGTACGTACGT\n"
+
+def _queue(directory, handler, workers=1, progress=None):
+    return JobQueue(
+        os.path.join(directory, "jobs.db"),
+        os.path.join(directory, "spool"),
+        handler,
+        workers=workers,
+        poll_interval=0.05,
+        progress=progress
+    )
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.02)
+
+def _wait_for_status(queue, job_id, status, timeout=5.0):
+    deadline = time.time() + timeout
+    while queue.get(job_id)["status"] != status:
+        assert time.time() < deadline, f"job never reached {status}"
+        time.sleep(0.02)
+    return queue.get(job_id)
+
+def test_running_jobs_are_requeued_on_restart():
+    with tempfile.TemporaryDirectory() as directory:
+        # A worker claims the job and the process dies before it finishes
+        before = _queue(directory, handler=lambda job: {"never": "called"}, workers=0)
+        job_id = before.submit(FASTA, sample_id="sample.fasta", user_id="alice", params={"threshold": 0.8})
+        assert before._claim_next()["id"] == job_id
+        assert before.get(job_id)["status"] == JobStatus.RUNNING
+
+        handled = []
+
+        def handler(job):
+            with open(job["file_path"], "rb") as f:
+                handled.append((job["id"], job["sample_id"], job["params"], f.read()))
+            return {"resistance_status": "susceptible"}
+
+        after = _queue(directory, handler)
+        after.start()
+        try:
+            job = _wait_for_status(after, job_id, JobStatus.COMPLETED)
+        finally:
+            after.stop()
+
+        assert handled == [(job_id, "sample.fasta", {"threshold": 0.8}, FASTA)]
+        assert job["result"] == {"resistance_status": "susceptible"}
+        assert job["started_at"] is not None and job["finished_at"] is not None
+        assert after.depth()[JobStatus.RUNNING] == 0
+
+def test_finished_jobs_are_not_run_again():
+    with tempfile.TemporaryDirectory() as directory:
+        first = _queue(directory, handler=lambda job: {"run": 1})
+        first.start()
+        try:
+            job_id = first.submit(FASTA, sample_id="done.fasta")
+            _wait_for_status(first, job_id, JobStatus.COMPLETED)
+        finally:
+            first.stop()
+
+        calls = []
+        second = _queue(directory, handler=lambda job: calls.append(job["id"]) or {"run": 2})
+        second.start()
+        try:
+            time.sleep(0.2)
+        finally:
+            second.stop()
+
+        assert calls == []
+        assert second.get(job_id)["result"] == {"run": 1}
+
+def test_failed_job_records_its_error():
+    def handler(job):
+        raise RuntimeError("blastn crashed")
+
+    with tempfile.TemporaryDirectory() as directory:
+        queue = _queue(directory, handler)
+        queue.start()
+        try:
+            job_id = queue.submit(FASTA, sample_id="bad.fasta")
+            job = _wait_for_status(queue, job_id, JobStatus.FAILED)
+        finally:
+            queue.stop()
+
+        assert job["error"] == "blastn crashed"
+        assert not os.listdir(os.path.join(directory, "spool"))
+
+def test_event_stream_ends_from_stored_status_after_restart():
+    async def collect(queue, job_id, progress):
+        return [chunk async for chunk in _job_event_stream(job_id, queue, progress)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        queue = _queue(directory, handler=lambda job: {"ok": True})
+        queue.start()
+        try:
+            job_id = queue.submit(FASTA, sample_id="sample.fasta")
+            _wait_for_status(queue, job_id, JobStatus.COMPLETED)
+        finally:
+            queue.stop()
+
+        # A fresh broker, as after a restart: none of the job's events survive
+        chunks = asyncio.run(asyncio.wait_for(collect(queue, job_id, ProgressBroker()), 5))
+
+    assert chunks[-1].startswith(f"event: {JobStatus.COMPLETED}\n")
+
+def test_worker_survives_a_failure_it_cannot_record():
+    handled = []
+
+    def handler(job):
+        handled.append(job["sample_id"])
+        if job["sample_id"] == "bad.fasta":
+            raise RuntimeError("blastn crashed")
+        return {"ok": True}
+
+    with tempfile.TemporaryDirectory() as directory:
+        queue = _queue(directory, handler)
+        finish = queue._finish
+        failures = [RuntimeError("database is locked")]
+
+        def flaky_finish(*args, **kwargs):
+            if failures:
+                raise failures.pop()
+            return finish(*args, **kwargs)
+
+        with mock.patch.object(queue, "_finish", side_effect=flaky_finish):
+            queue.start()
+            try:
+                bad = queue.submit(FASTA, sample_id="bad.fasta")
+                _wait_for_status(queue, bad, JobStatus.RUNNING)
+                _wait_for(lambda: handled == ["bad.fasta"])
+                good = queue.submit(FASTA, sample_id="good.fasta")
+                _wait_for_status(queue, good, JobStatus.COMPLETED)
+            finally:
+                queue.stop()
+
+        assert handled == ["bad.fasta", "good.fasta"]
+        # Left running, so the next start requeues it
+        assert queue.get(bad)["status"] == JobStatus.RUNNING
+
+def test_progress_events_are_capped_per_job():
+    progress = ProgressBroker(max_events=3)
+    for i in range(5):
+        progress.publish("job", "hits", hits_so_far=i)
+
+    events, index = progress.events_since("job", 0)
+    assert [event["hits_so_far"] for event in events] == [2, 3, 4]
+    assert index == 5
+
+    # A reader that saw the first four events only gets the fifth
+    events, index = progress.events_since("job", 4)
+    assert [event["hits_so_far"] for event in events] == [4] and index == 5
+
+    progress.publish("job", "completed")
+    events, index = progress.events_since("job", index)
+    assert [event["stage"] for event in events] == ["completed"] and index == 6
+
+def test_progress_of_unfinished_jobs_expires_by_age():
+    progress = ProgressBroker(retention_seconds=60, max_age_seconds=600)
+    progress.publish("orphaned", "search_started")
+    progress.publish("finished", "completed")
+
+    now = time.time()
+    with mock.patch("services.progress.time.time", return_value=now + 120):
+        progress.publish("active", "search_started")
+    assert progress.events_since("finished", 0) == ([], 0)
+    assert len(progress.events_since("orphaned", 0)[0]) == 1
+
+    with mock.patch("services.progress.time.time", return_value=now + 601):
+        progress.publish("active", "hits")
+    assert progress.events_since("orphaned", 0) == ([], 0)
+    assert len(progress.events_since("active", 0)[0]) == 2
+
+if __name__ == "__main__":
+    test_running_jobs_are_requeued_on_restart()
+    test_finished_jobs_are_not_run_again()
+    test_failed_job_records_its_error()
+    test_event_stream_ends_from_stored_status_after_restart()
+    test_worker_survives_a_failure_it_cannot_record()
+    test_progress_events_are_capped_per_job()
+    test_progress_of_unfinished_jobs_expires_by_age()
+    print("✅ Job queue tests passed")
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Tests for the write-behind result writer: spooled results are flushed when a batch
+fills or the interval passes, retried with backoff when the store fails, replayed
+without duplicates after a crash, and readable while they wait
+"""
+
+import os
+import sys
+import time
+import tempfile
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services.result_writer import ResultWriter
+from services.sqlite_store import SQLiteResultsStore
+
+def _result(index):
+    return {
+        "sample_id": f"sample_{index}.fasta",
+        "resistance_status": "susceptible",
+        "confidence_score": 0.9,
+        "matching_regions": [],
+        "identified_genes": []
+    }
+
+def _writer(directory, store, **kwargs):
+    return ResultWriter(store, os.path.join(directory, "spool.db"), **kwargs)
+
+def _stored(store, user_id="alice"):
+    return sorted(result["id"] for result in store.get_user_analysis_results(user_id))
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.02)
+
+class _FailingStore:
+    """Store that fails a number of bulk inserts before passing them on"""
+
+    def __init__(self, store, failures):
+        self.store = store
+        self.failures = failures
+
+    def save_analysis_results(self, user_id, results, ignore_duplicates=False):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("store unavailable")
+        return self.store.save_analysis_results(user_id, results, ignore_duplicates=ignore_duplicates)
+
+def test_full_batch_is_flushed_before_the_interval():
+    with tempfile.TemporaryDirectory() as directory:
+        store = SQLiteResultsStore(os.path.join(directory, "results.db"))
+        writer = _writer(directory, store, batch_size=3, flush_interval=60)
+        writer.start()
+        try:
+            ids = writer.enqueue("alice", [_result(i) for i in range(2)])
+            time.sleep(0.2)
+            assert _stored(store) == []
+
+            ids += writer.enqueue("alice", [_result(2)])
+            _wait_for(lambda: len(_stored(store)) == 3)
+        finally:
+            writer.stop()
+
+        assert _stored(store) == sorted(ids)
+        assert writer.stats()["pending"] == 0
+
+def test_partial_batch_is_flushed_on_the_interval():
+    with tempfile.TemporaryDirectory() as directory:
+        store = SQLiteResultsStore(os.path.join(directory, "results.db"))
+        writer = _writer(directory, store, batch_size=50, flush_interval=0.1)
+        writer.start()
+        try:
+            ids = writer.enqueue("alice", [_result(0)])
+            _wait_for(lambda: _stored(store) == ids)
+        finally:
+            writer.stop()
+
+def test_failed_flush_is_retried_after_backoff():
+    with tempfile.TemporaryDirectory() as directory:
+        store = SQLiteResultsStore(os.path.join(directory, "results.db"))
+        writer = _writer(directory, _FailingStore(store, failures=2), max_backoff=60)
+        ids = writer.enqueue("alice", [_result(i) for i in range(2)])
+
+        assert writer.flush() == 0
+        assert writer.stats()["max_attempts"] == 1
+        # Not due again until the backoff has passed
+        assert writer.flush() == 0
+        assert writer.stats()["max_attempts"] == 1
+
+        now = time.time()
+        with mock.patch("services.result_writer.time.time", return_value=now + 1.5):
+            assert writer.flush() == 0
+        assert writer.stats()["max_attempts"] == 2
+        # The second failure waits twice as long
+        with mock.patch("services.result_writer.time.time", return_value=now + 3.0):
+            assert writer.flush() == 0
+        with mock.patch("services.result_writer.time.time", return_value=now + 4.0):
+            assert writer.flush() == 2
+
+        assert _stored(store) == sorted(ids)
+        assert writer.stats()["pending"] == 0 and writer.failed_flushes == 2
+
+def test_replay_after_a_crash_writes_each_result_once():
+    with tempfile.TemporaryDirectory() as directory:
+        store = SQLiteResultsStore(os.path.join(directory, "results.db"))
+        writer = _writer(directory, store)
+        ids = writer.enqueue("alice", [_result(i) for i in range(3)])
+
+        # The insert lands but the process dies before the spool rows are removed
+        with mock.patch.object(writer, "_delete", side_effect=SystemExit):
+            try:
+                writer.flush()
+            except SystemExit:
+                pass
+        assert _stored(store) == sorted(ids)
+
+        restarted = _writer(directory, store)
+        assert restarted.stats()["pending"] == 3
+        assert restarted.flush() == 3
+        assert _stored(store) == sorted(ids)
+        assert restarted.stats()["pending"] == 0
+
+def test_pending_result_is_readable_before_it_is_flushed():
+    from types import SimpleNamespace
+    from fastapi.testclient import TestClient
+    import main
+    from api.dependencies import get_results_store, get_result_writer
+    from api.routes.auth import get_current_user_dependency
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = SQLiteResultsStore(os.path.join(directory, "results.db"))
+        writer = _writer(directory, store)
+        result_id = writer.enqueue("alice", [_result(0)])[0]
+        assert writer.get_pending("bob", result_id) is None
+
+        user = SimpleNamespace(id="alice")
+        main.app.dependency_overrides[get_results_store] = lambda: store
+        main.app.dependency_overrides[get_result_writer] = lambda: writer
+        main.app.dependency_overrides[get_current_user_dependency] = lambda: user
+        try:
+            client = TestClient(main.app)
+            pending = client.get(f"/api/history/{result_id}").json()
+            writer.flush()
+            flushed = client.get(f"/api/history/{result_id}").json()
+            user.id = "bob"
+            assert client.get(f"/api/history/{result_id}").status_code == 404
+        finally:
+            main.app.dependency_overrides.clear()
+
+    assert pending["id"] == flushed["id"] == result_id
+    assert pending["sample_id"] == flushed["sample_id"] == "sample_0.fasta"
+
+if __name__ == "__main__":
+    test_full_batch_is_flushed_before_the_interval()
+    test_partial_batch_is_flushed_on_the_interval()
+    test_failed_flush_is_retried_after_backoff()
+    test_replay_after_a_crash_writes_each_result_once()
+    test_pending_result_is_readable_before_it_is_flushed()
+    print("✅ Result writer tests passed")
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Tests for the single-flight layer: one computation per key, shared by concurrent callers
+"""
+
+import os
+import sys
+import time
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from models.blast_model import BlastResult
+from services.analysis_pipeline import AnalysisPipeline
+from services.resistance_analysis_service import ResistanceAnalysisService
+from services.single_flight import SingleFlight
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.01)
+
+def _run_concurrently(single_flight, key, fn, followers):
+    """Start a leader, attach followers while it's blocked in fn, and collect every outcome"""
+    outcomes = {}
+
+    def call(name):
+        try:
+            outcomes[name] = ("result", single_flight.do(key, fn))
+        except Exception as e:
+            outcomes[name] = ("error", e)
+
+    leader = threading.Thread(target=call, args=("leader",))
+    leader.start()
+    _wait_for(lambda: single_flight.stats()["in_flight"] == 1)
+
+    threads = [threading.Thread(target=call, args=(f"follower{i}",)) for i in range(followers)]
+    for thread in threads:
+        thread.start()
+    _wait_for(lambda: single_flight.stats()["shared"] == followers)
+    return leader, threads, outcomes
+
+def test_followers_share_the_leaders_result():
+    single_flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return {"value": 42}
+
+    leader, followers, outcomes = _run_concurrently(single_flight, "key", compute, followers=3)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert outcomes["leader"] == ("result", ({"value": 42}, False))
+    for i in range(3):
+        assert outcomes[f"follower{i}"] == ("result", ({"value": 42}, True))
+    assert single_flight.stats() == {"in_flight": 0, "leaders": 1, "shared": 3}
+
+def test_error_reaches_leader_and_followers():
+    single_flight = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise ValueError("search failed")
+
+    leader, followers, outcomes = _run_concurrently(single_flight, "key", fail, followers=2)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    for name in ("leader", "follower0", "follower1"):
+        kind, error = outcomes[name]
+        assert kind == "error" and isinstance(error, ValueError) and str(error) == "search failed"
+
+    # A failed call isn't remembered; the next caller computes afresh
+    assert single_flight.do("key", lambda: "retried") == ("retried", False)
+
+def test_different_keys_run_separately():
+    single_flight = SingleFlight()
+    assert single_flight.do("a", lambda: 1) == (1, False)
+    assert single_flight.do("b", lambda: 2) == (2, False)
+    assert single_flight.stats()["leaders"] == 2
+
+class _BlockingSearch:
+    """BlastService stand-in whose search waits until released"""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def database_version(self):
+        return "test"
+
+    def iter_blast(self, query_file_path, progress=None):
+        self.release.wait(5)
+        yield BlastResult(query_id="contig_1", query_length=100, hits=[])
+
+def test_pipeline_followers_get_their_own_result():
+    search = _BlockingSearch()
+    pipeline = AnalysisPipeline(search, ResistanceAnalysisService(), results_store=None, reuse_results=False)
+    results = {}
+
+    with tempfile.NamedTemporaryFile("w", suffix=".fasta", delete=False) as f:
+        f.write(">contig_1\n" + "ACGT" * 25 + "\n")
+    try:
+        def run(sample_id):
+            results[sample_id] = pipeline.run(f.name, sample_id=sample_id)
+
+        leader = threading.Thread(target=run, args=("first.fasta",))
+        leader.start()
+        _wait_for(lambda: pipeline.single_flight.stats()["in_flight"] == 1)
+        follower = threading.Thread(target=run, args=("second.fasta",))
+        follower.start()
+        _wait_for(lambda: pipeline.single_flight.stats()["shared"] == 1)
+        search.release.set()
+        leader.join(5)
+        follower.join(5)
+    finally:
+        os.remove(f.name)
+
+    assert results["first.fasta"].sample_id == "first.fasta"
+    assert results["second.fasta"].sample_id == "second.fasta"
+    assert results["first.fasta"] is not results["second.fasta"]
+    assert results["first.fasta"].matching_regions is not results["second.fasta"].matching_regions
+
+if __name__ == "__main__":
+    test_followers_share_the_leaders_result()
+    test_error_reaches_leader_and_followers()
+    test_different_keys_run_separately()
+    test_pipeline_followers_get_their_own_result()
+    print("✅ Single-flight tests passed")
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Tests for the embedded SQLite results store: results round-trip with their shared
+content, and one user can never read another's results
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services.sqlite_store import SQLiteResultsStore
+
+REGION = {"gene_name": "mecA", "start_position": 1, "end_position": 120, "percent_identity": 99.0}
+
+def _result(sample_id, content_key="content-1"):
+    return {
+        "sample_id": sample_id,
+        "resistance_status": "resistant",
+        "confidence_score": 0.92,
+        "matching_regions": [REGION],
+        "identified_genes": ["mecA"],
+        "treatment_recommendations": None,
+        "content_key": content_key,
+        "sequence_hash": "abc123",
+        "db_version": "db-1",
+        "analysis_params": {"threshold": 0.75}
+    }
+
+def test_result_round_trips_with_its_content():
+    with tempfile.TemporaryDirectory() as directory:
+        store = SQLiteResultsStore(os.path.join(directory, "results.db"))
+        result_id = store.save_analysis_result("alice", _result("first.fasta"))
+
+        stored = store.get_analysis_result("alice", result_id)
+        assert stored["id"] == result_id
+        assert stored["sample_id"] == "first.fasta"
+        assert stored["identified_genes"] == ["mecA"]
+        assert stored["matching_regions"][0]["gene_name"] == "mecA"
+
+        content = store.get_content("content-1")
+        assert content["resistance_status"] == "resistant"
+        assert content["matching_regions"][0]["gene_name"] == "mecA"
+
+def test_results_are_only_returned_to_their_owner():
+    with tempfile.TemporaryDirectory() as directory:
+        store = SQLiteResultsStore(os.path.join(directory, "results.db"))
+        alices = store.save_analysis_result("alice", _result("alice.fasta"))
+        bobs = store.save_analysis_result("bob", _result("bob.fasta"))
+
+        assert store.get_analysis_result("alice", alices)["sample_id"] == "alice.fasta"
+        assert store.get_analysis_result("bob", alices) is None
+        assert store.get_analysis_result("alice", bobs) is None
+        assert store.get_analysis_result("alice", "missing") is None
+
+        assert [r["sample_id"] for r in store.get_user_analysis_results("alice")] == ["alice.fasta"]
+        assert [r["sample_id"] for r in store.find_sequence_results("bob", "abc123")] == ["bob.fasta"]
+
+def test_bulk_save_skips_duplicates_when_asked():
+    with tempfile.TemporaryDirectory() as directory:
+        store = SQLiteResultsStore(os.path.join(directory, "results.db"))
+        results = [{**_result(f"sample_{i}.fasta"), "id": f"result-{i}"} for i in range(3)]
+
+        assert store.save_analysis_results("alice", results) == ["result-0", "result-1", "result-2"]
+        # A retried flush of the same batch adds nothing
+        store.save_analysis_results("alice", results, ignore_duplicates=True)
+        assert len(store.get_user_analysis_results("alice")) == 3
+
+def test_history_route_answers_404_for_other_users_results():
+    from types import SimpleNamespace
+    from fastapi.testclient import TestClient
+    import main
+    from api.dependencies import get_results_store, get_result_writer
+    from api.routes.auth import get_current_user_dependency
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = SQLiteResultsStore(os.path.join(directory, "results.db"))
+        result_id = store.save_analysis_result("alice", _result("alice.fasta"))
+        user = SimpleNamespace(id="alice")
+        main.app.dependency_overrides[get_results_store] = lambda: store
+        main.app.dependency_overrides[get_result_writer] = lambda: None
+        main.app.dependency_overrides[get_current_user_dependency] = lambda: user
+        try:
+            client = TestClient(main.app)
+            assert client.get(f"/api/history/{result_id}").json()["sample_id"] == "alice.fasta"
+            user.id = "bob"
+            assert client.get(f"/api/history/{result_id}").status_code == 404
+        finally:
+            main.app.dependency_overrides.clear()
+
+def test_registered_profile_feeds_institution_statistics():
+    import time
+    import jwt
+    from types import SimpleNamespace
+    from fastapi.testclient import TestClient
+    import main
+    from services.container import ServiceContainer
+    from services.supabase_service import SupabaseService
+    from utils.config import Settings
+
+    with tempfile.TemporaryDirectory() as directory:
+        settings = Settings()
+        settings.SUPABASE_URL = settings.SUPABASE_KEY = ""
+        settings.RESULTS_STORE = "sqlite"
+        settings.RESULTS_DB_PATH = os.path.join(directory, "results.db")
+        settings.JOB_DB_PATH = os.path.join(directory, "jobs.db")
+        settings.JOB_SPOOL_DIR = os.path.join(directory, "spool")
+        settings.SUPABASE_JWT_SECRET = "test-secret"
+
+        # Supabase still handles sign-up; the profile has to land in the local store
+        supabase_service = SupabaseService(settings)
+        supabase_service.supabase = SimpleNamespace(auth=SimpleNamespace(
+            sign_up=lambda credentials: SimpleNamespace(user=SimpleNamespace(id="alice"), session=None)
+        ))
+        services = ServiceContainer(settings, supabase_service=supabase_service)
+        token = jwt.encode(
+            {"sub": "alice", "email": "alice@example.org", "aud": "authenticated", "exp": int(time.time()) + 600},
+            "test-secret",
+            algorithm="HS256"
+        )
+
+        main.app.state.services = services
+        try:
+            client = TestClient(main.app)
+            registered = client.post("/api/register", json={
+                "email": "alice@example.org",
+                "password": "secret",
+                "full_name": "Alice",
+                "institution": "St Mary's"
+            })
+            assert registered.status_code == 200
+            services.results_store.save_analysis_result("alice", _result("alice.fasta"))
+
+            headers = {"Authorization": f"Bearer {token}"}
+            assert client.get("/api/users/me", headers=headers).json()["institution"] == "St Mary's"
+            statistics = client.get("/api/statistics?scope=institution", headers=headers)
+        finally:
+            del main.app.state.services
+            services.results_store.close()
+
+    assert statistics.status_code == 200
+    assert statistics.json()["scope_id"] == "St Mary's"
+    assert sum(bucket["samples"] for bucket in statistics.json()["buckets"]) == 1
+
+def test_deduplicated_results_read_back_unchanged():
+    from services.results_store import split_content, merge_content
+
+    original = {**_result("first.fasta"), "treatment_recommendations": ["Vancomycin"]}
+    history, content = split_content(original)
+    assert "matching_regions" not in history and content["matching_regions"] == [REGION]
+    assert merge_content(dict(history), content) == original
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = SQLiteResultsStore(os.path.join(directory, "results.db"))
+        # Two samples of the same genome share one content row
+        first = store.save_analysis_result("alice", original)
+        second = store.save_analysis_result("alice", {**original, "sample_id": "second.fasta"})
+
+        for result_id, sample_id in ((first, "first.fasta"), (second, "second.fasta")):
+            stored = store.get_analysis_result("alice", result_id)
+            assert {key: stored[key] for key in original} == {**original, "sample_id": sample_id}
+
+if __name__ == "__main__":
+    test_result_round_trips_with_its_content()
+    test_results_are_only_returned_to_their_owner()
+    test_bulk_save_skips_duplicates_when_asked()
+    test_deduplicated_results_read_back_unchanged()
+    test_history_route_answers_404_for_other_users_results()
+    test_registered_profile_feeds_institution_statistics()
+    print("✅ SQLite results store tests passed")
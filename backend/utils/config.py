@@ -14,10 +14,76 @@ class Settings:
         self.SUPABASE_URL = os.getenv("SUPABASE_URL", "")
         self.SUPABASE_KEY = os.getenv("SUPABASE_KEY", "")
         
+        # Results store: "supabase", or "sqlite" for single-node and air-gapped installs
+        self.RESULTS_STORE = os.getenv("RESULTS_STORE", "supabase" if self.SUPABASE_URL else "sqlite").lower()
+        self.RESULTS_DB_PATH = os.getenv("RESULTS_DB_PATH", "data/results.db")
+        self.RESULTS_DB_POOL_SIZE = int(os.getenv("RESULTS_DB_POOL_SIZE", "4"))
+        
         # BLAST settings
         self.BLAST_DB_PATH = os.getenv("BLAST_DB_PATH", "database/blast_db")
         self.TEMP_UPLOADS_DIR = os.getenv("TEMP_UPLOADS_DIR", "temp_uploads")
         self.BLAST_BIN_PATH = os.getenv("BLAST_BIN_PATH")
+        self.WARMUP_SYNTHETIC_SEARCH = os.getenv("WARMUP_SYNTHETIC_SEARCH", "true").lower() == "true"
+        # Seconds shutdown waits for a running warmup stage before stopping the services
+        self.WARMUP_STOP_TIMEOUT = float(os.getenv("WARMUP_STOP_TIMEOUT", "10"))
+        
+        # Analysis job queue (SQLite, survives restarts)
+        self.JOB_DB_PATH = os.getenv("JOB_DB_PATH", "data/jobs.db")
+        self.JOB_SPOOL_DIR = os.getenv("JOB_SPOOL_DIR", "data/job_uploads")
+        self.JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+        # Progress events kept in memory per job, and for how long after the job finishes or goes quiet
+        self.PROGRESS_MAX_EVENTS = int(os.getenv("PROGRESS_MAX_EVENTS", "1000"))
+        self.PROGRESS_RETENTION_SECONDS = float(os.getenv("PROGRESS_RETENTION_SECONDS", "600"))
+        self.PROGRESS_MAX_AGE_SECONDS = float(os.getenv("PROGRESS_MAX_AGE_SECONDS", "3600"))
+        
+        # Admission control: concurrent and queued requests per endpoint
+        self.BLAST_MAX_IN_FLIGHT = int(os.getenv("BLAST_MAX_IN_FLIGHT", "4"))
+        self.BLAST_MAX_QUEUED = int(os.getenv("BLAST_MAX_QUEUED", "16"))
+        self.ANALYZE_MAX_IN_FLIGHT = int(os.getenv("ANALYZE_MAX_IN_FLIGHT", "2"))
+        self.ANALYZE_MAX_QUEUED = int(os.getenv("ANALYZE_MAX_QUEUED", "8"))
+        self.BATCH_MAX_IN_FLIGHT = int(os.getenv("BATCH_MAX_IN_FLIGHT", "1"))
+        self.BATCH_MAX_QUEUED = int(os.getenv("BATCH_MAX_QUEUED", "4"))
+        self.ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "30"))
+        self.ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "5"))
+        
+        # Memory budgets: larger uploads and searches estimated to need more than the per-request
+        # budget are rejected with 413, and searches that would take the process past its limit
+        # with 503; 0 disables each check
+        self.MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "200"))
+        self.MEMORY_REQUEST_BUDGET_MB = int(os.getenv("MEMORY_REQUEST_BUDGET_MB", "1024"))
+        self.MEMORY_PROCESS_LIMIT_MB = int(os.getenv("MEMORY_PROCESS_LIMIT_MB", "0"))
+        
+        # Write-behind persistence of analysis results
+        self.RESULT_WRITE_BEHIND = os.getenv("RESULT_WRITE_BEHIND", "true").lower() == "true"
+        self.RESULT_SPOOL_PATH = os.getenv("RESULT_SPOOL_PATH", "data/result_spool.db")
+        self.RESULT_FLUSH_SIZE = int(os.getenv("RESULT_FLUSH_SIZE", "50"))
+        self.RESULT_FLUSH_INTERVAL = float(os.getenv("RESULT_FLUSH_INTERVAL", "2"))
+        self.RESULT_MAX_BACKOFF = float(os.getenv("RESULT_MAX_BACKOFF", "60"))
+        # Serve stored results for sequences already analyzed with the same database and parameters
+        self.RESULT_REUSE = os.getenv("RESULT_REUSE", "true").lower() == "true"
+        
+        # Tracing: comma-separated exporters ("console", "file", "otlp"); empty keeps only Server-Timing
+        self.TRACE_EXPORTERS = os.getenv("TRACE_EXPORTERS", "")
+        self.TRACE_FILE_PATH = os.getenv("TRACE_FILE_PATH", "data/traces.jsonl")
+        self.OTLP_ENDPOINT = os.getenv("OTLP_ENDPOINT", "http://localhost:4318")
+        self.TRACE_SAMPLE_RATIO = float(os.getenv("TRACE_SAMPLE_RATIO", "1.0"))
+        
+        # On-demand profiling: requests sending X-Profile with X-Admin-Token, plus a sampled fraction
+        self.PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+        self.PROFILE_SAMPLE_RATIO = float(os.getenv("PROFILE_SAMPLE_RATIO", "0"))
+        self.PROFILE_MEMORY = os.getenv("PROFILE_MEMORY", "false").lower() == "true"
+        self.PROFILE_DIR = os.getenv("PROFILE_DIR", "data/profiles")
+        self.PROFILE_MAX_ARTIFACTS = int(os.getenv("PROFILE_MAX_ARTIFACTS", "100"))
+        # Shared secret for the /api/admin endpoints; empty disables them
+        self.ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+        
+        # Batch analysis
+        self.BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+        self.BATCH_SAVE_SIZE = int(os.getenv("BATCH_SAVE_SIZE", "50"))
+        # Uncompressed size limits for archive members, one FASTA file and all of an archive's;
+        # 0 disables each check
+        self.BATCH_MAX_MEMBER_MB = int(os.getenv("BATCH_MAX_MEMBER_MB", "200"))
+        self.BATCH_MAX_ARCHIVE_MB = int(os.getenv("BATCH_MAX_ARCHIVE_MB", "2048"))
         
         # NCBI API settings
         self.NCBI_API_KEY = os.getenv("NCBI_API_KEY")
@@ -26,6 +92,21 @@ class Settings:
         # Groq API for treatment recommendations
         self.GROQ_API_KEY = os.getenv("GROQ_API_KEY")
         
+        # Outbound HTTP connection pool (Groq, Supabase)
+        self.HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+        self.HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+        self.HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+        self.HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
+        self.HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+        
+        # Local verification of Supabase access tokens (HS256 secret and/or key set URL)
+        self.SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET", "")
+        self.SUPABASE_JWKS_URL = os.getenv("SUPABASE_JWKS_URL", "")
+        self.SUPABASE_JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+        self.SUPABASE_JWT_LEEWAY = float(os.getenv("SUPABASE_JWT_LEEWAY", "0"))
+        self.AUTH_PROFILE_CACHE_TTL = float(os.getenv("AUTH_PROFILE_CACHE_TTL", "60"))
+        self.AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+        
         # JWT settings for authentication
         self.SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key")
         self.ALGORITHM = "HS256"
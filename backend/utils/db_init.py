@@ -121,6 +121,321 @@ def init_row_level_security():
         logger.error(f"Error initializing row level security policies: {str(e)}")
         return False
 
+def init_result_indexes():
+    """
+    Index analysis_results for history and gene-level queries
+    
+    Adds the (user_id, created_at, id) index behind keyset-paginated history, a
+    GIN index for identified_genes containment (identified_genes @> '["mecA"]'),
+    and an analysis_matching_regions child table kept in sync with the
+    matching_regions JSONB by a trigger, so existing writers need no changes.
+    Safe to run more than once; existing rows are backfilled.
+    """
+    try:
+        supabase_service = SupabaseService()
+        
+        if not supabase_service.supabase:
+            logger.error("Supabase client not initialized. Cannot create indexes.")
+            return False
+        
+        # Composite and GIN indexes on analysis_results
+        indexes_sql = """
+        CREATE INDEX IF NOT EXISTS idx_analysis_results_user_created
+            ON analysis_results (user_id, created_at DESC, id DESC);
+        
+        CREATE INDEX IF NOT EXISTS idx_analysis_results_identified_genes
+            ON analysis_results USING GIN (identified_genes jsonb_path_ops);
+        """
+        
+        # One row per matching region, for gene-level lookups without unpacking JSONB
+        matching_regions_sql = """
+        CREATE TABLE IF NOT EXISTS analysis_matching_regions (
+            id BIGSERIAL PRIMARY KEY,
+            result_id UUID NOT NULL REFERENCES analysis_results(id) ON DELETE CASCADE,
+            user_id UUID REFERENCES auth.users(id),
+            gene_name TEXT NOT NULL,
+            query_start INTEGER,
+            query_end INTEGER,
+            subject_start INTEGER,
+            subject_end INTEGER,
+            percent_identity FLOAT,
+            alignment_length INTEGER,
+            evalue FLOAT,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+        );
+        
+        CREATE INDEX IF NOT EXISTS idx_analysis_matching_regions_result
+            ON analysis_matching_regions (result_id);
+        
+        CREATE INDEX IF NOT EXISTS idx_analysis_matching_regions_user_gene
+            ON analysis_matching_regions (user_id, gene_name, created_at DESC);
+        
+        ALTER TABLE analysis_matching_regions ENABLE ROW LEVEL SECURITY;
+        
+        DROP POLICY IF EXISTS analysis_matching_regions_select_policy ON analysis_matching_regions;
+        CREATE POLICY analysis_matching_regions_select_policy ON analysis_matching_regions
+            FOR SELECT
+            USING (auth.uid() = user_id);
+        """
+        
+        # Keep the child table in step with analysis_results.matching_regions
+        sync_trigger_sql = """
+        CREATE OR REPLACE FUNCTION sync_analysis_matching_regions() RETURNS TRIGGER AS $$
+        BEGIN
+            DELETE FROM analysis_matching_regions WHERE result_id = NEW.id;
+            
+            INSERT INTO analysis_matching_regions (
+                result_id, user_id, gene_name, query_start, query_end, subject_start,
+                subject_end, percent_identity, alignment_length, evalue, created_at
+            )
+            SELECT
+                NEW.id, NEW.user_id, region->>'gene_name',
+                (region->>'query_start')::INTEGER, (region->>'query_end')::INTEGER,
+                (region->>'subject_start')::INTEGER, (region->>'subject_end')::INTEGER,
+                (region->>'percent_identity')::FLOAT, (region->>'alignment_length')::INTEGER,
+                (region->>'evalue')::FLOAT, NEW.created_at
+            FROM jsonb_array_elements(COALESCE(NEW.matching_regions, '[]'::JSONB)) AS region
+            WHERE region->>'gene_name' IS NOT NULL;
+            
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql SECURITY DEFINER;
+        
+        DROP TRIGGER IF EXISTS analysis_results_sync_matching_regions ON analysis_results;
+        CREATE TRIGGER analysis_results_sync_matching_regions
+            AFTER INSERT OR UPDATE OF matching_regions ON analysis_results
+            FOR EACH ROW EXECUTE FUNCTION sync_analysis_matching_regions();
+        """
+        
+        # Backfill rows written before the trigger existed
+        backfill_sql = """
+        INSERT INTO analysis_matching_regions (
+            result_id, user_id, gene_name, query_start, query_end, subject_start,
+            subject_end, percent_identity, alignment_length, evalue, created_at
+        )
+        SELECT
+            r.id, r.user_id, region->>'gene_name',
+            (region->>'query_start')::INTEGER, (region->>'query_end')::INTEGER,
+            (region->>'subject_start')::INTEGER, (region->>'subject_end')::INTEGER,
+            (region->>'percent_identity')::FLOAT, (region->>'alignment_length')::INTEGER,
+            (region->>'evalue')::FLOAT, r.created_at
+        FROM analysis_results r
+        CROSS JOIN LATERAL jsonb_array_elements(COALESCE(r.matching_regions, '[]'::JSONB)) AS region
+        WHERE region->>'gene_name' IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM analysis_matching_regions m WHERE m.result_id = r.id);
+        """
+        
+        # Execute SQL
+        supabase_service.supabase.postgrest.query(indexes_sql).execute()
+        supabase_service.supabase.postgrest.query(matching_regions_sql).execute()
+        supabase_service.supabase.postgrest.query(sync_trigger_sql).execute()
+        supabase_service.supabase.postgrest.query(backfill_sql).execute()
+        
+        logger.info("Analysis result indexes initialized successfully")
+        return True
+        
+    except Exception as e:
+        logger.error(f"Error initializing analysis result indexes: {str(e)}")
+        return False
+
+def init_surveillance_aggregates():
+    """
+    Create the incrementally maintained surveillance counters
+    
+    analysis_aggregates holds one counter per (user or institution, day or week,
+    gene / resistance status / total). A trigger on analysis_results increments the
+    counters of every inserted row, so statistics queries read a handful of
+    counters instead of scanning the history. Existing rows are counted once.
+    """
+    try:
+        supabase_service = SupabaseService()
+        
+        if not supabase_service.supabase:
+            logger.error("Supabase client not initialized. Cannot create surveillance aggregates.")
+            return False
+        
+        aggregates_sql = """
+        CREATE TABLE IF NOT EXISTS analysis_aggregates (
+            scope_type TEXT NOT NULL,
+            scope_id TEXT NOT NULL,
+            period TEXT NOT NULL,
+            period_start DATE NOT NULL,
+            dimension TEXT NOT NULL,
+            value TEXT NOT NULL,
+            count BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (scope_type, scope_id, period, period_start, dimension, value)
+        );
+        
+        ALTER TABLE analysis_aggregates ENABLE ROW LEVEL SECURITY;
+        
+        DROP POLICY IF EXISTS analysis_aggregates_select_policy ON analysis_aggregates;
+        CREATE POLICY analysis_aggregates_select_policy ON analysis_aggregates
+            FOR SELECT
+            USING (
+                (scope_type = 'user' AND scope_id = auth.uid()::TEXT)
+                OR (scope_type = 'institution' AND scope_id = (SELECT institution FROM profiles WHERE id = auth.uid()))
+            );
+        """
+        
+        # Rows one analysis result contributes: per scope, per period, per dimension
+        counters_sql = """
+        CREATE OR REPLACE FUNCTION analysis_aggregate_rows(
+            r analysis_results, institution TEXT
+        ) RETURNS TABLE (scope_type TEXT, scope_id TEXT, period TEXT, period_start DATE, dimension TEXT, value TEXT) AS $$
+            SELECT s.scope_type, s.scope_id, p.period,
+                   date_trunc(p.period, COALESCE(r.analysis_timestamp, r.created_at, NOW()))::DATE,
+                   d.dimension, d.value
+            FROM (VALUES ('user', r.user_id::TEXT), ('institution', institution)) AS s(scope_type, scope_id)
+            CROSS JOIN (VALUES ('day'), ('week')) AS p(period)
+            CROSS JOIN (
+                SELECT 'total' AS dimension, '' AS value
+                UNION ALL SELECT 'status', COALESCE(r.resistance_status, 'unknown')
+                UNION SELECT 'gene', gene FROM jsonb_array_elements_text(COALESCE(r.identified_genes, '[]'::JSONB)) AS gene
+            ) AS d
+            WHERE s.scope_id IS NOT NULL;
+        $$ LANGUAGE sql STABLE;
+        
+        CREATE OR REPLACE FUNCTION bump_analysis_aggregates() RETURNS TRIGGER AS $$
+        BEGIN
+            INSERT INTO analysis_aggregates AS a (scope_type, scope_id, period, period_start, dimension, value, count)
+            SELECT c.scope_type, c.scope_id, c.period, c.period_start, c.dimension, c.value, 1
+            FROM analysis_aggregate_rows(NEW, (SELECT institution FROM profiles WHERE id = NEW.user_id)) AS c
+            ON CONFLICT (scope_type, scope_id, period, period_start, dimension, value)
+            DO UPDATE SET count = a.count + 1;
+            
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql SECURITY DEFINER;
+        
+        DROP TRIGGER IF EXISTS analysis_results_bump_aggregates ON analysis_results;
+        CREATE TRIGGER analysis_results_bump_aggregates
+            AFTER INSERT ON analysis_results
+            FOR EACH ROW EXECUTE FUNCTION bump_analysis_aggregates();
+        """
+        
+        # Count rows written before the trigger existed (only into an empty table)
+        backfill_sql = """
+        INSERT INTO analysis_aggregates (scope_type, scope_id, period, period_start, dimension, value, count)
+        SELECT c.scope_type, c.scope_id, c.period, c.period_start, c.dimension, c.value, COUNT(*)
+        FROM analysis_results r
+        LEFT JOIN profiles p ON p.id = r.user_id
+        CROSS JOIN LATERAL analysis_aggregate_rows(r, p.institution) AS c
+        WHERE NOT EXISTS (SELECT 1 FROM analysis_aggregates)
+        GROUP BY c.scope_type, c.scope_id, c.period, c.period_start, c.dimension, c.value;
+        """
+        
+        # Execute SQL
+        supabase_service.supabase.postgrest.query(aggregates_sql).execute()
+        supabase_service.supabase.postgrest.query(counters_sql).execute()
+        supabase_service.supabase.postgrest.query(backfill_sql).execute()
+        
+        logger.info("Surveillance aggregates initialized successfully")
+        return True
+        
+    except Exception as e:
+        logger.error(f"Error initializing surveillance aggregates: {str(e)}")
+        return False
+
+def init_content_store():
+    """
+    Store each distinct analysis once and have history rows reference it
+    
+    analysis_contents holds one row per (sequence hash, reference database version,
+    parameters) with the matching regions and treatment recommendations; history
+    rows written with a content_key leave those columns empty. The matching regions
+    sync trigger reads them from the content row instead, and the sequence_hash
+    index makes "has this genome been analyzed before" a single lookup.
+    """
+    try:
+        supabase_service = SupabaseService()
+        
+        if not supabase_service.supabase:
+            logger.error("Supabase client not initialized. Cannot create content store.")
+            return False
+        
+        contents_sql = """
+        CREATE TABLE IF NOT EXISTS analysis_contents (
+            content_key TEXT PRIMARY KEY,
+            sequence_hash TEXT NOT NULL,
+            db_version TEXT NOT NULL,
+            analysis_params JSONB,
+            resistance_status TEXT NOT NULL,
+            confidence_score FLOAT NOT NULL,
+            identified_genes JSONB,
+            matching_regions JSONB,
+            treatment_recommendations JSONB,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+        );
+        
+        CREATE INDEX IF NOT EXISTS idx_analysis_contents_sequence
+            ON analysis_contents (sequence_hash);
+        
+        ALTER TABLE analysis_results
+            ADD COLUMN IF NOT EXISTS content_key TEXT REFERENCES analysis_contents(content_key);
+        
+        CREATE INDEX IF NOT EXISTS idx_analysis_results_content
+            ON analysis_results (content_key);
+        
+        ALTER TABLE analysis_contents ENABLE ROW LEVEL SECURITY;
+        
+        DROP POLICY IF EXISTS analysis_contents_select_policy ON analysis_contents;
+        CREATE POLICY analysis_contents_select_policy ON analysis_contents
+            FOR SELECT
+            USING (EXISTS (
+                SELECT 1 FROM analysis_results r
+                WHERE r.content_key = analysis_contents.content_key AND r.user_id = auth.uid()
+            ));
+        
+        DROP POLICY IF EXISTS analysis_contents_insert_policy ON analysis_contents;
+        CREATE POLICY analysis_contents_insert_policy ON analysis_contents
+            FOR INSERT
+            WITH CHECK (auth.uid() IS NOT NULL);
+        """
+        
+        # Regions of a deduplicated row come from its content
+        sync_trigger_sql = """
+        CREATE OR REPLACE FUNCTION sync_analysis_matching_regions() RETURNS TRIGGER AS $$
+        BEGIN
+            DELETE FROM analysis_matching_regions WHERE result_id = NEW.id;
+            
+            INSERT INTO analysis_matching_regions (
+                result_id, user_id, gene_name, query_start, query_end, subject_start,
+                subject_end, percent_identity, alignment_length, evalue, created_at
+            )
+            SELECT
+                NEW.id, NEW.user_id, region->>'gene_name',
+                (region->>'query_start')::INTEGER, (region->>'query_end')::INTEGER,
+                (region->>'subject_start')::INTEGER, (region->>'subject_end')::INTEGER,
+                (region->>'percent_identity')::FLOAT, (region->>'alignment_length')::INTEGER,
+                (region->>'evalue')::FLOAT, NEW.created_at
+            FROM jsonb_array_elements(COALESCE(
+                NEW.matching_regions,
+                (SELECT c.matching_regions FROM analysis_contents c WHERE c.content_key = NEW.content_key),
+                '[]'::JSONB
+            )) AS region
+            WHERE region->>'gene_name' IS NOT NULL;
+            
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql SECURITY DEFINER;
+        
+        DROP TRIGGER IF EXISTS analysis_results_sync_matching_regions ON analysis_results;
+        CREATE TRIGGER analysis_results_sync_matching_regions
+            AFTER INSERT OR UPDATE OF matching_regions, content_key ON analysis_results
+            FOR EACH ROW EXECUTE FUNCTION sync_analysis_matching_regions();
+        """
+        
+        # Execute SQL
+        supabase_service.supabase.postgrest.query(contents_sql).execute()
+        supabase_service.supabase.postgrest.query(sync_trigger_sql).execute()
+        
+        logger.info("Analysis content store initialized successfully")
+        return True
+        
+    except Exception as e:
+        logger.error(f"Error initializing analysis content store: {str(e)}")
+        return False
+
 if __name__ == "__main__":
     # Configure logging
     logging.basicConfig(level=logging.INFO)
@@ -135,7 +450,16 @@ if __name__ == "__main__":
         rls_init = init_row_level_security()
         
         if rls_init:
-            logger.info("Supabase initialization completed successfully")
+            # Initialize indexes, the matching regions child table, surveillance counters and the content store
+            logger.info("Initializing analysis result indexes...")
+            if not init_result_indexes():
+                logger.error("Failed to initialize analysis result indexes")
+            elif not init_surveillance_aggregates():
+                logger.error("Failed to initialize surveillance aggregates")
+            elif not init_content_store():
+                logger.error("Failed to initialize analysis content store")
+            else:
+                logger.info("Supabase initialization completed successfully")
         else:
             logger.error("Failed to initialize row level security policies")
     else:
@@ -0,0 +1,72 @@
+from datetime import date, datetime
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Optional
+import orjson
+from pydantic import BaseModel, TypeAdapter
+from starlette.responses import Response
+
+def _default(obj: Any) -> Any:
+    # orjson handles dicts, lists, datetimes, enums and dataclasses natively
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    return str(obj)
+
+@lru_cache(maxsize=None)
+def _adapter(schema: Any) -> TypeAdapter:
+    return TypeAdapter(schema)
+
+def encode(content: Any, schema: Optional[Any] = None) -> bytes:
+    """
+    Encode content as JSON bytes
+
+    Args:
+        content: Value to encode; pydantic models are dumped field by field
+        schema: Type of content (e.g. List[BlastResult]); when given, pydantic's
+            compiled serializer for that type writes the JSON directly
+
+    Returns:
+        UTF-8 JSON
+    """
+    if schema is not None:
+        return _adapter(schema).dump_json(content)
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+def decode(data: Any) -> Any:
+    """Decode JSON from bytes or str"""
+    return orjson.loads(data)
+
+def to_jsonable(obj: Any) -> Any:
+    """
+    Convert a value to plain JSON types without encoding it
+
+    Datetimes become ISO 8601 strings, enums their values, pydantic models dicts;
+    anything else that isn't a JSON type is converted with str().
+    """
+    if obj is None or isinstance(obj, (str, int, float, bool)):
+        if isinstance(obj, Enum):
+            return obj.value
+        return obj
+    if isinstance(obj, dict):
+        return {str(key): to_jsonable(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple, set)):
+        return [to_jsonable(value) for value in obj]
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return to_jsonable(obj.value)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    return str(obj)
+
+class FastJSONResponse(Response):
+    """JSON response encoded with orjson, or with a schema's compiled serializer"""
+
+    media_type = "application/json"
+
+    def __init__(self, content: Any, schema: Optional[Any] = None, **kwargs: Any):
+        self.schema = schema
+        super().__init__(content, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        return encode(content, self.schema)
@@ -31,6 +31,8 @@ const HistoryPage = () => {
   const [searchTerm, setSearchTerm] = useState('');
   const [statusFilter, setStatusFilter] = useState('all');
   const [sortOrder, setSortOrder] = useState('newest');
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   const formatDate = (dateString) => {
     if (!dateString) return 'N/A';
@@ -57,6 +59,7 @@ const HistoryPage = () => {
       try {
         const response = await analysisService.getAnalysisHistory();
         setHistory(response.data || []);
+        setNextCursor(response.headers['x-next-cursor'] || null);
       } catch (err) {
         const savedResults = JSON.parse(localStorage.getItem('analysisResults') || '[]');
         setHistory(savedResults);
@@ -106,6 +109,19 @@ const HistoryPage = () => {
     setFilteredHistory(filtered);
   }, [history, searchTerm, statusFilter, sortOrder]);
 
+  const loadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const response = await analysisService.getAnalysisHistory(nextCursor);
+      setHistory(prev => [...prev, ...(response.data || [])]);
+      setNextCursor(response.headers['x-next-cursor'] || null);
+    } catch (err) {
+      setError('Could not load more history from server.');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleDelete = (index) => {
     const updatedHistory = history.filter((_, i) => i !== index);
     setHistory(updatedHistory);
@@ -337,6 +353,14 @@ const HistoryPage = () => {
               </Card>
             ))
           )}
+
+          {nextCursor && (
+            <div className="text-center">
+              <Button variant="outline" onClick={loadMore} disabled={loadingMore}>
+                {loadingMore ? 'Loading...' : 'Load more'}
+              </Button>
+            </div>
+          )}
         </div>
       </div>
     </div>
@@ -33,6 +33,35 @@ export const analysisService = {
     });
   },
   
+  // Queue sequence for analysis, returns a job ID to poll
+  submitAnalysisJob: async (file, threshold = 0.75) => {
+    const formData = new FormData();
+    formData.append('file', file);
+    
+    return api.post(`/api/jobs?threshold=${threshold}`, formData, {
+      headers: {
+        'Content-Type': 'multipart/form-data',
+      },
+    });
+  },
+  
+  // Get status and result of a queued analysis
+  getAnalysisJob: async (jobId) => {
+    return api.get(`/api/jobs/${jobId}`);
+  },
+  
+  // Analyze many FASTA files (or zip/tar archives of them) in one request
+  analyzeBatch: async (files, threshold = 0.75) => {
+    const formData = new FormData();
+    files.forEach((file) => formData.append('files', file));
+    
+    return api.post(`/api/batch?threshold=${threshold}`, formData, {
+      headers: {
+        'Content-Type': 'multipart/form-data',
+      },
+    });
+  },
+  
   // Run BLAST on sequence
   runBlast: async (file, evalue = 1e-10, maxHits = 10) => {
     const formData = new FormData();
@@ -52,9 +81,11 @@ export const analysisService = {
     return api.get('/api/reference-genes');
   },
   
-  // Get analysis history
-  getAnalysisHistory: async () => {
-    return api.get('/api/history');
+  // Get a page of analysis history; pass the X-Next-Cursor header of the previous page as cursor
+  getAnalysisHistory: async (cursor = null, limit = 50) => {
+    const params = { limit };
+    if (cursor) params.cursor = cursor;
+    return api.get('/api/history', { params });
   },
   
   // Get analysis result by ID